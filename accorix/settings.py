@@ -135,6 +135,47 @@ STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='pk_test_your_
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='sk_test_your_key_here')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='whsec_your_webhook_secret_here')
 
+# Document Numbering
+# Per document type: prefix, and gapless=True to allocate under a row lock
+# instead of from per-process blocks (numbers are then strictly consecutive)
+DOCUMENT_NUMBER_FORMAT = '{prefix}/{year}/{number:06d}'
+DOCUMENT_NUMBER_BLOCK_SIZE = config('DOCUMENT_NUMBER_BLOCK_SIZE', default=50, cast=int)
+FISCAL_YEAR_START_MONTH = config('FISCAL_YEAR_START_MONTH', default=1, cast=int)
+DOCUMENT_NUMBERING = {
+    'purchase_order': {'prefix': 'PO'},
+    'vendor_bill': {'prefix': 'BILL'},
+    'sales_order': {'prefix': 'SO'},
+    'customer_invoice': {'prefix': 'INV', 'gapless': True},
+    'payment': {'prefix': 'PAY'},
+}
+
+# Rendered analytics charts, keyed on their inputs and a fingerprint of the data
+# (use a file-based or shared backend for the alias when running several workers)
+CHART_CACHE = {
+    'ALIAS': config('CHART_CACHE_ALIAS', default='default'),
+    'MAX_BYTES': config('CHART_CACHE_MAX_BYTES', default=20 * 1024 * 1024, cast=int),
+    'TIMEOUT': config('CHART_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int),
+    # Seconds browsers may reuse a chart image before revalidating it with its ETag
+    'BROWSER_MAX_AGE': config('CHART_BROWSER_MAX_AGE', default=60, cast=int),
+}
+
+# Worker processes rendering charts off the request thread (0 renders in process)
+CHART_RENDER_WORKERS = config('CHART_RENDER_WORKERS', default=2, cast=int)
+CHART_RENDER_TIMEOUT = config('CHART_RENDER_TIMEOUT', default=10, cast=int)
+
+# In-memory pivot cube: seconds between incremental refreshes and full reloads
+CUBE_REFRESH_SECONDS = config('CUBE_REFRESH_SECONDS', default=30, cast=int)
+CUBE_FULL_RELOAD_SECONDS = config('CUBE_FULL_RELOAD_SECONDS', default=3600, cast=int)
+
+# Worker processes rendering bulk PDF exports (0 renders in process)
+PDF_EXPORT_WORKERS = config('PDF_EXPORT_WORKERS', default=os.cpu_count() or 1, cast=int)
+
+# Background text extraction of uploaded PDFs by process_documents; pages and
+# seconds are the per-document budget after which extraction stops early
+PDF_INGEST_WORKERS = config('PDF_INGEST_WORKERS', default=os.cpu_count() or 1, cast=int)
+PDF_INGEST_MAX_PAGES = config('PDF_INGEST_MAX_PAGES', default=500, cast=int)
+PDF_INGEST_TIME_BUDGET = config('PDF_INGEST_TIME_BUDGET', default=60, cast=int)
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import ReportSchedule
+
+
+@admin.register(ReportSchedule)
+class ReportScheduleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'report_type', 'frequency', 'period', 'run_time', 'is_active', 'next_run_at', 'last_run_at']
+    list_filter = ['report_type', 'frequency', 'is_active']
+    search_fields = ['name']
+    exclude = ['created_by']
+    readonly_fields = ['last_run_at', 'last_report', 'last_error']
+
+    def save_model(self, request, obj, form, change):
+        if not obj.created_by_id:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
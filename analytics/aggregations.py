@@ -0,0 +1,89 @@
+"""Monthly revenue/expense series shared by the analytics charts and KPIs"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import DailyFinancialFact
+
+
+def dashboard_date_range(end_date=None):
+    """Default analytics range: the last 12 months, from the start of the first month"""
+    end_date = end_date or timezone.now().date()
+    return (end_date - timedelta(days=365)).replace(day=1), end_date
+
+
+def month_starts(start_date, end_date):
+    """First day of every calendar month from start_date's month to end_date's month"""
+    current = start_date.replace(day=1)
+    months = []
+    while current <= end_date:
+        months.append(current)
+        current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return months
+
+
+def monthly_series(start_date, end_date):
+    """Posted revenue, expense and profit per month from start_date's month through end_date.
+
+    Read from the DailyFinancialFact rollup, grouped by month in SQL; months
+    without documents are filled with zeros. Document counts add up the
+    rollup's per-row counts.
+    """
+    start_date = start_date.replace(day=1)
+    rows = (
+        DailyFinancialFact.objects.filter(date__range=[start_date, end_date])
+        .order_by()
+        .annotate(month=TruncMonth('date'))
+        .values_list('document_type', 'month')
+        .annotate(total=Sum('amount'), count=Sum('document_count'))
+    )
+
+    series = {
+        month: {
+            'month': month,
+            'revenue': Decimal('0'),
+            'expense': Decimal('0'),
+            'invoice_count': 0,
+            'bill_count': 0,
+        }
+        for month in month_starts(start_date, end_date)
+    }
+    for document_type, month, total, count in rows:
+        if isinstance(month, datetime):
+            month = month.date()
+        entry = series.get(month)
+        if entry is None:
+            continue
+        if document_type == 'customer_invoice':
+            entry['revenue'], entry['invoice_count'] = Decimal(total or 0), count
+        else:
+            entry['expense'], entry['bill_count'] = Decimal(total or 0), count
+
+    result = list(series.values())
+    for entry in result:
+        entry['profit'] = entry['revenue'] - entry['expense']
+    return result
+
+
+def top_contacts(document_type, limit=10, start_date=None, end_date=None):
+    """(contact name, total) of the contacts with the largest posted totals, from the rollup"""
+    facts = DailyFinancialFact.objects.filter(document_type=document_type)
+    if start_date:
+        facts = facts.filter(date__gte=start_date)
+    if end_date:
+        facts = facts.filter(date__lte=end_date)
+    return list(
+        facts.order_by().values_list('contact__name').annotate(total=Sum('amount')).order_by('-total')[:limit]
+    )
+
+
+def series_totals(series):
+    """Revenue, expense, profit and document counts summed over a monthly series"""
+    totals = {'revenue': Decimal('0'), 'expense': Decimal('0'), 'profit': Decimal('0'), 'invoice_count': 0, 'bill_count': 0}
+    for entry in series:
+        for name in totals:
+            totals[name] += entry[name]
+    return totals
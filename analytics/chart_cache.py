@@ -0,0 +1,76 @@
+"""Cache of rendered charts keyed on chart type, parameters and a data fingerprint.
+
+Entries live in a Django cache (CHART_CACHE['ALIAS']) so any backend works.
+An LRU index stored alongside them caps the total size at
+CHART_CACHE['MAX_BYTES']; the index is best effort across processes, the
+backend's own culling still applies underneath it.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'MAX_BYTES': 20 * 1024 * 1024,
+    'TIMEOUT': 24 * 60 * 60,
+    'BROWSER_MAX_AGE': 60,
+}
+
+
+def model_stamps(*models):
+    """{model label: (row count, latest updated_at)} - changes whenever rows are added, removed or saved"""
+    stamps = {}
+    for model in models:
+        stamp = model.objects.order_by().aggregate(count=Count('pk'), updated=Max('updated_at'))
+        stamps[model._meta.label] = (stamp['count'], stamp['updated'])
+    return stamps
+
+
+class ChartCache:
+    index_key = 'charts:lru'
+
+    def __init__(self, alias=None, max_bytes=None, timeout=None):
+        config = {**DEFAULTS, **getattr(settings, 'CHART_CACHE', {})}
+        self.cache = caches[alias or config['ALIAS']]
+        self.max_bytes = max_bytes or config['MAX_BYTES']
+        self.timeout = timeout or config['TIMEOUT']
+        self.browser_max_age = config['BROWSER_MAX_AGE']
+
+    def key(self, chart_type, params, fingerprint):
+        raw = json.dumps([chart_type, params, fingerprint], sort_keys=True, default=str)
+        return f"charts:{chart_type}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    def get_or_render(self, chart_type, params, fingerprint, render):
+        """Return the cached chart for these inputs, calling render() only on a miss"""
+        key = self.key(chart_type, params, fingerprint)
+        chart = self.cache.get(key)
+        if chart is not None:
+            self._touch(key, len(chart))
+            return chart
+
+        chart = render()
+        if len(chart) <= self.max_bytes:
+            self.cache.set(key, chart, self.timeout)
+            self._touch(key, len(chart))
+        return chart
+
+    def _touch(self, key, size):
+        # Ordered oldest -> newest as [key, size] pairs
+        index = [entry for entry in self.cache.get(self.index_key, []) if entry[0] != key]
+        index.append([key, size])
+        total = sum(entry[1] for entry in index)
+        evicted = []
+        while total > self.max_bytes and len(index) > 1:
+            old_key, old_size = index.pop(0)
+            evicted.append(old_key)
+            total -= old_size
+        if evicted:
+            self.cache.delete_many(evicted)
+        self.cache.set(self.index_key, index, self.timeout)
+
+    def clear(self):
+        self.cache.delete_many([entry[0] for entry in self.cache.get(self.index_key, [])] + [self.index_key])
@@ -0,0 +1,217 @@
+"""Chart rendering on matplotlib's object-oriented API.
+
+Every chart gets its own Figure and Agg canvas and is styled explicitly from
+THEME, never through pyplot or the global rcParams, so charts can be
+rendered concurrently from several threads. The chart functions take plain
+data series and return the encoded image bytes.
+
+render() and render_many() run those functions in a bounded pool of worker
+processes (CHART_RENDER_WORKERS, 0 to disable), so independent charts render
+on separate cores instead of queueing on one interpreter. Only the series
+and the resulting bytes cross the process boundary. A render that fails or
+finds the pool broken is redone in the calling process; one still running
+after CHART_RENDER_TIMEOUT seconds raises ChartTimeout instead, since the
+same chart would only hold the caller that long again.
+"""
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from matplotlib import colormaps, dates as mdates, style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 10
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ChartTimeout(Exception):
+    """A chart did not finish rendering within CHART_RENDER_TIMEOUT"""
+
+
+# Resolved once from matplotlib's dark_background sheet
+_DARK = style.library['dark_background']
+THEME = {
+    'background': '#1a1a1a',
+    'text': _DARK['text.color'],
+    'edge': _DARK['axes.edgecolor'],
+    'grid': _DARK['grid.color'],
+    'grid_alpha': 0.3,
+    'title_size': 16,
+    'message_size': 14,
+    'dpi': 100,
+}
+
+
+def format_currency(value, position=None):
+    return f'₹{value:,.0f}'
+
+
+def new_chart(figsize, title=None):
+    """A themed Figure with one Axes, detached from pyplot"""
+    fig = Figure(figsize=figsize, facecolor=THEME['background'], layout='tight')
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor(THEME['background'])
+    for spine in ax.spines.values():
+        spine.set_edgecolor(THEME['edge'])
+    ax.tick_params(colors=THEME['text'])
+    if title:
+        ax.set_title(title, color=THEME['text'], fontsize=THEME['title_size'], fontweight='bold')
+    return fig, ax
+
+
+def figure_bytes(fig, image_format='png'):
+    buffer = io.BytesIO()
+    # SVG output would otherwise embed the render time
+    metadata = {'Date': None} if image_format == 'svg' else None
+    fig.savefig(buffer, format=image_format, facecolor=THEME['background'], edgecolor='none', dpi=THEME['dpi'],
+                metadata=metadata)
+    return buffer.getvalue()
+
+
+def _finish_axes(ax, xlabel, ylabel):
+    ax.set_xlabel(xlabel, color=THEME['text'])
+    ax.set_ylabel(ylabel, color=THEME['text'])
+    ax.legend(facecolor=THEME['background'], edgecolor=THEME['edge'], labelcolor=THEME['text'])
+    ax.grid(True, color=THEME['grid'], alpha=THEME['grid_alpha'])
+    # Formatters hold a reference to their axis, so each chart gets its own
+    ax.yaxis.set_major_formatter(FuncFormatter(format_currency))
+
+
+def _message(ax, text):
+    ax.text(0.5, 0.5, text, horizontalalignment='center', verticalalignment='center',
+            transform=ax.transAxes, color=THEME['text'], fontsize=THEME['message_size'])
+
+
+def grouped_bar_chart(title, labels, groups, xlabel, ylabel='Amount (₹)', figsize=(10, 6),
+                      empty_message=None, image_format='png'):
+    """Side-by-side bars per label; groups is a list of (name, values, color)"""
+    fig, ax = new_chart(figsize, title)
+    if not labels and empty_message:
+        _message(ax, empty_message)
+        return figure_bytes(fig, image_format)
+
+    x = np.arange(len(labels))
+    width = 0.7 / len(groups)
+    for index, (name, values, color) in enumerate(groups):
+        offset = (index - (len(groups) - 1) / 2) * width
+        ax.bar(x + offset, values, width, label=name, color=color, alpha=0.8)
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels, rotation=45, ha='right', color=THEME['text'])
+    _finish_axes(ax, xlabel, ylabel)
+    return figure_bytes(fig, image_format)
+
+
+def monthly_line_chart(title, months, lines, xlabel='Month', ylabel='Amount (₹)', figsize=(12, 6),
+                       image_format='png'):
+    """One line per (name, values, color, marker) over a list of month dates"""
+    fig, ax = new_chart(figsize, title)
+    for name, values, color, marker in lines:
+        ax.plot(months, values, marker=marker, linewidth=2, label=name, color=color)
+    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=2))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right', color=THEME['text'])
+    _finish_axes(ax, xlabel, ylabel)
+    return figure_bytes(fig, image_format)
+
+
+def pie_chart(title, labels, sizes, figsize=(8, 8), empty_message=None, image_format='png'):
+    fig, ax = new_chart(figsize, title)
+    if not labels:
+        _message(ax, empty_message or 'No data available')
+        return figure_bytes(fig, image_format)
+
+    colors = colormaps['Set3'](np.linspace(0, 1, len(labels)))
+    wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
+    for text in texts:
+        text.set_color(THEME['text'])
+    for autotext in autotexts:
+        autotext.set_color(THEME['text'])
+        autotext.set_fontweight('bold')
+    return figure_bytes(fig, image_format)
+
+
+def get_pool():
+    """The shared render pool, started on first use; None when disabled"""
+    global _pool
+    from django.conf import settings
+
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, 'CHART_RENDER_WORKERS', DEFAULT_WORKERS)
+            if workers <= 0:
+                return None
+            # Spawned workers only import this module, nothing of the forking web worker
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_many(jobs, timeout=None):
+    """Render (chart function, kwargs) jobs concurrently and return their bytes in order.
+
+    Each job may take up to timeout seconds from the moment it is waited on;
+    the first one that takes longer raises ChartTimeout. A worker cannot be
+    interrupted, so it finishes that render in the background.
+    """
+    from django.conf import settings
+
+    if timeout is None:
+        timeout = getattr(settings, 'CHART_RENDER_TIMEOUT', DEFAULT_TIMEOUT)
+    pool = get_pool()
+    futures = []
+    if pool is not None:
+        try:
+            futures = [pool.submit(chart, **kwargs) for chart, kwargs in jobs]
+        except RuntimeError:
+            # BrokenProcessPool, or a pool shut down by another thread
+            logger.warning('Chart render pool unavailable, rendering in process', exc_info=True)
+            _discard_pool(pool)
+            futures = []
+
+    results = []
+    for index, (chart, kwargs) in enumerate(jobs):
+        if futures:
+            future = futures[index]
+            try:
+                results.append(future.result(timeout=timeout))
+                continue
+            except FutureTimeoutError:
+                # Drop the jobs not started yet; running ones cannot be stopped
+                for pending in futures[index:]:
+                    pending.cancel()
+                logger.warning('Chart %s timed out after %ss in the render pool', chart.__name__, timeout)
+                raise ChartTimeout(f'Chart {chart.__name__} did not render within {timeout}s')
+            except BrokenProcessPool:
+                logger.warning('Chart render pool broke, rendering in process', exc_info=True)
+                _discard_pool(pool)
+                futures = []
+            except Exception:
+                logger.warning('Chart %s failed in the render pool, rendering in process',
+                               chart.__name__, exc_info=True)
+        results.append(chart(**kwargs))
+    return results
+
+
+def render(chart, **kwargs):
+    return render_many([(chart, kwargs)])[0]
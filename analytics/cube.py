@@ -0,0 +1,431 @@
+"""In-memory columnar cube of posted invoice and bill lines for ad-hoc pivots.
+
+Each posted line is one position in a set of NumPy columns: kind (0 revenue,
+1 expense), month (months since BASE_YEAR), dense integer codes for contact,
+product, category and analytical account, and the amount in integer paise.
+Group-by queries combine the requested codes into one integer key and sum
+with np.bincount, or with a sort and np.add.reduceat when the key space is
+too large for a dense table.
+
+The cube is loaded once per process and refreshed from the document
+updated_at watermark: lines of documents changed since then are dropped and
+reloaded. Deleted documents are only noticed by the periodic full reload
+(CUBE_FULL_RELOAD_SECONDS).
+"""
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import BigIntegerField, F, Max, Value
+from django.db.models.functions import Cast, Coalesce, ExtractMonth, ExtractYear, Round
+
+from core.models import AnalyticalAccount, Contact, Product
+from .facts import SOURCES
+
+
+BASE_YEAR = 1970
+KINDS = {'customer_invoice': 0, 'vendor_bill': 1}
+KIND_LABELS = ['revenue', 'expense']
+DIMENSIONS = ('month', 'kind', 'customer', 'vendor', 'contact', 'product', 'category', 'account')
+MEASURES = ('revenue', 'expense', 'net', 'lines')
+
+# Largest combined key space summed with a dense bincount table
+DENSE_LIMIT = 1 << 22
+WATERMARK_OVERLAP = timedelta(minutes=5)
+ID_CHUNK = 1000
+ROW_CHUNK = 50000
+
+COLUMNS = {
+    'document': np.int64,
+    'kind': np.int8,
+    'month': np.int32,
+    'contact': np.int32,
+    'product': np.int32,
+    'category': np.int32,
+    'account': np.int32,
+    'amount': np.int64,
+    # amount as float64, the weights np.bincount sums
+    'weight': np.float64,
+}
+
+
+class CubeQueryError(ValueError):
+    pass
+
+
+class Dictionary:
+    """Dense integer codes for the values of one dimension"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, values):
+        uniques, inverse = np.unique(values, return_inverse=True)
+        mapped = np.empty(len(uniques), dtype=np.int32)
+        for index, value in enumerate(uniques.tolist()):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            mapped[index] = code
+        return mapped[inverse.reshape(-1)]
+
+    def lookup(self, values):
+        return np.array([self.codes[value] for value in values if value in self.codes], dtype=np.int32)
+
+
+def month_key(year, month):
+    return (year - BASE_YEAR) * 12 + month - 1
+
+
+def month_label(key):
+    year, month = divmod(int(key), 12)
+    return f'{year + BASE_YEAR}-{month + 1:02d}'
+
+
+def parse_month(text):
+    try:
+        year, month = (int(part) for part in text.split('-')[:2])
+    except ValueError:
+        raise CubeQueryError(f"invalid month {text!r}, expected YYYY-MM")
+    if not 1 <= month <= 12:
+        raise CubeQueryError(f"invalid month {text!r}, expected YYYY-MM")
+    return month_key(year, month)
+
+
+def _line_rows(document_type, document_ids=None):
+    """Yield value rows of the posted lines of document_type, optionally only of document_ids"""
+    rel = SOURCES[document_type]._meta.get_field('items')
+    item_model, document = rel.related_model, rel.field.name
+    lines = (
+        item_model.objects.filter(**{f'{document}__status': 'posted'})
+        .order_by()
+        .annotate(
+            cube_month=(ExtractYear(f'{document}__date') - BASE_YEAR) * 12 + ExtractMonth(f'{document}__date') - 1,
+            cube_category=Coalesce('product__category', Value('')),
+            cube_account=Coalesce('analytical_account_id', f'{document}__analytical_account_id', Value(0)),
+            cube_amount=Cast(Round(F('quantity') * F('unit_price') * 100), BigIntegerField()),
+        )
+        .values_list(
+            f'{document}_id', 'cube_month', f'{document}__contact_id', 'product_id',
+            'cube_category', 'cube_account', 'cube_amount'
+        )
+    )
+    if document_ids is None:
+        yield from lines.iterator(chunk_size=ROW_CHUNK)
+        return
+    document_ids = list(document_ids)
+    for start in range(0, len(document_ids), ID_CHUNK):
+        yield from lines.filter(**{f'{document}_id__in': document_ids[start:start + ID_CHUNK]})
+
+
+class AnalyticsCube:
+    def __init__(self):
+        self.contacts = Dictionary()
+        self.products = Dictionary()
+        self.categories = Dictionary()
+        self.accounts = Dictionary()
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.watermarks = {}
+        self.loaded_at = None
+        self.checked_at = None
+
+    def __len__(self):
+        return len(self.columns['amount'])
+
+    def _encode(self, document_type, rows):
+        """Columns for a batch of _line_rows() tuples"""
+        kind = KINDS[document_type]
+        data = np.array(rows, dtype=object)
+        amount = data[:, 6].astype(np.int64)
+        return {
+            # Document ids of both types share one column, so the kind goes in the low bit
+            'document': data[:, 0].astype(np.int64) * 2 + kind,
+            'kind': np.full(len(rows), kind, dtype=np.int8),
+            'month': data[:, 1].astype(np.int32),
+            'contact': self.contacts.encode(data[:, 2].astype(np.int64)),
+            'product': self.products.encode(data[:, 3].astype(np.int64)),
+            'category': self.categories.encode(data[:, 4].astype(str)),
+            'account': self.accounts.encode(data[:, 5].astype(np.int64)),
+            'amount': amount,
+            'weight': amount.astype(np.float64),
+        }
+
+    def _load(self, document_type, document_ids=None):
+        batches, rows = [], []
+        for row in _line_rows(document_type, document_ids):
+            rows.append(row)
+            if len(rows) >= ROW_CHUNK:
+                batches.append(self._encode(document_type, rows))
+                rows = []
+        if rows:
+            batches.append(self._encode(document_type, rows))
+        return batches
+
+    @staticmethod
+    def _concat(batches):
+        return {
+            name: np.concatenate([batch[name] for batch in batches]) if batches else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+
+    def _latest(self):
+        return {
+            document_type: model.objects.order_by().aggregate(latest=Max('updated_at'))['latest']
+            for document_type, model in SOURCES.items()
+        }
+
+    def load(self):
+        """(Re)load every posted line"""
+        watermarks = self._latest()
+        batches = []
+        for document_type in SOURCES:
+            batches.extend(self._load(document_type))
+        self.columns = self._concat(batches)
+        self.watermarks = watermarks
+        self.loaded_at = self.checked_at = time.monotonic()
+
+    def refresh(self):
+        """Reload the lines of documents changed since the watermarks; returns the number of documents"""
+        latest = self._latest()
+        keys, batches = [], []
+        for document_type, model in SOURCES.items():
+            watermark = self.watermarks.get(document_type)
+            if latest[document_type] is None or latest[document_type] == watermark:
+                continue
+            changed = model.objects.order_by()
+            if watermark is not None:
+                changed = changed.filter(updated_at__gt=watermark - WATERMARK_OVERLAP)
+            document_ids = list(changed.values_list('pk', flat=True))
+            keys.extend(document_id * 2 + KINDS[document_type] for document_id in document_ids)
+            batches.extend(self._load(document_type, document_ids))
+
+        if keys:
+            keep = ~np.isin(self.columns['document'], np.array(keys, dtype=np.int64))
+            batches.insert(0, {name: column[keep] for name, column in self.columns.items()})
+            self.columns = self._concat(batches)
+        self.watermarks = latest
+        self.checked_at = time.monotonic()
+        return len(keys)
+
+    def _mask(self, columns, filters, month_from, month_to):
+        """Boolean row mask for the filters, or None when nothing is filtered out"""
+        mask = None
+        for selected in self._selections(columns, filters, month_from, month_to):
+            mask = selected if mask is None else mask & selected
+        return mask
+
+    def _selections(self, columns, filters, month_from, month_to):
+        if month_from is not None:
+            yield columns['month'] >= month_from
+        if month_to is not None:
+            yield columns['month'] <= month_to
+        for dimension, values in filters.items():
+            if dimension == 'kind':
+                codes = [KIND_LABELS.index(value) for value in values if value in KIND_LABELS]
+            elif dimension == 'month':
+                codes = [parse_month(value) for value in values]
+            elif dimension == 'category':
+                codes = self.categories.lookup(values)
+            elif dimension in DIMENSIONS:
+                codes = self._dictionary(dimension).lookup(_ids(values))
+            else:
+                raise CubeQueryError(f"unknown dimension {dimension!r}")
+            yield _member(columns[_column(dimension)], codes, self._size(columns, dimension))
+
+    def pivot(self, rows=(), filters=None, month_from=None, month_to=None):
+        """Revenue, expense, net and line count grouped by the rows dimensions.
+
+        filters maps a dimension to the values to keep (ids for contacts,
+        products and accounts, names for categories, YYYY-MM for months,
+        revenue/expense for kind).
+        """
+        filters = dict(filters or {})
+        for dimension in rows:
+            if dimension not in DIMENSIONS:
+                raise CubeQueryError(f"unknown dimension {dimension!r}")
+        # Customers are the contacts of invoice lines, vendors those of bill lines
+        for dimension, kind in (('customer', 'revenue'), ('vendor', 'expense')):
+            if dimension in rows or dimension in filters:
+                filters['kind'] = [kind]
+
+        # refresh() swaps in new columns, so a query works on the set it started with
+        columns = self.columns
+        sizes = [self._size(columns, dimension) for dimension in rows]
+        space = int(np.prod(sizes, dtype=np.float64)) * 2
+        dense = space <= DENSE_LIMIT
+        # The dense table keeps the kinds apart, so a kind filter is applied to it instead of the rows
+        kinds = [0, 1]
+        if dense and 'kind' in filters:
+            kinds = [KIND_LABELS.index(value) for value in filters.pop('kind') if value in KIND_LABELS]
+        mask = self._mask(columns, filters, month_from, month_to)
+
+        def take(name):
+            return columns[name] if mask is None else columns[name][mask]
+
+        kind, weight = take('kind'), take('weight')
+        group = np.zeros(len(kind), dtype=np.intp)
+        for dimension, size in zip(rows, sizes):
+            group = group * size + take(_column(dimension))
+
+        if dense:
+            # kind is the lowest digit of the key, so one pass sums revenue and expense apart
+            key = group * 2 + kind
+            lines = np.bincount(key, minlength=space).reshape(-1, 2)
+            sums = np.bincount(key, weights=weight, minlength=space).reshape(-1, 2)
+            excluded = [code for code in (0, 1) if code not in kinds]
+            lines[:, excluded] = 0
+            sums[:, excluded] = 0
+            keys = np.flatnonzero(lines.any(axis=1))
+            lines = lines[keys].sum(axis=1)
+            revenue, expense = sums[keys, 0], sums[keys, 1]
+        else:
+            order = np.argsort(group, kind='stable')
+            ordered = group[order]
+            starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]]) if len(ordered) else np.empty(0, dtype=np.intp)
+            keys = ordered[starts]
+            lines = np.diff(np.r_[starts, len(ordered)])
+            revenue_weight = np.where(kind == 0, weight, 0)[order]
+            expense_weight = weight[order] - revenue_weight
+            if len(starts):
+                revenue = np.add.reduceat(revenue_weight, starts)
+                expense = np.add.reduceat(expense_weight, starts)
+            else:
+                revenue = expense = np.empty(0)
+
+        codes = []
+        for size in reversed(sizes):
+            codes.append(keys % size)
+            keys = keys // size
+        codes.reverse()
+        # float64 sums of integer paise are exact below 2**53
+        return PivotResult(
+            list(rows), codes, np.rint(revenue).astype(np.int64), np.rint(expense).astype(np.int64), lines
+        )
+
+    def _size(self, columns, dimension):
+        if dimension == 'month':
+            return int(columns['month'].max()) + 1 if len(columns['month']) else 1
+        if dimension == 'kind':
+            return len(KIND_LABELS)
+        return max(len(self._dictionary(dimension)), 1)
+
+    def _dictionary(self, dimension):
+        return {
+            'customer': self.contacts, 'vendor': self.contacts, 'contact': self.contacts,
+            'product': self.products, 'category': self.categories, 'account': self.accounts,
+        }[dimension]
+
+    def labels(self, dimension, codes):
+        """{code: (key, label)} for the codes of one dimension in a pivot result"""
+        codes = set(codes)
+        if dimension == 'month':
+            return {code: (month_label(code), month_label(code)) for code in codes}
+        if dimension == 'kind':
+            return {code: (KIND_LABELS[code], KIND_LABELS[code]) for code in codes}
+
+        values = {code: self._dictionary(dimension).values[code] for code in codes}
+        if dimension == 'category':
+            return {code: (value, value) for code, value in values.items()}
+        model, field = {
+            'product': (Product, 'name'), 'account': (AnalyticalAccount, 'code'),
+        }.get(dimension, (Contact, 'name'))
+        names = dict(model.objects.filter(pk__in=values.values()).values_list('pk', field))
+        return {code: (value or None, names.get(value)) for code, value in values.items()}
+
+
+class PivotResult:
+    """Grouped measures of AnalyticsCube.pivot() as parallel arrays, amounts in paise"""
+
+    def __init__(self, rows, codes, revenue, expense, lines):
+        self.rows = rows
+        self.codes = codes
+        self.revenue = revenue
+        self.expense = expense
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.lines)
+
+    @property
+    def totals(self):
+        return _measures(int(self.revenue.sum()), int(self.expense.sum()), int(self.lines.sum()))
+
+    def records(self, sort=None, limit=None):
+        """(codes tuple, measures dict) per group, in key order or descending by a measure"""
+        if sort is None:
+            order = np.arange(len(self))
+        else:
+            values = {
+                'revenue': self.revenue, 'expense': self.expense,
+                'net': self.revenue - self.expense, 'lines': self.lines,
+            }[sort]
+            order = np.argsort(-values, kind='stable')
+        return [
+            (
+                tuple(int(column[index]) for column in self.codes),
+                _measures(int(self.revenue[index]), int(self.expense[index]), int(self.lines[index])),
+            )
+            for index in order[:limit]
+        ]
+
+
+def _member(column, codes, size):
+    """column isin codes, through a lookup table over the dense code space"""
+    table = np.zeros(max(size, 1), dtype=bool)
+    codes = [code for code in np.asarray(codes, dtype=np.int64).tolist() if 0 <= code < size]
+    table[codes] = True
+    return table[column]
+
+
+def _column(dimension):
+    return 'contact' if dimension in ('customer', 'vendor') else dimension
+
+
+def _ids(values):
+    try:
+        return [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise CubeQueryError('contact, product and account filters take ids')
+
+
+def _measures(revenue, expense, lines):
+    return {
+        'revenue': revenue / 100,
+        'expense': expense / 100,
+        'net': (revenue - expense) / 100,
+        'lines': lines,
+    }
+
+
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def get_cube():
+    """The process-wide cube, loaded on first use and refreshed at most every CUBE_REFRESH_SECONDS"""
+    global _cube
+    refresh_every = getattr(settings, 'CUBE_REFRESH_SECONDS', 30)
+    reload_every = getattr(settings, 'CUBE_FULL_RELOAD_SECONDS', 3600)
+    cube = _cube
+    now = time.monotonic()
+    if cube is not None and now - cube.checked_at < refresh_every:
+        return cube
+
+    with _cube_lock:
+        cube = _cube
+        now = time.monotonic()
+        if cube is None or now - cube.loaded_at >= reload_every:
+            # Built aside and swapped in, so running queries keep a consistent cube
+            fresh = AnalyticsCube()
+            fresh.load()
+            _cube = fresh
+        elif now - cube.checked_at >= refresh_every:
+            cube.refresh()
+        return _cube
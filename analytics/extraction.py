@@ -0,0 +1,76 @@
+"""Text, amount and date extraction from uploaded PDF documents.
+
+extract() runs in the process_documents worker processes. It reads a file
+page by page, runs the precompiled extractors over each page's text as it
+goes and stops at the page or time budget, so one huge upload cannot hold a
+worker indefinitely. Page texts are joined once at the end rather than
+concatenated page by page.
+"""
+import re
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.files.storage import default_storage
+from PyPDF2 import PdfReader
+
+
+AMOUNT_RE = re.compile(r'₹\s*(\d+(?:,\d{3})*(?:\.\d{2})?)')
+DATE_RE = re.compile(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})')
+DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y')
+
+# Largest value PDFDocument.extracted_amount holds
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+def largest_amount(text):
+    amounts = []
+    for match in AMOUNT_RE.findall(text):
+        try:
+            amount = Decimal(match.replace(',', ''))
+        except InvalidOperation:
+            continue
+        if amount <= MAX_AMOUNT:
+            amounts.append(amount)
+    return max(amounts, default=None)
+
+
+def first_date(text):
+    for match in DATE_RE.findall(text):
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(match, date_format).date()
+            except ValueError:
+                pass
+    return None
+
+
+def extract(name, max_pages, time_budget):
+    """Text, largest ₹ amount and first date of the stored PDF name, within the page and time budget.
+
+    At least one page is always read. Returns a dict with text, amount,
+    date, page_count and pages_extracted.
+    """
+    started = time.monotonic()
+    pages = []
+    amount = extracted_date = None
+    with default_storage.open(name, 'rb') as stored:
+        reader = PdfReader(stored)
+        page_count = len(reader.pages)
+        for number in range(min(page_count, max_pages)):
+            if pages and time.monotonic() - started > time_budget:
+                break
+            text = reader.pages[number].extract_text() or ''
+            pages.append(text)
+            page_amount = largest_amount(text)
+            if page_amount is not None and (amount is None or page_amount > amount):
+                amount = page_amount
+            if extracted_date is None:
+                extracted_date = first_date(text)
+    return {
+        'text': '\n'.join(pages),
+        'amount': amount,
+        'date': extracted_date,
+        'page_count': page_count,
+        'pages_extracted': len(pages),
+    }
@@ -0,0 +1,127 @@
+"""Maintenance of the DailyFinancialFact rollup.
+
+Facts are rebuilt a whole (document type, date) at a time: the rows for
+those dates are deleted and re-aggregated from the posted documents' lines,
+so a refresh is idempotent and catches edits, status changes and deletions
+alike. refresh_changed() finds the dates to rebuild from documents whose
+updated_at is past the stored watermark; the signals in analytics.signals
+rebuild the dates of single documents as they are saved.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Coalesce
+
+from transactions.models import CustomerInvoice, VendorBill
+from .models import DailyFinancialFact, FactRefreshState
+
+
+SOURCES = {
+    'customer_invoice': CustomerInvoice,
+    'vendor_bill': VendorBill,
+}
+
+# Rescanned behind the watermark to catch transactions that committed late
+# with an earlier updated_at; rebuilding a date twice is harmless
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+DATE_CHUNK = 500
+
+
+def document_type_of(model):
+    for document_type, source in SOURCES.items():
+        if source is model:
+            return document_type
+    return None
+
+
+def fact_rows(document_type, dates):
+    """Aggregated fact values of the posted documents of document_type dated in dates"""
+    rel = SOURCES[document_type]._meta.get_field('items')
+    item_model, document = rel.related_model, rel.field.name
+    return (
+        item_model.objects.filter(**{f'{document}__status': 'posted', f'{document}__date__in': dates})
+        .order_by()
+        .values(
+            fact_date=F(f'{document}__date'),
+            fact_contact=F(f'{document}__contact_id'),
+            fact_account=Coalesce('analytical_account_id', f'{document}__analytical_account_id'),
+            fact_category=F('product__category'),
+        )
+        .annotate(
+            amount=Sum(F('quantity') * F('unit_price')),
+            line_count=Count('pk'),
+            document_count=Count(document, distinct=True),
+        )
+    )
+
+
+def refresh_dates(document_type, dates):
+    """Rebuild the facts of document_type for each date in dates and return the rows written"""
+    dates = sorted(set(dates))
+    written = 0
+    for start in range(0, len(dates), DATE_CHUNK):
+        chunk = dates[start:start + DATE_CHUNK]
+        with transaction.atomic():
+            # Serialises rebuilds of one document type so concurrent ones cannot double insert
+            FactRefreshState.objects.get_or_create(document_type=document_type)
+            FactRefreshState.objects.select_for_update().filter(document_type=document_type).get()
+
+            DailyFinancialFact.objects.filter(document_type=document_type, date__in=chunk).delete()
+            facts = DailyFinancialFact.objects.bulk_create([
+                DailyFinancialFact(
+                    date=row['fact_date'],
+                    document_type=document_type,
+                    contact_id=row['fact_contact'],
+                    analytical_account_id=row['fact_account'],
+                    product_category=row['fact_category'] or '',
+                    amount=row['amount'] or 0,
+                    line_count=row['line_count'],
+                    document_count=row['document_count'],
+                )
+                for row in fact_rows(document_type, chunk)
+            ], batch_size=1000)
+            written += len(facts)
+    return written
+
+
+def rebuild(document_type, date_from=None, date_to=None):
+    """Rebuild every fact of document_type, optionally limited to a date range; returns (dates, rows written)"""
+    documents = SOURCES[document_type].objects.order_by()
+    existing = DailyFinancialFact.objects.filter(document_type=document_type)
+    if date_from:
+        documents = documents.filter(date__gte=date_from)
+        existing = existing.filter(date__gte=date_from)
+    if date_to:
+        documents = documents.filter(date__lte=date_to)
+        existing = existing.filter(date__lte=date_to)
+    # Dates that only have facts left belong to documents since deleted
+    dates = set(documents.values_list('date', flat=True).distinct())
+    dates.update(existing.values_list('date', flat=True).distinct())
+    return len(dates), refresh_dates(document_type, dates)
+
+
+def refresh_changed(document_type):
+    """Rebuild the dates of documents changed since the watermark and advance it.
+
+    Returns (number of dates rebuilt, fact rows written). Without a watermark
+    the whole document type is rebuilt.
+    """
+    model = SOURCES[document_type]
+    state, _ = FactRefreshState.objects.get_or_create(document_type=document_type)
+    latest = model.objects.order_by().aggregate(latest=Max('updated_at'))['latest']
+
+    if state.watermark is None:
+        rebuilt, written = rebuild(document_type)
+    else:
+        changed = model.objects.order_by().filter(updated_at__gt=state.watermark - WATERMARK_OVERLAP)
+        if latest is not None:
+            changed = changed.filter(updated_at__lte=latest)
+        dates = set(changed.values_list('date', flat=True).distinct())
+        rebuilt, written = len(dates), refresh_dates(document_type, dates)
+
+    if latest is not None and (state.watermark is None or latest > state.watermark):
+        state.watermark = latest
+        state.save(update_fields=['watermark', 'refreshed_at'])
+    return rebuilt, written
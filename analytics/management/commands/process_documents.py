@@ -0,0 +1,142 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from analytics import extraction
+from analytics.models import PDFDocument
+
+
+# Extractions queued per worker, so a worker never waits for this process to hand it the next document
+IN_FLIGHT_PER_WORKER = 2
+
+# Claims a worker holds longer than this are taken to be from a runner that died
+STALE_AFTER = timedelta(minutes=15)
+
+# Claims before a document whose worker keeps dying is given up on
+MAX_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = 'Extract text, amount and date from queued PDF documents in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking for new uploads every --interval seconds')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds between checks with --loop (default 5)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default PDF_INGEST_WORKERS)')
+        parser.add_argument('--retry-failed', action='store_true', help='Queue the failed documents again first')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'] or getattr(settings, 'PDF_INGEST_WORKERS', 1), 1)
+        budget = (getattr(settings, 'PDF_INGEST_MAX_PAGES', 500), getattr(settings, 'PDF_INGEST_TIME_BUDGET', 60))
+        if options['retry_failed']:
+            PDFDocument.objects.filter(status='failed').update(status='queued', attempts=0, processing_error='')
+
+        pool = self.start_pool(workers)
+        in_flight = {}
+        # Documents held by a worker that died; run one at a time until settled, so only the culprit uses up its attempts
+        self.suspects = set()
+        try:
+            while True:
+                self.requeue(PDFDocument.objects.filter(status='processing', claimed_at__lt=timezone.now() - STALE_AFTER))
+                if self.suspects:
+                    self.suspects = set(PDFDocument.objects.filter(
+                        pk__in=self.suspects, status__in=['queued', 'processing']
+                    ).values_list('pk', flat=True))
+                capacity = 1 if self.suspects else workers * IN_FLIGHT_PER_WORKER
+                claimed = self.claim(capacity - len(in_flight))
+                try:
+                    for pk, name in claimed:
+                        in_flight[pool.submit(extraction.extract, name, *budget)] = pk
+                except BrokenProcessPool:
+                    pool = self.restart_pool(pool, workers, in_flight, [pk for pk, _ in claimed])
+                    continue
+                if not in_flight:
+                    if not options['loop']:
+                        return
+                    time.sleep(options['interval'])
+                    continue
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    pk = in_flight.pop(future)
+                    self.suspects.discard(pk)
+                    try:
+                        self.record(pk, future.result())
+                    except BrokenProcessPool:
+                        # A dying worker takes every pending extraction with it; which document killed it is unknown
+                        broken = True
+                        in_flight[future] = pk
+                    except Exception as e:
+                        PDFDocument.objects.filter(pk=pk).update(status='failed', processing_error=str(e) or repr(e))
+                        self.stderr.write(self.style.ERROR(f'Document {pk}: {e!r}'))
+                if broken:
+                    pool = self.restart_pool(pool, workers, in_flight)
+        finally:
+            # Claims of anything still running go back to the queue for the next run
+            self.requeue(PDFDocument.objects.filter(pk__in=list(in_flight.values())))
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def start_pool(self, workers):
+        # Spawned workers set Django up before importing the extraction code
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+
+    def restart_pool(self, pool, workers, in_flight, claimed=()):
+        """A fresh pool after a worker died, with every claim the broken one held requeued"""
+        self.stderr.write(self.style.ERROR('A worker process died; requeueing its documents'))
+        held = [*in_flight.values(), *claimed]
+        self.requeue(PDFDocument.objects.filter(pk__in=held))
+        self.suspects.update(held)
+        in_flight.clear()
+        pool.shutdown(wait=False, cancel_futures=True)
+        return self.start_pool(workers)
+
+    def claim(self, limit):
+        """(pk, file name) of up to limit queued documents, oldest first, now marked processing"""
+        if limit <= 0:
+            return []
+        claimed = []
+        queued = PDFDocument.objects.filter(status='queued').order_by('uploaded_at', 'pk').values_list('pk', 'pdf_file')
+        for pk, name in queued[:limit]:
+            # A concurrent runner that got there first leaves nothing to update
+            if PDFDocument.objects.filter(pk=pk, status='queued').update(
+                status='processing', claimed_at=timezone.now(), attempts=F('attempts') + 1
+            ):
+                claimed.append((pk, name))
+        return claimed
+
+    def requeue(self, documents):
+        """Put claimed documents back in the queue, failing those out of attempts"""
+        documents = documents.filter(status='processing')
+        documents.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued', claimed_at=None)
+        documents.update(
+            status='failed', processing_error=f'Extraction did not finish in {MAX_ATTEMPTS} attempts'
+        )
+
+    def record(self, pk, result):
+        PDFDocument.objects.filter(pk=pk).update(
+            status='processed',
+            processed=True,
+            processed_at=timezone.now(),
+            processing_error='',
+            extracted_text=result['text'],
+            extracted_amount=result['amount'],
+            extracted_date=result['date'],
+            page_count=result['page_count'],
+            pages_extracted=result['pages_extracted'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Document {pk}: {result['pages_extracted']} of {result['page_count']} page(s)"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from analytics.facts import SOURCES, rebuild, refresh_changed
+
+
+class Command(BaseCommand):
+    help = 'Roll documents changed since the last run up into the daily financial facts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', dest='document_types', action='append', choices=list(SOURCES),
+                            help='Limit to one document type (repeatable)')
+        parser.add_argument('--full', action='store_true', help='Rebuild every date instead of only changed documents')
+        parser.add_argument('--from', dest='date_from', help='Rebuild the dates on or after YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Rebuild the dates on or before YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        ranged = options['full'] or options['date_from'] or options['date_to']
+        for document_type in options['document_types'] or list(SOURCES):
+            if ranged:
+                dates, written = rebuild(document_type, options['date_from'], options['date_to'])
+            else:
+                dates, written = refresh_changed(document_type)
+            self.stdout.write(self.style.SUCCESS(f"{document_type}: rebuilt {dates} date(s), {written} fact row(s)"))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from analytics import reports
+from analytics.models import AnalyticsReport, ReportSchedule
+
+
+class Command(BaseCommand):
+    help = 'Generate the scheduled analytics reports that are due and warm their chart cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking for due schedules every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between checks with --loop (default 60)')
+        parser.add_argument('--schedule', type=int, action='append', dest='schedule_ids',
+                            help='Run this schedule now whether due or not (repeatable)')
+
+    def handle(self, *args, **options):
+        if options['schedule_ids']:
+            schedules = list(ReportSchedule.objects.filter(pk__in=options['schedule_ids']))
+            if len(schedules) != len(set(options['schedule_ids'])):
+                raise CommandError('Unknown schedule id')
+            for schedule in schedules:
+                self.run(schedule, timezone.now())
+            return
+
+        while True:
+            self.run_due()
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def run_due(self):
+        now = timezone.now()
+        due = ReportSchedule.objects.filter(Q(next_run_at__isnull=True) | Q(next_run_at__lte=now), is_active=True)
+        for schedule in due.order_by('next_run_at', 'pk'):
+            # Claim the run by moving next_run_at on; a concurrent runner that got there first updates nothing
+            claimed = ReportSchedule.objects.filter(pk=schedule.pk, next_run_at=schedule.next_run_at)
+            if not claimed.update(next_run_at=schedule.following_run(now)):
+                continue
+            self.run(schedule, now)
+
+    def run(self, schedule, now):
+        run_date = timezone.localtime(now).date()
+        start_date, end_date = schedule.date_range(run_date)
+        report = AnalyticsReport(
+            name=f'{schedule.name} {run_date:%Y-%m-%d}',
+            report_type=schedule.report_type,
+            description=f'Generated by schedule "{schedule.name}"',
+            generated_by=schedule.created_by,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        started = time.monotonic()
+        try:
+            reports.generate(report, warm=['svg'])
+        except Exception as e:
+            ReportSchedule.objects.filter(pk=schedule.pk).update(last_run_at=now, last_error=str(e))
+            self.stderr.write(self.style.ERROR(f'{schedule}: {e}'))
+            return
+
+        ReportSchedule.objects.filter(pk=schedule.pk).update(last_run_at=now, last_report=report, last_error='')
+        self.stdout.write(self.style.SUCCESS(
+            f'{schedule}: report {report.pk} for {start_date} to {end_date} in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:01
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def backfill_facts(apps, schema_editor):
+    # Same aggregation as analytics.facts.fact_rows(), over every posted date at once
+    DailyFinancialFact = apps.get_model('analytics', 'DailyFinancialFact')
+    FactRefreshState = apps.get_model('analytics', 'FactRefreshState')
+    for document_type, model_name, item_model_name, document in (
+        ('customer_invoice', 'CustomerInvoice', 'CustomerInvoiceItem', 'customer_invoice'),
+        ('vendor_bill', 'VendorBill', 'VendorBillItem', 'vendor_bill'),
+    ):
+        rows = (
+            apps.get_model('transactions', item_model_name).objects.filter(**{f'{document}__status': 'posted'})
+            .order_by()
+            .values(
+                fact_date=F(f'{document}__date'),
+                fact_contact=F(f'{document}__contact_id'),
+                fact_account=Coalesce('analytical_account_id', f'{document}__analytical_account_id'),
+                fact_category=F('product__category'),
+            )
+            .annotate(
+                amount=Sum(F('quantity') * F('unit_price')),
+                line_count=Count('pk'),
+                document_count=Count(document, distinct=True),
+            )
+        )
+        DailyFinancialFact.objects.bulk_create(
+            [
+                DailyFinancialFact(
+                    date=row['fact_date'],
+                    document_type=document_type,
+                    contact_id=row['fact_contact'],
+                    analytical_account_id=row['fact_account'],
+                    product_category=row['fact_category'] or '',
+                    amount=row['amount'] or 0,
+                    line_count=row['line_count'],
+                    document_count=row['document_count'],
+                )
+                for row in rows.iterator()
+            ],
+            batch_size=1000
+        )
+        # Everything up to now is rolled up, so refresh_facts starts from here rather than rebuilding it all again
+        latest = apps.get_model('transactions', model_name).objects.order_by().aggregate(latest=Max('updated_at'))['latest']
+        FactRefreshState.objects.create(document_type=document_type, watermark=latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_list_pagination_indexes'),
+        ('analytics', '0001_initial'),
+        ('transactions', '0008_document_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FactRefreshState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(max_length=20, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, help_text='Latest document updated_at already rolled up', null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyFinancialFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('document_type', models.CharField(choices=[('customer_invoice', 'Customer Invoice'), ('vendor_bill', 'Vendor Bill')], max_length=20)),
+                ('product_category', models.CharField(blank=True, max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('document_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('analytical_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.analyticalaccount')),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.contact')),
+            ],
+            options={
+                'ordering': ['date', 'document_type'],
+                'indexes': [models.Index(fields=['document_type', 'date'], name='fact_type_date_idx'), models.Index(fields=['contact', 'document_type'], name='fact_contact_type_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_daily_financial_facts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analyticsreport',
+            index=models.Index(fields=['generated_at', 'id'], name='report_generated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:10
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analytics', '0003_report_generated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('report_type', models.CharField(choices=[('revenue', 'Revenue Analysis'), ('expense', 'Expense Analysis'), ('profit_loss', 'Profit & Loss'), ('cash_flow', 'Cash Flow'), ('budget_variance', 'Budget Variance'), ('customer_analysis', 'Customer Analysis'), ('vendor_analysis', 'Vendor Analysis')], max_length=20)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='monthly', max_length=10)),
+                ('period', models.CharField(choices=[('previous_month', 'Previous Month'), ('month_to_date', 'Month to Date'), ('year_to_date', 'Year to Date'), ('last_12_months', 'Last 12 Months')], default='previous_month', max_length=20)),
+                ('run_time', models.TimeField(default=datetime.time(5, 0))),
+                ('is_active', models.BooleanField(default=True)),
+                ('next_run_at', models.DateTimeField(blank=True, help_text='Empty means due now', null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_schedules', to=settings.AUTH_USER_MODEL)),
+                ('last_report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='analytics.analyticsreport')),
+            ],
+            options={
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['is_active', 'next_run_at'], name='schedule_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:24
+
+from django.db import migrations, models
+
+
+def mark_processed(apps, schema_editor):
+    # Documents extracted at upload time are done; the rest are queued for the worker
+    PDFDocument = apps.get_model('analytics', 'PDFDocument')
+    PDFDocument.objects.filter(processed=True).update(status='processed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_report_schedules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When a worker started on the document', null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='pages_extracted',
+            field=models.PositiveIntegerField(blank=True, help_text='Fewer than page_count when the page or time budget ran out', null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='processing_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('processed', 'Processed'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='pdfdocument',
+            index=models.Index(fields=['status', 'uploaded_at'], name='pdfdoc_status_uploaded_idx'),
+        ),
+        migrations.RunPython(mark_processed, migrations.RunPython.noop),
+    ]
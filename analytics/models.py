@@ -1,9 +1,17 @@
 from django.db import models
-from core.models import User
+from django.utils import timezone
+from core.models import User, Contact, AnalyticalAccount
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
 
 class PDFDocument(models.Model):
-    """Model to store uploaded PDF documents"""
+    """Model to store uploaded PDF documents.
+    
+    Uploads are saved as queued; the process_documents command claims them,
+    extracts their text in worker processes and records the outcome, so the
+    table doubles as the extraction job queue.
+    """
     DOCUMENT_TYPES = [
         ('invoice', 'Invoice'),
         ('bill', 'Bill'),
@@ -12,6 +20,13 @@ class PDFDocument(models.Model):
         ('other', 'Other'),
     ]
     
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+    
     title = models.CharField(max_length=255)
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES, default='other')
     pdf_file = models.FileField(upload_to='documents/%Y/%m/')
@@ -21,12 +36,26 @@ class PDFDocument(models.Model):
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_documents')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True, help_text="When a worker started on the document")
+    processed_at = models.DateTimeField(null=True, blank=True)
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    pages_extracted = models.PositiveIntegerField(null=True, blank=True, help_text="Fewer than page_count when the page or time budget ran out")
+    processing_error = models.TextField(blank=True)
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['status', 'uploaded_at'], name='pdfdoc_status_uploaded_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.document_type})"
+    
+    @property
+    def is_partial(self):
+        return self.page_count is not None and self.pages_extracted is not None and self.pages_extracted < self.page_count
 
 
 class AnalyticsReport(models.Model):
@@ -53,6 +82,122 @@ class AnalyticsReport(models.Model):
     
     class Meta:
         ordering = ['-generated_at']
+        # Keyset pagination of the saved report list
+        indexes = [
+            models.Index(fields=['generated_at', 'id'], name='report_generated_id_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} - {self.get_report_type_display()}"
+
+
+class ReportSchedule(models.Model):
+    """Report generated ahead of time by the run_report_scheduler command.
+    
+    Daily schedules run every day, weekly ones on Mondays and monthly ones on
+    the 1st, each at run_time local time. The period is resolved against the
+    run date, so a monthly previous_month schedule produces the month-end report.
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+    
+    PERIOD_CHOICES = [
+        ('previous_month', 'Previous Month'),
+        ('month_to_date', 'Month to Date'),
+        ('year_to_date', 'Year to Date'),
+        ('last_12_months', 'Last 12 Months'),
+    ]
+    
+    name = models.CharField(max_length=255)
+    report_type = models.CharField(max_length=20, choices=AnalyticsReport.REPORT_TYPES)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='monthly')
+    period = models.CharField(max_length=20, choices=PERIOD_CHOICES, default='previous_month')
+    run_time = models.TimeField(default=time(5, 0))
+    is_active = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(null=True, blank=True, help_text="Empty means due now")
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_report = models.ForeignKey(AnalyticsReport, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_schedules')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['is_active', 'next_run_at'], name='schedule_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_frequency_display()}, {self.get_period_display()})"
+    
+    def date_range(self, run_date):
+        """(start, end) of the period as seen on run_date"""
+        if self.period == 'previous_month':
+            end_date = run_date.replace(day=1) - timedelta(days=1)
+            return end_date.replace(day=1), end_date
+        if self.period == 'month_to_date':
+            return run_date.replace(day=1), run_date
+        if self.period == 'year_to_date':
+            return run_date.replace(month=1, day=1), run_date
+        from .aggregations import dashboard_date_range
+        return dashboard_date_range(run_date)
+    
+    def following_run(self, after):
+        """The first run time of this schedule strictly after the aware datetime after"""
+        local = timezone.localtime(after)
+        day = local.date()
+        while True:
+            if self.frequency == 'daily' or (
+                self.frequency == 'weekly' and day.weekday() == 0
+            ) or (
+                self.frequency == 'monthly' and day.day == 1
+            ):
+                candidate = timezone.make_aware(datetime.combine(day, self.run_time))
+                if candidate > after:
+                    return candidate
+            day += timedelta(days=1)
+
+
+class DailyFinancialFact(models.Model):
+    """Posted invoice and bill lines rolled up per day, contact, analytical account and product category.
+    
+    Maintained by analytics.facts; document_count counts each document once
+    per row it has lines in.
+    """
+    DOCUMENT_TYPES = [
+        ('customer_invoice', 'Customer Invoice'),
+        ('vendor_bill', 'Vendor Bill'),
+    ]
+    
+    date = models.DateField()
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='+')
+    analytical_account = models.ForeignKey(AnalyticalAccount, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    product_category = models.CharField(max_length=100, blank=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    line_count = models.PositiveIntegerField(default=0)
+    document_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date', 'document_type']
+        indexes = [
+            models.Index(fields=['document_type', 'date'], name='fact_type_date_idx'),
+            models.Index(fields=['contact', 'document_type'], name='fact_contact_type_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.get_document_type_display()} {self.contact_id}: {self.amount}"
+
+
+class FactRefreshState(models.Model):
+    """Per document type watermark of the last DailyFinancialFact refresh"""
+    document_type = models.CharField(max_length=20, unique=True)
+    watermark = models.DateTimeField(null=True, blank=True, help_text="Latest document updated_at already rolled up")
+    refreshed_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.name} - {self.get_report_type_display()}"
\ No newline at end of file
+        return f"{self.document_type} up to {self.watermark}"
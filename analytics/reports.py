@@ -0,0 +1,440 @@
+"""Saved analytics reports: computation and rendering.
+
+compute() runs one of AnalyticsReport.REPORT_TYPES over a date range as a
+few aggregate queries and returns a JSON-safe table:
+
+    {'report_type', 'start_date', 'end_date',
+     'columns': [[key, label], ...], 'rows': [{key: value}, ...], 'totals': {key: value}}
+
+Amounts are decimal strings with two places, dates and months ISO strings,
+percentages floats rounded to one place (None where undefined). The result
+is stored in AnalyticsReport.data_json; render_chart() and write_csv()
+work from that stored table alone, so a saved report is never recomputed
+and stays as it was when generated.
+"""
+import csv
+from datetime import date
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.db.models import Avg, Count, DecimalField, Max, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from budgets.models import Budget
+from transactions.models import CustomerInvoice, Payment, VendorBill
+from . import charts
+from .chart_cache import ChartCache
+from .aggregations import month_starts, monthly_series
+
+
+CENTS = Decimal('0.01')
+
+# Contacts drawn in the customer/vendor analysis charts
+CHART_CONTACTS = 10
+
+
+def _amount(value):
+    return str(Decimal(value or 0).quantize(CENTS))
+
+
+def _percent(part, whole):
+    if not whole:
+        return None
+    return round(float(Decimal(part) / Decimal(whole) * 100), 1)
+
+
+def _month(value):
+    return value.date() if hasattr(value, 'date') else value
+
+
+def document_report(document_type, start_date, end_date):
+    """Monthly totals, document counts, averages and growth of one document type"""
+    amount, count = ('revenue', 'invoice_count') if document_type == 'customer_invoice' else ('expense', 'bill_count')
+    rows, previous = [], None
+    total, documents = Decimal('0'), 0
+    for entry in monthly_series(start_date, end_date):
+        value = entry[amount]
+        rows.append({
+            'month': entry['month'].isoformat(),
+            'amount': _amount(value),
+            'documents': entry[count],
+            'average': _amount(value / entry[count]) if entry[count] else _amount(0),
+            'growth_pct': _percent(value - previous, previous) if previous is not None else None,
+        })
+        previous = value
+        total += value
+        documents += entry[count]
+    return {
+        'columns': [
+            ['month', 'Month'],
+            ['amount', 'Revenue' if amount == 'revenue' else 'Expenses'],
+            ['documents', 'Invoices' if amount == 'revenue' else 'Bills'],
+            ['average', 'Average'],
+            ['growth_pct', 'Growth %'],
+        ],
+        'rows': rows,
+        'totals': {
+            'amount': _amount(total),
+            'documents': documents,
+            'average': _amount(total / documents) if documents else _amount(0),
+        },
+    }
+
+
+def revenue_report(start_date, end_date):
+    return document_report('customer_invoice', start_date, end_date)
+
+
+def expense_report(start_date, end_date):
+    return document_report('vendor_bill', start_date, end_date)
+
+
+def profit_loss_report(start_date, end_date):
+    rows = []
+    totals = {'revenue': Decimal('0'), 'expense': Decimal('0'), 'profit': Decimal('0')}
+    for entry in monthly_series(start_date, end_date):
+        rows.append({
+            'month': entry['month'].isoformat(),
+            'revenue': _amount(entry['revenue']),
+            'expense': _amount(entry['expense']),
+            'profit': _amount(entry['profit']),
+            'margin_pct': _percent(entry['profit'], entry['revenue']),
+        })
+        for name in totals:
+            totals[name] += entry[name]
+    return {
+        'columns': [
+            ['month', 'Month'],
+            ['revenue', 'Revenue'],
+            ['expense', 'Expenses'],
+            ['profit', 'Profit'],
+            ['margin_pct', 'Margin %'],
+        ],
+        'rows': rows,
+        'totals': {
+            **{name: _amount(value) for name, value in totals.items()},
+            'margin_pct': _percent(totals['profit'], totals['revenue']),
+        },
+    }
+
+
+def cash_flow_report(start_date, end_date):
+    """Payments received against invoices and made against bills, per month"""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    flows = {
+        _month(month): (inflow, outflow)
+        for month, inflow, outflow in (
+            Payment.objects.filter(date__range=[start_date.replace(day=1), end_date])
+            .order_by()
+            .annotate(month=TruncMonth('date'))
+            .values_list('month')
+            .annotate(
+                inflow=Coalesce(Sum('amount', filter=Q(customer_invoice__isnull=False)), Decimal('0'), output_field=money),
+                outflow=Coalesce(Sum('amount', filter=Q(vendor_bill__isnull=False)), Decimal('0'), output_field=money),
+            )
+        )
+    }
+
+    rows = []
+    inflows, outflows = Decimal('0'), Decimal('0')
+    for month in month_starts(start_date, end_date):
+        inflow, outflow = flows.get(month, (Decimal('0'), Decimal('0')))
+        inflows += inflow
+        outflows += outflow
+        rows.append({
+            'month': month.isoformat(),
+            'inflow': _amount(inflow),
+            'outflow': _amount(outflow),
+            'net': _amount(inflow - outflow),
+            'cumulative': _amount(inflows - outflows),
+        })
+    return {
+        'columns': [
+            ['month', 'Month'],
+            ['inflow', 'Received'],
+            ['outflow', 'Paid'],
+            ['net', 'Net'],
+            ['cumulative', 'Cumulative'],
+        ],
+        'rows': rows,
+        'totals': {
+            'inflow': _amount(inflows),
+            'outflow': _amount(outflows),
+            'net': _amount(inflows - outflows),
+        },
+    }
+
+
+def budget_variance_report(start_date, end_date):
+    """Budgets whose period overlaps the range, against their actuals over the whole period"""
+    budgets = (
+        Budget.objects.filter(is_active=True, start_date__lte=end_date, end_date__gte=start_date)
+        .exclude(status='cancelled')
+        .with_actuals()
+        .order_by('start_date', 'name')
+        .values_list('name', 'analytical_account__name', 'start_date', 'end_date', 'budgeted_amount', 'ledger_actual')
+    )
+
+    rows = []
+    budgeted_total, actual_total = Decimal('0'), Decimal('0')
+    for name, account, budget_start, budget_end, budgeted, actual in budgets:
+        budgeted_total += budgeted
+        actual_total += actual
+        rows.append({
+            'budget': name,
+            'account': account,
+            'start_date': budget_start.isoformat(),
+            'end_date': budget_end.isoformat(),
+            'budgeted': _amount(budgeted),
+            'actual': _amount(actual),
+            'variance': _amount(actual - budgeted),
+            'achievement_pct': _percent(actual, budgeted),
+        })
+    return {
+        'columns': [
+            ['budget', 'Budget'],
+            ['account', 'Analytical Account'],
+            ['start_date', 'From'],
+            ['end_date', 'To'],
+            ['budgeted', 'Budgeted'],
+            ['actual', 'Actual'],
+            ['variance', 'Variance'],
+            ['achievement_pct', 'Achievement %'],
+        ],
+        'rows': rows,
+        'totals': {
+            'budgeted': _amount(budgeted_total),
+            'actual': _amount(actual_total),
+            'variance': _amount(actual_total - budgeted_total),
+            'achievement_pct': _percent(actual_total, budgeted_total),
+        },
+    }
+
+
+def contact_report(model, start_date, end_date):
+    """Posted documents of model per contact, largest total first"""
+    contacts = (
+        model.objects.filter(status='posted', date__range=[start_date, end_date])
+        .order_by()
+        .values_list('contact__name')
+        .annotate(
+            documents=Count('pk'),
+            total=Sum('total_amount'),
+            paid=Sum('paid_amount'),
+            outstanding=Sum('remaining_amount'),
+            average=Avg('total_amount'),
+            last_date=Max('date'),
+        )
+        .order_by('-total', 'contact__name')
+    )
+
+    rows = []
+    totals = {'documents': 0, 'total': Decimal('0'), 'paid': Decimal('0'), 'outstanding': Decimal('0')}
+    for name, documents, total, paid, outstanding, average, last_date in contacts:
+        totals['documents'] += documents
+        totals['total'] += total
+        totals['paid'] += paid
+        totals['outstanding'] += outstanding
+        rows.append({
+            'contact': name,
+            'documents': documents,
+            'total': _amount(total),
+            'paid': _amount(paid),
+            'outstanding': _amount(outstanding),
+            'average': _amount(average),
+            'last_date': last_date.isoformat(),
+        })
+
+    customers = model is CustomerInvoice
+    return {
+        'columns': [
+            ['contact', 'Customer' if customers else 'Vendor'],
+            ['documents', 'Invoices' if customers else 'Bills'],
+            ['total', 'Invoiced' if customers else 'Billed'],
+            ['paid', 'Paid'],
+            ['outstanding', 'Outstanding'],
+            ['average', 'Average'],
+            ['last_date', 'Last Document'],
+        ],
+        'rows': rows,
+        'totals': {
+            'documents': totals['documents'],
+            'total': _amount(totals['total']),
+            'paid': _amount(totals['paid']),
+            'outstanding': _amount(totals['outstanding']),
+        },
+    }
+
+
+def customer_analysis_report(start_date, end_date):
+    return contact_report(CustomerInvoice, start_date, end_date)
+
+
+def vendor_analysis_report(start_date, end_date):
+    return contact_report(VendorBill, start_date, end_date)
+
+
+def _values(data, key):
+    return [float(row[key]) for row in data['rows']]
+
+
+def _months(data):
+    return [row['month'] for row in data['rows']]
+
+
+def _month_labels(data):
+    return [month[:7] for month in _months(data)]
+
+
+def document_chart(data, **options):
+    amount = data['columns'][1][1]
+    color = '#4CAF50' if data['report_type'] == 'revenue' else '#f44336'
+    return charts.render(
+        charts.grouped_bar_chart,
+        title=f'{amount} by Month',
+        labels=_month_labels(data),
+        groups=[(amount, _values(data, 'amount'), color)],
+        xlabel='Month',
+        empty_message='No data available',
+        **options,
+    )
+
+
+def profit_loss_chart(data, **options):
+    return charts.render(
+        charts.monthly_line_chart,
+        title='Profit & Loss',
+        months=[date.fromisoformat(month) for month in _months(data)],
+        lines=[
+            ('Revenue', _values(data, 'revenue'), '#4CAF50', 'o'),
+            ('Expenses', _values(data, 'expense'), '#f44336', 's'),
+            ('Profit', _values(data, 'profit'), '#2196F3', '^'),
+        ],
+        **options,
+    )
+
+
+def cash_flow_chart(data, **options):
+    return charts.render(
+        charts.grouped_bar_chart,
+        title='Cash Flow',
+        labels=_month_labels(data),
+        groups=[
+            ('Received', _values(data, 'inflow'), '#4CAF50'),
+            ('Paid', _values(data, 'outflow'), '#f44336'),
+            ('Net', _values(data, 'net'), '#2196F3'),
+        ],
+        xlabel='Month',
+        empty_message='No data available',
+        **options,
+    )
+
+
+def budget_variance_chart(data, **options):
+    return charts.render(
+        charts.grouped_bar_chart,
+        title='Budget vs Actual',
+        labels=[row['budget'] for row in data['rows']],
+        groups=[
+            ('Budgeted', _values(data, 'budgeted'), '#2196F3'),
+            ('Actual', _values(data, 'actual'), '#FF9800'),
+        ],
+        xlabel='Budget',
+        empty_message='No budget data available',
+        **options,
+    )
+
+
+def contact_chart(data, **options):
+    top = data['rows'][:CHART_CONTACTS]
+    contact, total = data['columns'][0][1], data['columns'][2][1]
+    return charts.render(
+        charts.grouped_bar_chart,
+        title=f'Top {contact}s',
+        labels=[row['contact'] for row in top],
+        groups=[
+            (total, [float(row['total']) for row in top], '#4CAF50'),
+            ('Outstanding', [float(row['outstanding']) for row in top], '#FF9800'),
+        ],
+        xlabel=contact,
+        empty_message=f'No {contact.lower()} data available',
+        **options,
+    )
+
+
+# report_type: (computation, chart drawn from the stored result)
+REPORTS = {
+    'revenue': (revenue_report, document_chart),
+    'expense': (expense_report, document_chart),
+    'profit_loss': (profit_loss_report, profit_loss_chart),
+    'cash_flow': (cash_flow_report, cash_flow_chart),
+    'budget_variance': (budget_variance_report, budget_variance_chart),
+    'customer_analysis': (customer_analysis_report, contact_chart),
+    'vendor_analysis': (vendor_analysis_report, contact_chart),
+}
+
+
+def compute(report_type, start_date, end_date):
+    """The JSON-safe result table of report_type over start_date..end_date"""
+    computation, _ = REPORTS[report_type]
+    data = computation(start_date, end_date)
+    return {
+        'report_type': report_type,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        **data,
+    }
+
+
+def render_chart(data, image_format='png', figsize=None):
+    """The chart of a computed report, drawn from its stored result"""
+    _, chart = REPORTS[data['report_type']]
+    options = {'image_format': image_format}
+    if figsize:
+        options['figsize'] = figsize
+    return chart(data, **options)
+
+
+def write_csv(data, output):
+    """Write a computed report's table to a csv file object, totals as the last row"""
+    writer = csv.writer(output)
+    keys = [key for key, _ in data['columns']]
+    writer.writerow([label for _, label in data['columns']])
+    for row in data['rows']:
+        writer.writerow(['' if row.get(key) is None else row[key] for key in keys])
+    if data['totals']:
+        totals = data['totals']
+        writer.writerow(['Total'] + ['' if totals.get(key) is None else totals[key] for key in keys[1:]])
+
+
+def snapshot_stamp(report):
+    """Chart cache fingerprint of a saved report; its data never changes once stored"""
+    return {'report': (report.pk, report.generated_at)}
+
+
+def cached_chart(report, image_format='png', figsize=None, cache=None):
+    """The chart of a saved report through the chart cache"""
+    cache = cache or ChartCache()
+    return cache.get_or_render(
+        f'report.{image_format}', [figsize], snapshot_stamp(report),
+        lambda: render_chart(report.data_json, image_format=image_format, figsize=figsize)
+    )
+
+
+def generate(report, warm=()):
+    """Compute report over its date range, attach its PNG chart and save it.
+    
+    warm lists further image formats to render into the chart cache now, so
+    the first viewer does not wait for them.
+    """
+    report.data_json = compute(report.report_type, report.start_date, report.end_date)
+    name = f'{report.name}_{report.report_type}.png'
+    report.chart_image.save(name, ContentFile(render_chart(report.data_json), name=name), save=False)
+    report.save()
+    for image_format in warm:
+        try:
+            cached_chart(report, image_format)
+        except charts.ChartTimeout:
+            # Warming is best effort; the first viewer renders it instead
+            pass
+    return report
@@ -0,0 +1,47 @@
+"""Keep the DailyFinancialFact rollup in step with single-document changes"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from transactions.models import CustomerInvoice, VendorBill
+from transactions.signals import documents_changed
+from . import facts
+
+
+def schedule_refresh(model, dates):
+    """Rebuild the facts of these dates once the current transaction commits"""
+    document_type = facts.document_type_of(model)
+    dates = {day for day in dates if day is not None}
+    if document_type and dates:
+        transaction.on_commit(lambda: facts.refresh_dates(document_type, dates))
+
+
+@receiver(pre_save, sender=CustomerInvoice)
+@receiver(pre_save, sender=VendorBill)
+def remember_stored_document(sender, instance, update_fields=None, **kwargs):
+    # A document moving to another date or out of 'posted' changes the facts of its old date too
+    instance._fact_stored = None
+    if instance.pk and not instance._state.adding:
+        if update_fields is None or {'date', 'status'} & set(update_fields):
+            instance._fact_stored = sender.objects.filter(pk=instance.pk).values('date', 'status').first()
+
+
+@receiver(post_save, sender=CustomerInvoice)
+@receiver(post_save, sender=VendorBill)
+def refresh_saved_document(sender, instance, update_fields=None, **kwargs):
+    stored = getattr(instance, '_fact_stored', None)
+    was_posted = stored is not None and stored['status'] == 'posted'
+    if instance.status == 'posted' or was_posted:
+        schedule_refresh(sender, {instance.date, stored['date'] if stored else None})
+
+
+@receiver(post_delete, sender=CustomerInvoice)
+@receiver(post_delete, sender=VendorBill)
+def refresh_deleted_document(sender, instance, **kwargs):
+    if instance.status == 'posted':
+        schedule_refresh(sender, {instance.date})
+
+
+@receiver(documents_changed)
+def refresh_changed_documents(sender, dates, **kwargs):
+    schedule_refresh(sender, dates)
@@ -1,10 +1,14 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
     path('', views.analytics_dashboard, name='analytics_dashboard'),
+    re_path(r'^charts/(?P<kind>[a-z-]+)\.(?P<image_format>png|svg)$', views.chart_image_view, name='analytics_chart'),
+    path('pivot/', views.pivot_view, name='analytics_pivot'),
     path('pdf/upload/', views.pdf_upload_view, name='pdf_upload'),
     path('pdf/list/', views.pdf_list_view, name='pdf_list'),
     path('pdf/<int:pk>/', views.pdf_detail_view, name='pdf_detail'),
+    path('reports/', views.report_list_view, name='analytics_report_list'),
     path('reports/generate/', views.generate_custom_report, name='generate_custom_report'),
+    re_path(r'^reports/(?P<pk>[0-9]+)\.(?P<output_format>png|svg|csv|json)$', views.report_render_view, name='analytics_report_render'),
 ]
\ No newline at end of file
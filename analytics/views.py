@@ -1,29 +1,24 @@
 import json
 import io
-import base64
-from datetime import datetime, timedelta
-from decimal import Decimal
-
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import pandas as pd
-import numpy as np
-from PyPDF2 import PdfReader
+import time
+from datetime import date, datetime
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseBadRequest
 from django.db.models import Sum, Count, Q
-from django.utils import timezone
-from django.core.files.base import ContentFile
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 from core.models import User, Contact
+from core.pagination import keyset_paginate
 from transactions.models import CustomerInvoice, VendorBill, Payment, SalesOrder, PurchaseOrder
 from budgets.models import Budget
-from .models import PDFDocument, AnalyticsReport
+from .models import PDFDocument, AnalyticsReport, DailyFinancialFact, ReportSchedule
+from . import charts, cube as cube_module, reports
+from .aggregations import dashboard_date_range, monthly_series, series_totals, top_contacts
+from .chart_cache import ChartCache, model_stamps
 from .forms import PDFUploadForm, AnalyticsReportForm
 
 
@@ -35,47 +30,20 @@ def is_admin_or_invoicing(user):
 @user_passes_test(is_admin_or_invoicing)
 def analytics_dashboard(request):
     """Main analytics dashboard with charts and KPIs"""
-    # Get date range (default to last 12 months)
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=365)
+    start_date, end_date = dashboard_date_range()
     
-    # Revenue vs Expense Chart
-    revenue_chart = generate_revenue_expense_chart(start_date, end_date)
-    
-    # Monthly Trends Chart
-    monthly_trends_chart = generate_monthly_trends_chart(start_date, end_date)
-    
-    # Top Customers Chart
-    top_customers_chart = generate_top_customers_chart()
-    
-    # Budget Variance Chart
-    budget_variance_chart = generate_budget_variance_chart()
+    # Charts are fetched by the page from analytics_chart, so only the KPIs are computed here
+    series = monthly_series(start_date, end_date)
     
     # KPIs
-    invoices = CustomerInvoice.objects.filter(
-        status='posted', 
-        date__range=[start_date, end_date]
-    )
-    bills = VendorBill.objects.filter(
-        status='posted', 
-        date__range=[start_date, end_date]
-    )
+    totals = series_totals(series)
+    total_revenue = totals['revenue']
+    total_expenses = totals['expense']
+    net_profit = totals['profit']
     
-    total_revenue = sum(invoice.total_amount for invoice in invoices)
-    total_expenses = sum(bill.total_amount for bill in bills)
-    net_profit = total_revenue - total_expenses
-    
-    outstanding_invoices_qs = CustomerInvoice.objects.filter(
-        status='posted',
-        payment_status__in=['not_paid', 'partially_paid']
-    )
-    outstanding_invoices = sum(invoice.remaining_amount for invoice in outstanding_invoices_qs)
+    outstanding_invoices = CustomerInvoice.objects.outstanding().totals()['remaining_amount']
     
     context = {
-        'revenue_chart': revenue_chart,
-        'monthly_trends_chart': monthly_trends_chart,
-        'top_customers_chart': top_customers_chart,
-        'budget_variance_chart': budget_variance_chart,
         'total_revenue': total_revenue,
         'total_expenses': total_expenses,
         'net_profit': net_profit,
@@ -87,302 +55,200 @@ def analytics_dashboard(request):
     return render(request, 'analytics/dashboard.html', context)
 
 
-def generate_revenue_expense_chart(start_date, end_date):
+def generate_revenue_expense_chart(start_date, end_date, series=None, image_format='png'):
     """Generate revenue vs expense comparison chart"""
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(10, 6))
-    fig.patch.set_facecolor('#1a1a1a')
-    ax.set_facecolor('#1a1a1a')
-    
-    # Get monthly data
-    months = []
-    revenues = []
-    expenses = []
-    
-    current_date = start_date.replace(day=1)
-    while current_date <= end_date:
-        next_month = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1)
-        
-        # Get invoices for this month and calculate total
-        month_invoices = CustomerInvoice.objects.filter(
-            status='posted',
-            date__range=[current_date, next_month - timedelta(days=1)]
-        )
-        month_revenue = sum(invoice.total_amount for invoice in month_invoices)
-        
-        # Get bills for this month and calculate total
-        month_bills = VendorBill.objects.filter(
-            status='posted',
-            date__range=[current_date, next_month - timedelta(days=1)]
-        )
-        month_expense = sum(bill.total_amount for bill in month_bills)
-        
-        months.append(current_date.strftime('%b %Y'))
-        revenues.append(float(month_revenue))
-        expenses.append(float(month_expense))
-        
-        current_date = next_month
-    
-    x = np.arange(len(months))
-    width = 0.35
-    
-    bars1 = ax.bar(x - width/2, revenues, width, label='Revenue', color='#4CAF50', alpha=0.8)
-    bars2 = ax.bar(x + width/2, expenses, width, label='Expenses', color='#f44336', alpha=0.8)
-    
-    ax.set_xlabel('Month', color='white')
-    ax.set_ylabel('Amount (₹)', color='white')
-    ax.set_title('Revenue vs Expenses', color='white', fontsize=16, fontweight='bold')
-    ax.set_xticks(x)
-    ax.set_xticklabels(months, rotation=45, ha='right', color='white')
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    
-    # Format y-axis to show currency
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{x:,.0f}'))
-    ax.tick_params(colors='white')
-    
-    plt.tight_layout()
-    
-    # Convert to base64 string
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', facecolor='#1a1a1a', edgecolor='none', dpi=100)
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    buffer.close()
-    plt.close()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode('utf-8')
-    
-    return graphic
+    if series is None:
+        series = monthly_series(start_date, end_date)
+    return charts.render(
+        charts.grouped_bar_chart,
+        title='Revenue vs Expenses',
+        labels=[entry['month'].strftime('%b %Y') for entry in series],
+        groups=[
+            ('Revenue', [float(entry['revenue']) for entry in series], '#4CAF50'),
+            ('Expenses', [float(entry['expense']) for entry in series], '#f44336'),
+        ],
+        xlabel='Month',
+        image_format=image_format,
+    )
 
 
-def generate_monthly_trends_chart(start_date, end_date):
+def generate_monthly_trends_chart(start_date, end_date, series=None, image_format='png'):
     """Generate monthly trends line chart"""
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(12, 6))
-    fig.patch.set_facecolor('#1a1a1a')
-    ax.set_facecolor('#1a1a1a')
-    
-    # Get monthly data
-    months = []
-    revenues = []
-    expenses = []
-    profits = []
-    
-    current_date = start_date.replace(day=1)
-    while current_date <= end_date:
-        next_month = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1)
-        
-        # Get invoices for this month and calculate total
-        month_invoices = CustomerInvoice.objects.filter(
-            status='posted',
-            date__range=[current_date, next_month - timedelta(days=1)]
-        )
-        month_revenue = sum(invoice.total_amount for invoice in month_invoices)
-        
-        # Get bills for this month and calculate total
-        month_bills = VendorBill.objects.filter(
-            status='posted',
-            date__range=[current_date, next_month - timedelta(days=1)]
-        )
-        month_expense = sum(bill.total_amount for bill in month_bills)
-        
-        months.append(current_date)
-        revenues.append(float(month_revenue))
-        expenses.append(float(month_expense))
-        profits.append(float(month_revenue - month_expense))
-        
-        current_date = next_month
-    
-    ax.plot(months, revenues, marker='o', linewidth=2, label='Revenue', color='#4CAF50')
-    ax.plot(months, expenses, marker='s', linewidth=2, label='Expenses', color='#f44336')
-    ax.plot(months, profits, marker='^', linewidth=2, label='Profit', color='#2196F3')
-    
-    ax.set_xlabel('Month', color='white')
-    ax.set_ylabel('Amount (₹)', color='white')
-    ax.set_title('Monthly Financial Trends', color='white', fontsize=16, fontweight='bold')
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    
-    # Format dates on x-axis
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %Y'))
-    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=2))
-    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right', color='white')
-    
-    # Format y-axis to show currency
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{x:,.0f}'))
-    ax.tick_params(colors='white')
-    
-    plt.tight_layout()
-    
-    # Convert to base64 string
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', facecolor='#1a1a1a', edgecolor='none', dpi=100)
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    buffer.close()
-    plt.close()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode('utf-8')
-    
-    return graphic
+    if series is None:
+        series = monthly_series(start_date, end_date)
+    return charts.render(
+        charts.monthly_line_chart,
+        title='Monthly Financial Trends',
+        months=[entry['month'] for entry in series],
+        lines=[
+            ('Revenue', [float(entry['revenue']) for entry in series], '#4CAF50', 'o'),
+            ('Expenses', [float(entry['expense']) for entry in series], '#f44336', 's'),
+            ('Profit', [float(entry['profit']) for entry in series], '#2196F3', '^'),
+        ],
+        image_format=image_format,
+    )
 
 
-def generate_top_customers_chart():
+def generate_top_customers_chart(image_format='png'):
     """Generate top customers pie chart"""
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(8, 8))
-    fig.patch.set_facecolor('#1a1a1a')
-    ax.set_facecolor('#1a1a1a')
-    
-    # Get all posted invoices grouped by customer
-    from collections import defaultdict
-    customer_totals = defaultdict(Decimal)
-    
-    invoices = CustomerInvoice.objects.filter(status='posted').select_related('contact')
-    for invoice in invoices:
-        customer_totals[invoice.contact.name] += invoice.total_amount
-    
-    # Get top 10 customers
-    top_customers = sorted(customer_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    if top_customers:
-        labels = [customer[0] for customer in top_customers]
-        sizes = [float(customer[1]) for customer in top_customers]
-        
-        colors = plt.cm.Set3(np.linspace(0, 1, len(labels)))
-        
-        wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%', 
-                                         colors=colors, startangle=90)
-        
-        # Customize text colors
-        for text in texts:
-            text.set_color('white')
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-    else:
-        ax.text(0.5, 0.5, 'No customer data available', 
-                horizontalalignment='center', verticalalignment='center',
-                transform=ax.transAxes, color='white', fontsize=14)
-    
-    ax.set_title('Top Customers by Revenue', color='white', fontsize=16, fontweight='bold')
-    
-    plt.tight_layout()
-    
-    # Convert to base64 string
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', facecolor='#1a1a1a', edgecolor='none', dpi=100)
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    buffer.close()
-    plt.close()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode('utf-8')
-    
-    return graphic
+    # Get top 10 customers by posted invoice totals
+    top_customers = top_contacts('customer_invoice', limit=10)
+    return charts.render(
+        charts.pie_chart,
+        title='Top Customers by Revenue',
+        labels=[customer[0] for customer in top_customers],
+        sizes=[float(customer[1]) for customer in top_customers],
+        empty_message='No customer data available',
+        image_format=image_format,
+    )
 
 
-def generate_budget_variance_chart():
+def generate_budget_variance_chart(image_format='png'):
     """Generate budget variance chart"""
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(10, 6))
-    fig.patch.set_facecolor('#1a1a1a')
-    ax.set_facecolor('#1a1a1a')
-    
-    budgets = Budget.objects.filter(is_active=True)
-    
-    if budgets:
-        budget_names = [budget.name for budget in budgets]
-        budgeted_amounts = [float(budget.budgeted_amount) for budget in budgets]
-        actual_amounts = [float(budget.actual_amount) for budget in budgets]
-        
-        x = np.arange(len(budget_names))
-        width = 0.35
-        
-        bars1 = ax.bar(x - width/2, budgeted_amounts, width, label='Budgeted', color='#2196F3', alpha=0.8)
-        bars2 = ax.bar(x + width/2, actual_amounts, width, label='Actual', color='#FF9800', alpha=0.8)
-        
-        ax.set_xlabel('Budget Categories', color='white')
-        ax.set_ylabel('Amount (₹)', color='white')
-        ax.set_title('Budget vs Actual Spending', color='white', fontsize=16, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(budget_names, rotation=45, ha='right', color='white')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        
-        # Format y-axis to show currency
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{x:,.0f}'))
-        ax.tick_params(colors='white')
-    else:
-        ax.text(0.5, 0.5, 'No budget data available', 
-                horizontalalignment='center', verticalalignment='center',
-                transform=ax.transAxes, color='white', fontsize=14)
-    
-    plt.tight_layout()
-    
-    # Convert to base64 string
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', facecolor='#1a1a1a', edgecolor='none', dpi=100)
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    buffer.close()
-    plt.close()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode('utf-8')
-    
-    return graphic
+    budgets = list(Budget.objects.filter(is_active=True).with_actuals())
+    return charts.render(
+        charts.grouped_bar_chart,
+        title='Budget vs Actual Spending',
+        labels=[budget.name for budget in budgets],
+        groups=[
+            ('Budgeted', [float(budget.budgeted_amount) for budget in budgets], '#2196F3'),
+            ('Actual', [float(budget.actual_amount) for budget in budgets], '#FF9800'),
+        ],
+        xlabel='Budget Categories',
+        empty_message='No budget data available',
+        image_format=image_format,
+    )
+
+
+# kind: (renderer, uses the start/end range, models the chart is drawn from)
+CHARTS = {
+    'revenue-expense': (generate_revenue_expense_chart, True, (DailyFinancialFact,)),
+    'monthly-trends': (generate_monthly_trends_chart, True, (DailyFinancialFact,)),
+    'top-customers': (generate_top_customers_chart, False, (DailyFinancialFact, Contact)),
+    # Budget actuals follow posted invoices and bills
+    'budget-variance': (generate_budget_variance_chart, False, (Budget, CustomerInvoice, VendorBill)),
+}
+
+CHART_CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def chart_timeout_response():
+    """503 for a chart the render pool could not finish in time; the browser may retry shortly"""
+    response = HttpResponse('The chart took too long to render', status=503, content_type='text/plain')
+    response['Retry-After'] = '30'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+def chart_image_view(request, kind, image_format):
+    """One dashboard chart as PNG or SVG, conditional-GET friendly and cached by data fingerprint"""
+    if kind not in CHARTS:
+        raise Http404('Unknown chart')
+    renderer, dated, sources = CHARTS[kind]
+    
+    params = []
+    if dated:
+        try:
+            default_start, default_end = dashboard_date_range()
+            end_date = date.fromisoformat(request.GET['end']) if request.GET.get('end') else default_end
+            start_date = date.fromisoformat(request.GET['start']) if request.GET.get('start') else default_start
+        except ValueError:
+            return HttpResponseBadRequest('start and end must be YYYY-MM-DD dates')
+        params = [start_date, end_date]
+    
+    # Identical inputs and untouched source tables mean an identical image
+    stamps = model_stamps(*sources)
+    cache = ChartCache()
+    key = cache.key(f'{kind}.{image_format}', params, stamps)
+    etag = f'"{key.rsplit(":", 1)[-1]}"'
+    updated = [stamp[1] for stamp in stamps.values() if stamp[1] is not None]
+    last_modified = int(max(updated).timestamp()) if updated else None
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        try:
+            content = cache.get_or_render(
+                f'{kind}.{image_format}', params, stamps,
+                lambda: renderer(*params, image_format=image_format)
+            )
+        except charts.ChartTimeout:
+            return chart_timeout_response()
+        response = HttpResponse(content, content_type=CHART_CONTENT_TYPES[image_format])
+    
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=cache.browser_max_age)
+    return response
+
+
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+def pivot_view(request):
+    """JSON pivot of posted revenue/expense lines from the in-memory cube.
+    
+    ?rows=month,category groups by the listed dimensions; any dimension name
+    (customer=3,7 / category=Food / kind=revenue ...) filters on its values;
+    from/to bound the month (YYYY-MM); sort orders by a measure, descending.
+    """
+    started = time.perf_counter()
+    rows = [name for name in request.GET.get('rows', '').split(',') if name]
+    filters = {
+        name: [value for value in request.GET[name].split(',') if value]
+        for name in cube_module.DIMENSIONS if request.GET.get(name)
+    }
+    sort = request.GET.get('sort')
+    try:
+        limit = max(int(request.GET.get('limit', 1000)), 0)
+        if sort and sort not in cube_module.MEASURES:
+            raise cube_module.CubeQueryError(f"unknown measure {sort!r}")
+        month_from = cube_module.parse_month(request.GET['from']) if request.GET.get('from') else None
+        month_to = cube_module.parse_month(request.GET['to']) if request.GET.get('to') else None
+        cube = cube_module.get_cube()
+        result = cube.pivot(rows, filters, month_from, month_to)
+    except (cube_module.CubeQueryError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    groups = result.records(sort=sort, limit=limit)
+    
+    labels = [cube.labels(name, [codes[index] for codes, _ in groups]) for index, name in enumerate(rows)]
+    records = []
+    for codes, measures in groups:
+        entry = {}
+        for index, name in enumerate(rows):
+            key, label = labels[index][codes[index]]
+            entry[name] = key
+            if label != key:
+                entry[f'{name}_label'] = label
+        entry.update(measures)
+        records.append(entry)
+    
+    return JsonResponse({
+        'rows': rows,
+        'filters': filters,
+        'groups': records,
+        'truncated': len(result) > limit,
+        'totals': result.totals,
+        'lines_in_cube': len(cube),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    })
 
 
 @login_required
 def pdf_upload_view(request):
-    """Upload and process PDF documents"""
+    """Upload PDF documents, queued for background text extraction"""
     if request.method == 'POST':
         form = PDFUploadForm(request.POST, request.FILES)
         if form.is_valid():
             pdf_doc = form.save(commit=False)
             pdf_doc.uploaded_by = request.user
-            
-            # Extract text from PDF
-            try:
-                pdf_file = request.FILES['pdf_file']
-                reader = PdfReader(pdf_file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text()
-                
-                pdf_doc.extracted_text = text
-                
-                # Simple amount extraction (you can enhance this with regex patterns)
-                import re
-                amount_pattern = r'₹\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'
-                amounts = re.findall(amount_pattern, text)
-                if amounts:
-                    # Take the largest amount found
-                    amounts = [float(amt.replace(',', '')) for amt in amounts]
-                    pdf_doc.extracted_amount = max(amounts)
-                
-                # Simple date extraction
-                date_pattern = r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'
-                dates = re.findall(date_pattern, text)
-                if dates:
-                    try:
-                        from datetime import datetime
-                        pdf_doc.extracted_date = datetime.strptime(dates[0], '%d/%m/%Y').date()
-                    except:
-                        pass
-                
-                pdf_doc.processed = True
-                
-            except Exception as e:
-                messages.warning(request, f'PDF uploaded but text extraction failed: {str(e)}')
-            
+            # Saved as queued; the process_documents worker extracts the text
             pdf_doc.save()
-            messages.success(request, 'PDF uploaded and processed successfully!')
+            messages.success(request, 'PDF uploaded. Text extraction is queued; its progress shows in the list.')
             return redirect('pdf_list')
     else:
         form = PDFUploadForm()
@@ -392,12 +258,15 @@ def pdf_upload_view(request):
 
 @login_required
 def pdf_list_view(request):
-    """List uploaded PDF documents"""
-    documents = PDFDocument.objects.all()
+    """List uploaded PDF documents with their extraction status"""
+    documents = PDFDocument.objects.select_related('uploaded_by').defer('extracted_text')
     if not request.user.role == 'admin':
         documents = documents.filter(uploaded_by=request.user)
     
-    return render(request, 'analytics/pdf_list.html', {'documents': documents})
+    return render(request, 'analytics/pdf_list.html', {
+        'documents': documents,
+        'pending': documents.filter(status__in=['queued', 'processing']).count(),
+    })
 
 
 @login_required
@@ -423,43 +292,86 @@ def generate_custom_report(request):
             report = form.save(commit=False)
             report.generated_by = request.user
             
-            # Generate chart based on report type
-            chart_data = None
-            if report.report_type == 'revenue':
-                chart_data = generate_revenue_analysis_chart(report.start_date, report.end_date)
-            elif report.report_type == 'expense':
-                chart_data = generate_expense_analysis_chart(report.start_date, report.end_date)
-            elif report.report_type == 'profit_loss':
-                chart_data = generate_profit_loss_chart(report.start_date, report.end_date)
+            # Reports without a range cover the dashboard's default one
+            default_start, default_end = dashboard_date_range(report.end_date)
+            report.start_date = report.start_date or default_start
+            report.end_date = report.end_date or default_end
             
-            if chart_data:
-                # Save chart as image
-                image_data = base64.b64decode(chart_data)
-                image_file = ContentFile(image_data, name=f'{report.name}_{report.report_type}.png')
-                report.chart_image.save(f'{report.name}_{report.report_type}.png', image_file)
-            
-            report.save()
-            messages.success(request, 'Report generated successfully!')
-            return redirect('analytics_dashboard')
+            try:
+                reports.generate(report)
+            except charts.ChartTimeout:
+                messages.error(request, 'The report chart took too long to render. Please try again later.')
+            else:
+                messages.success(request, 'Report generated successfully!')
+                return redirect('analytics_report_list')
     else:
         form = AnalyticsReportForm()
     
-    return render(request, 'analytics/generate_report.html', {'form': form})
+    # The latest run of each schedule, so a precomputed report is opened rather than regenerated
+    ready_reports = AnalyticsReport.objects.filter(
+        pk__in=ReportSchedule.objects.filter(is_active=True).values('last_report')
+    ).defer('data_json', 'description')
+    
+    return render(request, 'analytics/generate_report.html', {'form': form, 'ready_reports': ready_reports})
 
 
-def generate_revenue_analysis_chart(start_date, end_date):
-    """Generate detailed revenue analysis chart"""
-    # Implementation similar to other chart functions
-    return generate_revenue_expense_chart(start_date, end_date)
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+def report_list_view(request):
+    """Saved reports, newest first; rows carry no report data and charts load from their snapshots"""
+    saved = AnalyticsReport.objects.select_related('generated_by').defer('data_json', 'description')
+    page = keyset_paginate(request, saved, key='generated_at')
+    return render(request, 'analytics/report_list.html', {'reports': page})
 
 
-def generate_expense_analysis_chart(start_date, end_date):
-    """Generate detailed expense analysis chart"""
-    # Implementation for expense analysis
-    return generate_revenue_expense_chart(start_date, end_date)
+REPORT_CONTENT_TYPES = dict(CHART_CONTENT_TYPES, csv='text/csv', json='application/json')
 
+# Bounds of the ?width=&height= chart size, in inches
+REPORT_CHART_SIZE = (4, 20)
 
-def generate_profit_loss_chart(start_date, end_date):
-    """Generate profit & loss chart"""
-    # Implementation for P&L analysis
-    return generate_monthly_trends_chart(start_date, end_date)
\ No newline at end of file
+
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+def report_render_view(request, pk, output_format):
+    """A saved report as PNG/SVG chart, CSV or JSON, rendered from its stored data_json only"""
+    report = get_object_or_404(AnalyticsReport.objects.only('name', 'report_type', 'data_json', 'chart_image', 'generated_at'), pk=pk)
+    if not report.data_json:
+        # Reports saved before data_json was kept only have their PNG
+        if output_format == 'png' and report.chart_image:
+            return redirect(report.chart_image.url)
+        raise Http404('This report has no stored data')
+    
+    figsize = None
+    if output_format in CHART_CONTENT_TYPES and ('width' in request.GET or 'height' in request.GET):
+        try:
+            width, height = float(request.GET.get('width', 10)), float(request.GET.get('height', 6))
+        except ValueError:
+            return HttpResponseBadRequest('width and height must be numbers of inches')
+        low, high = REPORT_CHART_SIZE
+        figsize = (min(max(width, low), high), min(max(height, low), high))
+    
+    # The snapshot never changes, so its identity and the options name the output
+    cache = ChartCache()
+    key = cache.key(f'report.{output_format}', [figsize], reports.snapshot_stamp(report))
+    etag = f'"{key.rsplit(":", 1)[-1]}"'
+    last_modified = int(report.generated_at.timestamp())
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if output_format == 'json':
+            response = JsonResponse(report.data_json)
+        elif output_format == 'csv':
+            response = HttpResponse(content_type=REPORT_CONTENT_TYPES['csv'])
+            reports.write_csv(report.data_json, response)
+            response['Content-Disposition'] = f'attachment; filename="Report_{report.pk}_{report.report_type}.csv"'
+        else:
+            try:
+                content = reports.cached_chart(report, output_format, figsize, cache)
+            except charts.ChartTimeout:
+                return chart_timeout_response()
+            response = HttpResponse(content, content_type=REPORT_CONTENT_TYPES[output_format])
+    
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=cache.browser_max_age)
+    return response
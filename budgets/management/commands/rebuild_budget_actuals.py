@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from budgets.models import BudgetActual
+from transactions.models import CustomerInvoice, VendorBill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the budget actuals ledger from posted invoices and bills'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Ledger rows inserted per statement')
+
+    def handle(self, *args, **options):
+        # One grouped query per document type, merged per (account, day)
+        actuals = {}
+        for model in (CustomerInvoice, VendorBill):
+            rows = (
+                model.objects.filter(status='posted', analytical_account__isnull=False)
+                .order_by()
+                .values_list('analytical_account_id', 'date')
+                .annotate(total=Sum('total_amount'))
+            )
+            for account_id, day, total in rows:
+                actuals[(account_id, day)] = actuals.get((account_id, day), 0) + total
+        
+        with transaction.atomic():
+            BudgetActual.objects.all().delete()
+            BudgetActual.objects.bulk_create(
+                [
+                    BudgetActual(analytical_account_id=account_id, date=day, amount=amount)
+                    for (account_id, day), amount in actuals.items()
+                ],
+                batch_size=options['batch_size']
+            )
+        
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(actuals)} budget actuals ledger row(s)"))
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:38
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def backfill_actuals(apps, schema_editor):
+    BudgetActual = apps.get_model('budgets', 'BudgetActual')
+    actuals = {}
+    for model_name in ('CustomerInvoice', 'VendorBill'):
+        model = apps.get_model('transactions', model_name)
+        rows = (
+            model.objects.filter(status='posted', analytical_account__isnull=False)
+            .order_by()
+            .values_list('analytical_account_id', 'date')
+            .annotate(total=Sum('total_amount'))
+        )
+        for account_id, day, total in rows:
+            actuals[(account_id, day)] = actuals.get((account_id, day), 0) + total
+    BudgetActual.objects.bulk_create(
+        [BudgetActual(analytical_account_id=account_id, date=day, amount=amount) for (account_id, day), amount in actuals.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_analyticalaccount_status_autoanalyticalmodel_status_and_more'),
+        ('budgets', '0002_budgetfieldexplanation_budgetstagemapping_and_more'),
+        ('transactions', '0005_customerinvoice_paid_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetActual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('analytical_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_actuals', to='core.analyticalaccount')),
+            ],
+            options={
+                'ordering': ['analytical_account', 'date'],
+                'unique_together': {('analytical_account', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_actuals, migrations.RunPython.noop),
+    ]
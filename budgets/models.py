@@ -1,9 +1,27 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from django.utils.functional import cached_property
 from core.models import User, AnalyticalAccount
 from decimal import Decimal
 
 
+class BudgetQuerySet(models.QuerySet):
+    def with_actuals(self):
+        """Annotate each budget's actuals from the ledger so actual_amount costs no extra query"""
+        actuals = BudgetActual.objects.filter(
+            analytical_account=OuterRef('analytical_account'),
+            date__gte=OuterRef('start_date'),
+            date__lte=OuterRef('end_date'),
+        ).order_by().values('analytical_account').annotate(total=Sum('amount')).values('total')[:1]
+        return self.annotate(ledger_actual=Coalesce(
+            Subquery(actuals, output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+            Decimal('0'),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        ))
+
+
 class Budget(models.Model):
     """Budget defined for a specific period and analytical account"""
     STATUS_CHOICES = [
@@ -34,6 +52,8 @@ class Budget(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_budgets')
     
+    objects = BudgetQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-start_date', 'analytical_account']
         unique_together = [['analytical_account', 'start_date', 'end_date']]
@@ -41,30 +61,16 @@ class Budget(models.Model):
     def __str__(self):
         return f"{self.name} - {self.analytical_account} ({self.start_date} to {self.end_date})"
     
-    @property
+    @cached_property
     def actual_amount(self):
-        """Calculate actual amount from posted transactions"""
-        from transactions.models import CustomerInvoice, VendorBill
-        
-        # Get all posted invoices and bills linked to this analytical account
-        # within the budget period
-        invoices = CustomerInvoice.objects.filter(
-            analytical_account=self.analytical_account,
-            status='posted',
+        """Posted invoice and bill totals for this account and period, from the actuals ledger"""
+        if hasattr(self, 'ledger_actual'):
+            return self.ledger_actual
+        return BudgetActual.objects.filter(
+            analytical_account_id=self.analytical_account_id,
             date__gte=self.start_date,
             date__lte=self.end_date
-        )
-        bills = VendorBill.objects.filter(
-            analytical_account=self.analytical_account,
-            status='posted',
-            date__gte=self.start_date,
-            date__lte=self.end_date
-        )
-        
-        invoice_total = sum(inv.total_amount for inv in invoices)
-        bill_total = sum(bill.total_amount for bill in bills)
-        
-        return invoice_total + bill_total
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
     
     @property
     def variance(self):
@@ -84,6 +90,57 @@ class Budget(models.Model):
         return self.budgeted_amount - self.actual_amount
 
 
+class BudgetActual(models.Model):
+    """Ledger of posted invoice and bill totals per analytical account and day"""
+    analytical_account = models.ForeignKey(AnalyticalAccount, on_delete=models.CASCADE, related_name='budget_actuals')
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    
+    class Meta:
+        ordering = ['analytical_account', 'date']
+        # Also serves as the (account, date) index for budget range sums
+        unique_together = [['analytical_account', 'date']]
+    
+    def __str__(self):
+        return f"{self.analytical_account} {self.date}: {self.amount}"
+    
+    @classmethod
+    def record(cls, entries):
+        """Add (analytical_account_id, date, amount) entries to the ledger, merging same-day rows"""
+        deltas = {}
+        for account_id, day, amount in entries:
+            if account_id and amount:
+                deltas[(account_id, day)] = deltas.get((account_id, day), Decimal('0')) + amount
+        if not deltas:
+            return
+        
+        with transaction.atomic():
+            candidates = cls.objects.select_for_update().filter(
+                analytical_account_id__in={account_id for account_id, _ in deltas},
+                date__in={day for _, day in deltas},
+            )
+            existing = [row for row in candidates if (row.analytical_account_id, row.date) in deltas]
+            for row in existing:
+                row.amount = F('amount') + deltas.pop((row.analytical_account_id, row.date))
+            cls.objects.bulk_update(existing, ['amount'])
+            
+            missing = [
+                cls(analytical_account_id=account_id, date=day, amount=amount)
+                for (account_id, day), amount in deltas.items()
+            ]
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(missing)
+            except IntegrityError:
+                # Another writer created some of the rows first; fall back to per-row increments
+                for row in missing:
+                    updated = cls.objects.filter(
+                        analytical_account_id=row.analytical_account_id, date=row.date
+                    ).update(amount=F('amount') + row.amount)
+                    if not updated:
+                        row.save()
+
+
 class BudgetRevision(models.Model):
     """Track revisions/changes to budgets"""
     budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='revisions')
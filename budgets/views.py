@@ -12,7 +12,7 @@ def is_admin(user):
 
 @login_required
 def budget_list_view(request):
-    budgets = Budget.objects.filter(is_active=True).order_by('-start_date')
+    budgets = Budget.objects.filter(is_active=True).with_actuals().order_by('-start_date')
     return render(request, 'budgets/budget_list.html', {'budgets': budgets})
 
 
@@ -130,7 +130,7 @@ def budget_detail_view(request, pk):
 
 @login_required
 def budget_dashboard_view(request):
-    budgets = Budget.objects.filter(is_active=True).order_by('-start_date')
+    budgets = Budget.objects.filter(is_active=True).with_actuals().order_by('-start_date')
     
     # Calculate summary statistics
     total_budgeted = sum(b.budgeted_amount for b in budgets)
@@ -150,7 +150,7 @@ def budget_dashboard_view(request):
 @login_required
 def budget_comprehensive_dashboard_view(request):
     """Comprehensive budget dashboard with 3-panel layout"""
-    budgets = Budget.objects.filter(is_active=True).select_related('analytical_account').order_by('-start_date')
+    budgets = Budget.objects.filter(is_active=True).with_actuals().select_related('analytical_account').order_by('-start_date')
     
     # Get field explanations and stage mappings
     field_explanations = BudgetFieldExplanation.objects.filter(is_active=True)
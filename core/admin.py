@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import User, Contact, Product, AnalyticalAccount, AutoAnalyticalModel
+from .analytical_rules import reapply_rules
 
 
 @admin.register(User)
@@ -40,3 +41,23 @@ class AutoAnalyticalModelAdmin(admin.ModelAdmin):
     list_display = ['name', 'analytical_account', 'priority', 'is_active']
     list_filter = ['is_active', 'analytical_account']
     search_fields = ['name']
+    actions = ['reapply_to_historical_items', 'preview_reapply_to_historical_items']
+
+    @admin.action(description='Re-apply active rules to the historical line items of the selected rules')
+    def reapply_to_historical_items(self, request, queryset):
+        self._reapply(request, queryset, dry_run=False)
+
+    @admin.action(description='Preview re-applying active rules to the selected rules\' items (dry run)')
+    def preview_reapply_to_historical_items(self, request, queryset):
+        self._reapply(request, queryset, dry_run=True)
+
+    def _reapply(self, request, queryset, dry_run):
+        # Only items the selected rules could claim or already hold are scanned, but rules
+        # interact through priority, so the whole active set decides each of them
+        summary = reapply_rules(dry_run=dry_run, rules=list(queryset))
+        verb = 'would change' if dry_run else 'changed'
+        details = ', '.join(
+            f"{label}: {verb} {summary['changed'][label]} of {scanned}"
+            for label, scanned in summary['scanned'].items()
+        )
+        self.message_user(request, details or 'No active rules or no line items to re-apply them to', messages.SUCCESS)
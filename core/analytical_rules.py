@@ -0,0 +1,254 @@
+"""Compiled matcher for AutoAnalyticalModel rules"""
+import threading
+from collections import Counter, deque
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import AutoAnalyticalModel
+
+
+class NameMatcher:
+    """Aho-Corasick automaton reporting which patterns occur anywhere in a text"""
+
+    def __init__(self, patterns):
+        # patterns: {lowercased substring: bitmask of rules requiring it}
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [0]
+        for pattern, mask in patterns.items():
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(0)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] |= mask
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def search(self, text):
+        """Bitmask of every rule whose substring occurs in text"""
+        found = 0
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            found |= self.output[state]
+        return found
+
+
+class AnalyticalRuleEngine:
+    """Active rules compiled into per-condition lookup tables.
+
+    Each rule gets one bit, ordered by priority (bit 0 = highest). A line item
+    matches the rules in the intersection of the per-condition candidate masks
+    and the lowest set bit is the winner, so matching costs a few dict lookups
+    and one automaton pass over the product name regardless of rule count.
+    """
+
+    def __init__(self, rules, version=None):
+        self.version = version
+        self.accounts = []
+        all_rules = 0
+        any_category = any_contact_type = any_name = 0
+        by_category, by_contact_type, by_name = {}, {}, {}
+
+        for bit, rule in enumerate(rules):
+            mask = 1 << bit
+            all_rules |= mask
+            self.accounts.append(rule.analytical_account)
+
+            if rule.product_category:
+                by_category[rule.product_category] = by_category.get(rule.product_category, 0) | mask
+            else:
+                any_category |= mask
+            if rule.contact_type:
+                by_contact_type[rule.contact_type] = by_contact_type.get(rule.contact_type, 0) | mask
+            else:
+                any_contact_type |= mask
+            if rule.product_name_contains:
+                pattern = rule.product_name_contains.lower()
+                by_name[pattern] = by_name.get(pattern, 0) | mask
+            else:
+                any_name |= mask
+
+        self.all_rules = all_rules
+        self.any_category = any_category
+        self.any_contact_type = any_contact_type
+        self.any_name = any_name
+        self.by_category = by_category
+        self.by_contact_type = by_contact_type
+        self.name_matcher = NameMatcher(by_name) if by_name else None
+        self._name_cache = {}
+
+    def _name_mask(self, name):
+        if self.name_matcher is None:
+            return self.any_name
+        mask = self._name_cache.get(name)
+        if mask is None:
+            mask = self.any_name | self.name_matcher.search(name.lower())
+            if len(self._name_cache) < 10000:
+                self._name_cache[name] = mask
+        return mask
+
+    def match_values(self, category, name, contact_type):
+        """Analytical account of the highest-priority rule matching the raw attribute values, or None"""
+        mask = self.all_rules
+        if not mask:
+            return None
+        mask &= self.any_category | self.by_category.get(category, 0)
+        if mask:
+            mask &= self.any_contact_type | self.by_contact_type.get(contact_type, 0)
+        if mask:
+            mask &= self._name_mask(name or '')
+        if not mask:
+            return None
+        return self.accounts[(mask & -mask).bit_length() - 1]
+
+    def match(self, product, contact):
+        """Analytical account of the highest-priority rule matching product and contact, or None"""
+        return self.match_values(product.category, product.name, getattr(contact, 'contact_type', None))
+
+    def match_many(self, items):
+        """match() over an iterable of (product, contact) pairs, returning a list in the same order"""
+        return [self.match(product, contact) for product, contact in items]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+# Everything the compiled engine depends on
+RULE_FIELDS = (
+    'pk', 'priority', 'name', 'analytical_account_id', 'product_category', 'product_name_contains', 'contact_type'
+)
+
+
+def rules_version():
+    """Stamp of the active rules' contents, so changes made with QuerySet.update() are seen too.
+
+    One narrow query over a small table; the rows are hashed rather than kept.
+    """
+    return hash(tuple(AutoAnalyticalModel.objects.filter(is_active=True).order_by('pk').values_list(*RULE_FIELDS)))
+
+
+def get_rule_engine():
+    """Return the process-wide compiled engine, recompiling it if the rules changed"""
+    global _engine
+    version = rules_version()
+    engine = _engine
+    if engine is not None and engine.version == version:
+        return engine
+
+    with _engine_lock:
+        if _engine is None or _engine.version != version:
+            rules = (
+                AutoAnalyticalModel.objects.filter(is_active=True)
+                .select_related('analytical_account')
+                .order_by('-priority', 'name', 'pk')
+            )
+            _engine = AnalyticalRuleEngine(list(rules), version=version)
+        return _engine
+
+
+def item_models():
+    """Line item models the rules apply to"""
+    from transactions.models import (
+        PurchaseOrderItem, VendorBillItem, SalesOrderItem, CustomerInvoiceItem
+    )
+    return [PurchaseOrderItem, VendorBillItem, SalesOrderItem, CustomerInvoiceItem]
+
+
+def rule_scope(rules, document):
+    """Q of the line items these rules could claim or already hold, or None when one of them matches everything"""
+    scope = Q(analytical_account_id__in={rule.analytical_account_id for rule in rules})
+    for rule in rules:
+        conditions = {}
+        if rule.product_category:
+            conditions['product__category'] = rule.product_category
+        if rule.product_name_contains:
+            conditions['product__name__icontains'] = rule.product_name_contains
+        if rule.contact_type:
+            conditions[f'{document}__contact__contact_type'] = rule.contact_type
+        if not conditions:
+            return None
+        scope |= Q(**conditions)
+    return scope
+
+
+def reapply_rules(models=None, date_from=None, date_to=None, chunk_size=5000, dry_run=False, rules=None):
+    """Re-run the active rules over historical line items.
+
+    With rules, only the items those rules could claim or whose account is one
+    of theirs are scanned; the whole active set still decides each of them,
+    since rules interact through priority. Items are streamed in primary-key chunks as plain value rows and changed
+    accounts are written back with one bulk_update per chunk. Items no rule
+    matches keep their current account. Returns a summary with the per-model
+    scanned/changed counts, a Counter of (model, old account id, new account id)
+    transitions and the set of account ids touched, for callers that need to
+    recompute anything keyed on item accounts.
+    """
+    from transactions.signals import documents_changed
+
+    engine = get_rule_engine()
+    summary = {'scanned': Counter(), 'changed': Counter(), 'transitions': Counter(), 'accounts': set()}
+    if not engine.all_rules:
+        return summary
+
+    for model in models or item_models():
+        label = model._meta.verbose_name_plural
+        document = model.document_field
+        items = model.objects.all()
+        if rules is not None:
+            scope = rule_scope(rules, document)
+            if scope is not None:
+                items = items.filter(scope)
+        if date_from:
+            items = items.filter(**{f'{document}__date__gte': date_from})
+        if date_to:
+            items = items.filter(**{f'{document}__date__lte': date_to})
+        items = items.order_by('pk').values_list(
+            'pk', 'analytical_account_id', 'product__category', 'product__name',
+            f'{document}__contact__contact_type', f'{document}__date'
+        )
+
+        last_pk = 0
+        while True:
+            rows = list(items.filter(pk__gt=last_pk)[:chunk_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            summary['scanned'][label] += len(rows)
+
+            changed = []
+            dates = set()
+            for pk, account_id, category, name, contact_type, day in rows:
+                account = engine.match_values(category, name, contact_type)
+                if account is None or account.pk == account_id:
+                    continue
+                changed.append(model(pk=pk, analytical_account_id=account.pk))
+                dates.add(day)
+                summary['transitions'][(label, account_id, account.pk)] += 1
+                summary['accounts'].update({account_id, account.pk})
+
+            summary['changed'][label] += len(changed)
+            if changed and not dry_run:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, ['analytical_account'], batch_size=chunk_size)
+                    documents_changed.send(sender=model._meta.get_field(document).related_model, dates=dates)
+
+    summary['accounts'].discard(None)
+    return summary
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from core.analytical_rules import item_models, reapply_rules
+from core.models import AnalyticalAccount
+
+
+class Command(BaseCommand):
+    help = 'Re-apply the active auto analytical rules to historical line items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help='Limit to one item type, e.g. customer_invoice_items (repeatable)')
+        parser.add_argument('--from', dest='date_from', help='Only items on documents dated on or after YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Only items on documents dated on or before YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Items read and updated per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them')
+
+    def handle(self, *args, **options):
+        models = {model.document_field + '_items': model for model in item_models()}
+        selected = options['model'] or list(models)
+        unknown = set(selected) - set(models)
+        if unknown:
+            self.stderr.write(self.style.ERROR(f"Unknown model(s): {', '.join(sorted(unknown))}. Choose from {', '.join(models)}"))
+            return
+        
+        summary = reapply_rules(
+            models=[models[key] for key in selected],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        
+        if not summary['scanned']:
+            self.stdout.write('No active rules or no line items to re-apply them to')
+            return
+        
+        codes = dict(AnalyticalAccount.objects.filter(pk__in=summary['accounts']).values_list('pk', 'code'))
+        for (label, old, new), count in sorted(summary['transitions'].items(), key=lambda entry: (entry[0][0], -entry[1])):
+            self.stdout.write(f"  {label}: {codes.get(old, '-')} -> {codes.get(new, '-')}: {count}")
+        
+        verb = 'would change' if options['dry_run'] else 'changed'
+        for label, scanned in summary['scanned'].items():
+            self.stdout.write(self.style.SUCCESS(f"{label}: scanned {scanned}, {verb} {summary['changed'][label]}"))
+        if summary['accounts']:
+            self.stdout.write(f"Accounts affected: {', '.join(sorted(codes.values()))}")
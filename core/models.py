@@ -64,6 +64,11 @@ class Contact(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='contact_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='contact_status_created_idx'),
+            models.Index(fields=['contact_type', 'created_at', 'id'], name='contact_type_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -104,6 +109,11 @@ class Product(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='product_status_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='product_category_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -0,0 +1,116 @@
+"""Keyset (cursor) pagination for list views.
+
+Pages are addressed by the (key, id) of the row they start after or end
+before, so each page is one indexed range query of per_page + 1 rows with
+no OFFSET and no COUNT, however deep the page.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """A page of objects plus cursor URLs, usable in place of a queryset in templates"""
+
+    def __init__(self, object_list, next_url=None, previous_url=None, first_url=None):
+        self.object_list = object_list
+        self.next_url = next_url
+        self.previous_url = previous_url
+        self.first_url = first_url
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_url is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_url is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """(value, pk) of a cursor, its value converted by the key field; None for anything malformed"""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        value = field.to_python(value)
+        return (value, int(pk)) if value is not None else None
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _page_url(request, **cursor):
+    params = request.GET.copy()
+    for name in ('after', 'before', 'page'):
+        params.pop(name, None)
+    params.update(cursor)
+    query = params.urlencode()
+    return f"{request.path}?{query}" if query else request.path
+
+
+def keyset_paginate(request, queryset, key='date', descending=True, per_page=50):
+    """Return the KeysetPage of queryset selected by the request's after/before cursor.
+
+    Rows are ordered by (key, id), newest first when descending. The queryset
+    should be backed by an index on (filter columns..., key, id).
+    """
+    field = queryset.model._meta.get_field(key)
+    after = decode_cursor(request.GET.get('after', ''), field)
+    before = None if after else decode_cursor(request.GET.get('before', ''), field)
+    cursor = after or before
+
+    # Walking towards older rows when descending, newer rows when ascending
+    forward = before is None
+    older = forward == descending
+    order = [f'-{key}', '-pk'] if older else [key, 'pk']
+    rows = queryset.order_by(*order)
+
+    if cursor is not None:
+        value, pk = cursor
+        op = 'lt' if older else 'gt'
+        # The leading inclusive bound keeps the lookup a range scan on the (key, id) index
+        rows = rows.filter(
+            Q(**{f'{key}__{op}e': value}),
+            Q(**{f'{key}__{op}': value}) | Q(**{key: value, f'pk__{op}': pk}),
+        )
+
+    page = list(rows[:per_page + 1])
+    more = len(page) > per_page
+    page = page[:per_page]
+    if not forward:
+        page.reverse()
+
+    # A cursor means the rows on the side we came from exist; the extra row tells us about the other side
+    has_next = more if forward else True
+    has_previous = cursor is not None if forward else more
+
+    first_url = _page_url(request)
+    next_url = previous_url = None
+    if page:
+        head, tail = page[0], page[-1]
+        if has_next:
+            next_url = _page_url(request, after=encode_cursor(getattr(tail, key), tail.pk))
+        if has_previous:
+            previous_url = _page_url(request, before=encode_cursor(getattr(head, key), head.pk))
+    elif cursor is not None:
+        previous_url = first_url
+
+    return KeysetPage(page, next_url=next_url, previous_url=previous_url, first_url=first_url)
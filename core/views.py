@@ -3,10 +3,12 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db import transaction
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 import re
 from .models import User, Contact, Product, AnalyticalAccount, AutoAnalyticalModel
 from .forms import LoginForm, SignupForm, CreateUserForm, ContactForm, ProductForm, AnalyticalAccountForm, AutoAnalyticalModelForm
+from .pagination import keyset_paginate
 
 
 def is_admin(user):
@@ -97,7 +99,7 @@ def dashboard_view(request):
         from transactions.models import CustomerInvoice, VendorBill, PurchaseOrder, SalesOrder, Payment
         from budgets.models import Budget
         
-        budgets = Budget.objects.filter(is_active=True)
+        budgets = Budget.objects.filter(is_active=True).with_actuals()
         total_budgeted = sum(b.budgeted_amount for b in budgets)
         total_actual = sum(b.actual_amount for b in budgets)
         
@@ -109,7 +111,7 @@ def dashboard_view(request):
             'active_budgets': budgets.count(),
             'total_budgeted': total_budgeted,
             'total_actual': total_actual,
-            'recent_invoices': CustomerInvoice.objects.all().order_by('-date')[:10],
+            'recent_invoices': CustomerInvoice.objects.for_listing().order_by('-date')[:10],
         })
     
     return render(request, 'core/dashboard.html', context)
@@ -128,8 +130,23 @@ def user_list_view(request):
 # Master Data Views
 @login_required
 def contact_list_view(request):
+    status = request.GET.get('status', 'new')
     contacts = Contact.objects.all()
-    return render(request, 'core/contact_list.html', {'contacts': contacts})
+    if status in dict(Contact.STATUS_CHOICES):
+        contacts = contacts.filter(status=status)
+    if request.GET.get('contact_type') in dict(Contact.TYPE_CHOICES):
+        contacts = contacts.filter(contact_type=request.GET['contact_type'])
+    search = request.GET.get('search', '').strip()
+    if search:
+        contacts = contacts.filter(Q(name__icontains=search) | Q(email__icontains=search))
+    
+    contacts = keyset_paginate(request, contacts, key='created_at')
+    return render(request, 'core/contact_list.html', {
+        'contacts': contacts,
+        'status': status,
+        'search': search,
+        'status_choices': Contact.STATUS_CHOICES
+    })
 
 
 @login_required
@@ -240,8 +257,23 @@ def contact_archive_view(request, pk):
 
 @login_required
 def product_list_view(request):
+    status = request.GET.get('status', 'new')
     products = Product.objects.all()
-    return render(request, 'core/product_list.html', {'products': products})
+    if status in dict(Product.STATUS_CHOICES):
+        products = products.filter(status=status)
+    if request.GET.get('category'):
+        products = products.filter(category=request.GET['category'])
+    search = request.GET.get('search', '').strip()
+    if search:
+        products = products.filter(Q(name__icontains=search) | Q(sku__icontains=search))
+    
+    products = keyset_paginate(request, products, key='created_at')
+    return render(request, 'core/product_list.html', {
+        'products': products,
+        'status': status,
+        'search': search,
+        'status_choices': Product.STATUS_CHOICES
+    })
 
 
 @login_required
@@ -98,6 +98,10 @@ def main():
     if not run_command("python manage.py migrate", "Running database migrations"):
         sys.exit(1)
     
+    # Bring the analytics rollup up to date (a full build on first deploy)
+    if not run_command("python manage.py refresh_facts", "Refreshing analytics facts"):
+        print("⚠️  Analytics facts refresh failed, but continuing...")
+    
     # Collect static files
     if not run_command("python manage.py collectstatic --noinput", "Collecting static files"):
         print("⚠️  Static files collection failed, but continuing...")
@@ -128,6 +132,10 @@ def main():
     print("\n🔧 Configuration:")
     print("- Update Stripe keys in settings.py for payments")
     print("- Configure email settings for notifications")
+    print("- Schedule 'python manage.py refresh_facts' (e.g. every 5 minutes) to keep analytics current")
+    print("- Run 'python manage.py run_report_scheduler --loop' (or schedule it every minute) for scheduled reports")
+    print("- Schedule 'python manage.py generate_statements' on the 1st of each month for month-end statements")
+    print("- Run 'python manage.py process_documents --loop' to extract text from uploaded PDFs")
     print("- Set up SSL certificate for production")
     print("\n📚 Documentation: README.md")
 
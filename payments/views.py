@@ -209,9 +209,6 @@ def handle_payment_succeeded(payment_intent):
                 created_by=stripe_payment.user,
                 notes=f'Stripe payment for invoice {stripe_payment.customer_invoice.transaction_number}',
             )
-            
-            # Update invoice payment status
-            stripe_payment.customer_invoice.update_payment_status()
         
     except StripePayment.DoesNotExist:
         pass
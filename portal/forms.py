@@ -1,3 +1,5 @@
+from datetime import date
+
 from django import forms
 from transactions.models import Payment, CustomerInvoice, VendorBill
 
@@ -14,3 +16,18 @@ class PaymentForm(forms.ModelForm):
             'reference': forms.TextInput(attrs={'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+
+
+class StatementForm(forms.Form):
+    """Period of a portal user's statement of account; defaults to the year to date"""
+    start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        today = date.today()
+        cleaned_data['end_date'] = cleaned_data.get('end_date') or today
+        cleaned_data['start_date'] = cleaned_data.get('start_date') or today.replace(month=1, day=1)
+        if cleaned_data['start_date'] > cleaned_data['end_date']:
+            raise forms.ValidationError('The start date must not be after the end date.')
+        return cleaned_data
@@ -10,6 +10,7 @@ urlpatterns = [
     path('bills/<int:pk>/', views.portal_bill_detail_view, name='portal_bill_detail'),
     path('bills/<int:pk>/pdf/', views.portal_bill_pdf, name='portal_bill_pdf'),
     path('orders/', views.portal_orders_view, name='portal_orders'),
+    path('statement/', views.portal_statement_pdf, name='portal_statement_pdf'),
     path('payment/', views.portal_payment_view, name='portal_payment'),
     path('payment/invoice/<int:invoice_id>/', views.portal_payment_view, name='portal_payment_invoice'),
     path('payment/bill/<int:bill_id>/', views.portal_payment_view, name='portal_payment_bill'),
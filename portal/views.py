@@ -3,10 +3,10 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponse
 from transactions.models import CustomerInvoice, VendorBill, PurchaseOrder, SalesOrder, Payment
-from transactions.views import generate_invoice_pdf, generate_bill_pdf
+from transactions import pdf, pdf_cache, statements
 from core.models import Contact
 from core.decorators import portal_user_required, customer_required, vendor_required
-from .forms import PaymentForm
+from .forms import PaymentForm, StatementForm
 
 
 @login_required
@@ -28,7 +28,7 @@ def portal_dashboard_view(request):
         context.update({
             'invoices': invoices[:10],
             'sales_orders': sales_orders[:10],
-            'total_outstanding': sum(inv.remaining_amount for inv in invoices if inv.payment_status != 'paid'),
+            'total_outstanding': invoices.exclude(payment_status='paid').totals()['remaining_amount'],
         })
     
     elif request.user.role == 'vendor':
@@ -38,7 +38,7 @@ def portal_dashboard_view(request):
         context.update({
             'bills': bills[:10],
             'purchase_orders': purchase_orders[:10],
-            'total_receivable': sum(bill.remaining_amount for bill in bills if bill.payment_status != 'paid'),
+            'total_receivable': bills.exclude(payment_status='paid').totals()['remaining_amount'],
         })
     
     return render(request, 'portal/dashboard.html', context)
@@ -54,7 +54,7 @@ def portal_invoices_view(request):
         return redirect('dashboard')
     
     invoices = CustomerInvoice.objects.filter(contact=contact, status='posted').order_by('-date')
-    return render(request, 'portal/invoices.html', {'invoices': invoices})
+    return render(request, 'portal/invoices.html', {'invoices': invoices, 'summary': invoices.totals()})
 
 
 @login_required
@@ -67,7 +67,7 @@ def portal_bills_view(request):
         return redirect('dashboard')
     
     bills = VendorBill.objects.filter(contact=contact, status='posted').order_by('-date')
-    return render(request, 'portal/bills.html', {'bills': bills})
+    return render(request, 'portal/bills.html', {'bills': bills, 'summary': bills.totals()})
 
 
 @login_required
@@ -171,39 +171,48 @@ def portal_payment_view(request, invoice_id=None, bill_id=None):
 @customer_required
 def portal_invoice_pdf(request, pk):
     """Generate PDF for customer invoice - portal access"""
-    invoice = get_object_or_404(CustomerInvoice, pk=pk)
+    invoice = get_object_or_404(pdf.snapshot_queryset(CustomerInvoice), pk=pk)
     
     # Verify ownership
     if invoice.contact != request.user.contact:
         messages.error(request, 'Access denied.')
         return redirect('portal_dashboard')
     
-    # Create PDF response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Invoice_{invoice.transaction_number}.pdf"'
-    
-    # Generate PDF
-    generate_invoice_pdf(response, invoice)
-    
-    return response
+    # Served from the stored copy while the document is unchanged
+    return pdf_cache.pdf_response(request, pdf.snapshot(invoice), f'Invoice_{invoice.transaction_number}.pdf')
 
 
 @login_required
 @vendor_required
 def portal_bill_pdf(request, pk):
     """Generate PDF for vendor bill - portal access"""
-    bill = get_object_or_404(VendorBill, pk=pk)
+    bill = get_object_or_404(pdf.snapshot_queryset(VendorBill), pk=pk)
     
     # Verify ownership
     if bill.contact != request.user.contact:
         messages.error(request, 'Access denied.')
         return redirect('portal_dashboard')
     
-    # Create PDF response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Bill_{bill.transaction_number}.pdf"'
+    # Served from the stored copy while the document is unchanged
+    return pdf_cache.pdf_response(request, pdf.snapshot(bill), f'Bill_{bill.transaction_number}.pdf')
+
+
+@login_required
+@portal_user_required
+def portal_statement_pdf(request):
+    """Statement of account PDF for the portal user's contact"""
+    contact = request.user.contact
+    if not contact:
+        messages.error(request, 'Contact profile not found.')
+        return redirect('dashboard')
     
-    # Generate PDF
-    generate_bill_pdf(response, bill)
+    form = StatementForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, ' '.join(form.non_field_errors()) or 'Invalid statement period.')
+        return redirect('portal_dashboard')
     
-    return response
\ No newline at end of file
+    start_date, end_date = form.cleaned_data['start_date'], form.cleaned_data['end_date']
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{statements.filename(contact, start_date, end_date)}"'
+    statements.render(contact, request.user.role, start_date, end_date, response)
+    return response
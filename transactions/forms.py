@@ -1,4 +1,5 @@
 from django import forms
+from django.db.models import Q
 from django.forms import inlineformset_factory
 from .models import (
     PurchaseOrder, PurchaseOrderItem, VendorBill, VendorBillItem,
@@ -169,6 +170,102 @@ class BudgetOverrideForm(forms.Form):
     )
 
 
+class TransactionImportForm(forms.Form):
+    file = forms.FileField(
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson'}),
+        help_text='CSV with a header row or JSON Lines, one line item per row.'
+    )
+    dry_run = forms.BooleanField(required=False, label='Validate only, do not import')
+    
+    def clean_file(self):
+        upload = self.cleaned_data.get('file')
+        if upload and not upload.name.lower().endswith(('.csv', '.jsonl', '.ndjson')):
+            raise forms.ValidationError('Only .csv and .jsonl files are allowed.')
+        return upload
+
+
+class TransactionFilterForm(forms.Form):
+    """Server-side filters for the transaction list views, bound to request.GET"""
+    status = forms.ChoiceField(
+        choices=[('', 'All Statuses')] + PurchaseOrder.STATUS_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    payment_status = forms.ChoiceField(
+        choices=[('', 'All Payment Statuses')] + CustomerInvoice._meta.get_field('payment_status').choices, required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    contact = forms.IntegerField(required=False, widget=forms.HiddenInput)
+    analytical_account = forms.ModelChoiceField(
+        queryset=AnalyticalAccount.objects.all(), required=False, empty_label='All Accounts',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    search = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Number, contact name or email'})
+    )
+    
+    def __init__(self, *args, payable=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not payable:
+            del self.fields['payment_status']
+    
+    def filter(self, queryset):
+        """Apply the valid filters to queryset; invalid values are ignored"""
+        self.is_valid()
+        data = self.cleaned_data
+        lookups = {
+            'status': 'status',
+            'payment_status': 'payment_status',
+            'contact': 'contact_id',
+            'analytical_account': 'analytical_account',
+            'date_from': 'date__gte',
+            'date_to': 'date__lte',
+        }
+        queryset = queryset.filter(**{
+            lookup: data[name] for name, lookup in lookups.items()
+            if data.get(name) not in (None, '')
+        })
+        if data.get('search'):
+            queryset = queryset.filter(
+                Q(transaction_number__icontains=data['search'])
+                | Q(contact__name__icontains=data['search'])
+                | Q(contact__email__icontains=data['search'])
+            )
+        return queryset
+
+
+class PaymentFilterForm(forms.Form):
+    """Server-side filters for the payment list, bound to request.GET"""
+    payment_method = forms.ChoiceField(
+        choices=[('', 'All Methods')] + Payment.PAYMENT_METHOD_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    search = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Payment number or reference'})
+    )
+    
+    def filter(self, queryset):
+        """Apply the valid filters to queryset; invalid values are ignored"""
+        self.is_valid()
+        data = self.cleaned_data
+        if data.get('payment_method'):
+            queryset = queryset.filter(payment_method=data['payment_method'])
+        if data.get('date_from'):
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(date__lte=data['date_to'])
+        if data.get('search'):
+            queryset = queryset.filter(
+                Q(payment_number__icontains=data['search']) | Q(reference__icontains=data['search'])
+            )
+        return queryset
+
+
 # Formsets for inline editing
 PurchaseOrderItemFormSet = inlineformset_factory(
     PurchaseOrder, PurchaseOrderItem, form=PurchaseOrderItemForm,
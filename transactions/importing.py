@@ -0,0 +1,317 @@
+"""Streaming bulk import of customer invoices and vendor bills.
+
+Input is one line item per row (CSV with a header line, or JSON Lines) with
+the columns:
+
+    type           invoice | bill
+    reference      external document number; consecutive rows sharing
+                   type and reference form one document
+    date           YYYY-MM-DD
+    due_date       YYYY-MM-DD, defaults to date
+    contact_email  Contact.email
+    account_code   AnalyticalAccount.code of the document (optional)
+    status         draft (default) | posted
+    notes          document notes (optional)
+    sku            Product.sku
+    quantity       decimal
+    unit_price     decimal, defaults to the product's unit price
+    item_account_code  AnalyticalAccount.code of the line (optional,
+                   otherwise the auto analytical rules, then account_code)
+
+A row that fails validation skips its whole document; the error is recorded
+with its line number and the rest of the file is still imported.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+
+from core.analytical_rules import get_rule_engine
+from core.models import AnalyticalAccount, Contact, Product
+from .models import CustomerInvoice, CustomerInvoiceItem, VendorBill, VendorBillItem
+from .numbering import fiscal_year, reserve_numbers
+from .signals import documents_changed
+
+
+DOCUMENT_TYPES = {
+    'invoice': (CustomerInvoice, CustomerInvoiceItem, 'invoice_number'),
+    'bill': (VendorBill, VendorBillItem, 'bill_number'),
+}
+
+CENT = Decimal('0.01')
+
+
+def _largest(model, name):
+    """Largest value the DecimalField name of model can store"""
+    field = model._meta.get_field(name)
+    return Decimal(10) ** (field.max_digits - field.decimal_places) - Decimal(10) ** -field.decimal_places
+
+
+# Item and document models of both types share these columns
+MAX_QUANTITY = _largest(CustomerInvoiceItem, 'quantity')
+MAX_UNIT_PRICE = _largest(CustomerInvoiceItem, 'unit_price')
+MAX_TOTAL = _largest(CustomerInvoice, 'total_amount')
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, file_format='csv'):
+    """Yield (line number, row dict) from a text stream without loading it whole"""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = RowError(f"invalid JSON: {e}")
+            yield line_no, row if isinstance(row, (dict, RowError)) else RowError('expected a JSON object')
+    else:
+        raise ValueError(f"Unsupported format {file_format!r}, use csv or jsonl")
+
+
+def open_upload(uploaded_file):
+    """Text stream and format for an uploaded .csv/.jsonl file"""
+    file_format = 'jsonl' if uploaded_file.name.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    return io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline=''), file_format
+
+
+def _text(row, name, required=False):
+    value = row.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"missing {name}")
+    return value
+
+
+def _date(row, name, default=None):
+    value = _text(row, name, required=default is None)
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"invalid {name} {value!r}, expected YYYY-MM-DD")
+
+
+def _decimal(row, name, default=None, minimum=Decimal('0'), maximum=None):
+    value = _text(row, name, required=default is None)
+    if not value:
+        return default
+    try:
+        amount = Decimal(value).quantize(CENT)
+    except InvalidOperation:
+        raise RowError(f"invalid {name} {value!r}")
+    # A quiet NaN passes quantize() but would raise in the comparison below
+    if not amount.is_finite():
+        raise RowError(f"invalid {name} {value!r}")
+    if amount < minimum:
+        raise RowError(f"{name} must be at least {minimum}")
+    # Caught here, a value too wide for its column would fail the whole chunk's insert
+    if maximum is not None and amount > maximum:
+        raise RowError(f"{name} must be at most {maximum}")
+    return amount
+
+
+class TransactionImporter:
+    """Resolve, validate and bulk insert documents read by read_rows()"""
+
+    def __init__(self, user=None, chunk_size=1000, dry_run=False):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.errors = []
+        self.documents = 0
+        self.lines = 0
+
+        # Lookup maps keep resolution to dict hits instead of a query per row
+        self.contacts = {
+            email.lower(): (pk, contact_type)
+            for pk, email, contact_type in Contact.objects.values_list('pk', 'email', 'contact_type')
+        }
+        self.products = {
+            sku: (pk, category, name, unit_price)
+            for pk, sku, category, name, unit_price in Product.objects.values_list('pk', 'sku', 'category', 'name', 'unit_price')
+        }
+        self.accounts = dict(AnalyticalAccount.objects.values_list('code', 'pk'))
+        self.engine = get_rule_engine()
+
+    def run(self, rows):
+        batch, batch_lines = [], 0
+        document = None
+        for line_no, row in rows:
+            key = None
+            if isinstance(row, dict):
+                key = (_text(row, 'type').lower(), _text(row, 'reference'))
+            if document is None or key is None or key != document['key']:
+                if document is not None and document['error'] is None:
+                    batch.append(document)
+                    batch_lines += len(document['items'])
+                if batch_lines >= self.chunk_size:
+                    self._flush(batch)
+                    batch, batch_lines = [], 0
+                document = {'key': key, 'line': line_no, 'items': [], 'error': None}
+
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                if document['error'] is not None:
+                    continue
+                if not document['items']:
+                    self._parse_header(document, row)
+                self._parse_item(document, row)
+            except RowError as e:
+                reference = document['key'][1] if document['key'] else ''
+                self.errors.append((line_no, f"{e}" + (f" (document {reference} skipped)" if reference else '')))
+                document['error'] = str(e)
+
+        if document is not None and document['error'] is None:
+            batch.append(document)
+        if batch:
+            self._flush(batch)
+        return self
+
+    def _parse_header(self, document, row):
+        doc_type, reference = document['key']
+        if doc_type not in DOCUMENT_TYPES:
+            raise RowError(f"unknown type {doc_type!r}, expected invoice or bill")
+        if not reference:
+            raise RowError('missing reference')
+
+        email = _text(row, 'contact_email', required=True).lower()
+        if email not in self.contacts:
+            raise RowError(f"unknown contact {email!r}")
+        account_code = _text(row, 'account_code')
+        if account_code and account_code not in self.accounts:
+            raise RowError(f"unknown analytical account {account_code!r}")
+        status = _text(row, 'status').lower() or 'draft'
+        if status not in ('draft', 'posted'):
+            raise RowError(f"invalid status {status!r}, expected draft or posted")
+
+        day = _date(row, 'date')
+        document.update(
+            contact=self.contacts[email],
+            date=day,
+            due_date=_date(row, 'due_date', default=day),
+            account_id=self.accounts.get(account_code),
+            status=status,
+            notes=_text(row, 'notes'),
+        )
+
+    def _parse_item(self, document, row):
+        sku = _text(row, 'sku', required=True)
+        if sku not in self.products:
+            raise RowError(f"unknown SKU {sku!r}")
+        product_id, category, name, default_price = self.products[sku]
+
+        account_code = _text(row, 'item_account_code')
+        if account_code:
+            if account_code not in self.accounts:
+                raise RowError(f"unknown analytical account {account_code!r}")
+            account_id = self.accounts[account_code]
+        else:
+            account = self.engine.match_values(category, name, document['contact'][1])
+            account_id = account.pk if account is not None else document['account_id']
+
+        quantity = _decimal(row, 'quantity', minimum=CENT, maximum=MAX_QUANTITY)
+        unit_price = _decimal(row, 'unit_price', default=default_price, maximum=MAX_UNIT_PRICE)
+        total = document.get('total', Decimal('0')) + quantity * unit_price
+        if total.quantize(CENT) > MAX_TOTAL:
+            raise RowError(f"document total {total.quantize(CENT)} exceeds the largest storable amount {MAX_TOTAL}")
+        document['total'] = total
+
+        document['items'].append({
+            'product_id': product_id,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'analytical_account_id': account_id,
+        })
+
+    def _flush(self, batch):
+        if self.dry_run:
+            self.documents += len(batch)
+            self.lines += sum(len(document['items']) for document in batch)
+            return
+
+        by_type = defaultdict(list)
+        for document in batch:
+            by_type[document['key'][0]].append(document)
+
+        try:
+            with transaction.atomic():
+                for doc_type, documents in by_type.items():
+                    self._insert(doc_type, documents)
+        except DatabaseError as e:
+            for document in batch:
+                self.errors.append((document['line'], f"could not be saved: {e} (document {document['key'][1]} skipped)"))
+            return
+
+        self.documents += len(batch)
+        self.lines += sum(len(document['items']) for document in batch)
+
+    def _insert(self, doc_type, documents):
+        from budgets.models import BudgetActual
+
+        model, item_model, reference_field = DOCUMENT_TYPES[doc_type]
+
+        # One sequence reservation per fiscal year instead of one per document
+        by_year = defaultdict(list)
+        for document in documents:
+            by_year[fiscal_year(document['date'])].append(document)
+        for year_documents in by_year.values():
+            numbers = reserve_numbers(model.sequence_type, year_documents[0]['date'], len(year_documents))
+            for document, number in zip(year_documents, numbers):
+                document['number'] = number
+
+        headers = []
+        for document in documents:
+            total = document['total'].quantize(CENT)
+            headers.append(model(
+                transaction_number=document['number'],
+                date=document['date'],
+                due_date=document['due_date'],
+                contact_id=document['contact'][0],
+                analytical_account_id=document['account_id'],
+                status=document['status'],
+                notes=document['notes'],
+                created_by=self.user,
+                total_amount=total,
+                line_count=len(document['items']),
+                remaining_amount=total,
+                **{reference_field: document['key'][1]}
+            ))
+        model.objects.bulk_create(headers, batch_size=self.chunk_size)
+
+        # Backends that cannot return ids from a bulk insert (MySQL) need a lookup
+        if headers and headers[0].pk is None:
+            ids = dict(
+                model.objects.filter(transaction_number__in=[header.transaction_number for header in headers])
+                .values_list('transaction_number', 'pk')
+            )
+            for header in headers:
+                header.pk = ids[header.transaction_number]
+
+        item_model.objects.bulk_create(
+            [
+                item_model(**{f'{item_model.document_field}_id': header.pk}, **item)
+                for header, document in zip(headers, documents)
+                for item in document['items']
+            ],
+            batch_size=self.chunk_size
+        )
+
+        BudgetActual.record([
+            (header.analytical_account_id, header.date, header.total_amount)
+            for header in headers if header.status == 'posted'
+        ])
+        documents_changed.send(sender=model, dates={header.date for header in headers if header.status == 'posted'})
@@ -0,0 +1,52 @@
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from transactions.models import CustomerInvoice, VendorBill
+
+
+DOCUMENT_MODELS = {
+    'customer_invoices': CustomerInvoice,
+    'vendor_bills': VendorBill,
+}
+
+ACTIONS = {
+    'post': 'posted',
+    'cancel': 'cancelled',
+}
+
+
+class Command(BaseCommand):
+    help = 'Post or cancel many customer invoices or vendor bills at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=list(DOCUMENT_MODELS))
+        parser.add_argument('action', choices=list(ACTIONS))
+        parser.add_argument('--ids', help='Comma-separated document ids')
+        parser.add_argument('--from', dest='date_from', help='Documents dated on or after YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Documents dated on or before YYYY-MM-DD')
+        parser.add_argument('--force', action='store_true', help='Post even when a budget would be exceeded')
+        parser.add_argument('--verbose-report', action='store_true', help='Print a line for every document, not only failures')
+
+    def handle(self, *args, **options):
+        model = DOCUMENT_MODELS[options['model']]
+        status = ACTIONS[options['action']]
+        
+        documents = model.objects.order_by('date', 'pk')
+        if options['ids']:
+            documents = documents.filter(pk__in=[int(pk) for pk in options['ids'].split(',') if pk.strip()])
+        if options['date_from']:
+            documents = documents.filter(date__gte=options['date_from'])
+        if options['date_to']:
+            documents = documents.filter(date__lte=options['date_to'])
+        if not (options['ids'] or options['date_from'] or options['date_to']):
+            raise CommandError('Select documents with --ids and/or --from/--to')
+        
+        report = model.bulk_set_status(documents.values_list('pk', flat=True), status, force=options['force'])
+        
+        for entry in report:
+            if options['verbose_report'] or entry['result'] not in (status, 'unchanged'):
+                self.stdout.write(f"{entry['transaction_number'] or entry['id']}: {entry['result']} - {entry['message']}")
+        
+        counts = Counter(entry['result'] for entry in report)
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{result}: {count}" for result, count in counts.most_common()) or 'No documents matched'
+        ))
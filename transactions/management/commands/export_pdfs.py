@@ -0,0 +1,69 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from transactions import pdf, pdf_export
+from transactions.forms import PaymentFilterForm, TransactionFilterForm
+from transactions.models import PurchaseOrder, VendorBill, SalesOrder, CustomerInvoice, Payment
+
+
+DOCUMENT_MODELS = {
+    'purchase_orders': PurchaseOrder,
+    'vendor_bills': VendorBill,
+    'sales_orders': SalesOrder,
+    'customer_invoices': CustomerInvoice,
+    'receipts': Payment,
+}
+
+
+class Command(BaseCommand):
+    help = 'Render the PDFs of many documents in parallel into one ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=list(DOCUMENT_MODELS))
+        parser.add_argument('--from', dest='date_from', help='Documents dated on or after YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Documents dated on or before YYYY-MM-DD')
+        parser.add_argument('--status', help='Only documents in this status (not for receipts)')
+        parser.add_argument('--payment-status', help='Only invoices or bills in this payment status')
+        parser.add_argument('--contact', type=int, help='Only documents of this contact id (not for receipts)')
+        parser.add_argument('--output', help='ZIP file to write (default MEDIA_ROOT/exports/<model>_<timestamp>.zip)')
+
+    def handle(self, *args, **options):
+        model = DOCUMENT_MODELS[options['model']]
+        data = {
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'status': options['status'],
+            'payment_status': options['payment_status'],
+            'contact': options['contact'],
+        }
+        data = {name: value for name, value in data.items() if value not in (None, '')}
+
+        # Same filters as the list pages, so an export matches what the list shows
+        if model is Payment:
+            if set(data) - {'date_from', 'date_to'}:
+                raise CommandError('Receipts can only be filtered with --from/--to')
+            filters = PaymentFilterForm(data)
+        else:
+            payable = model in (CustomerInvoice, VendorBill)
+            if 'payment_status' in data and not payable:
+                raise CommandError('--payment-status only applies to invoices and bills')
+            filters = TransactionFilterForm(data, payable=payable)
+        if not filters.is_valid():
+            raise CommandError(filters.errors.as_text())
+        documents = filters.filter(pdf.snapshot_queryset(model)).order_by('date', 'pk')
+
+        path = options['output']
+        if not path:
+            directory = os.path.join(settings.MEDIA_ROOT, 'exports')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{options['model']}_{timezone.localtime():%Y%m%d_%H%M%S}.zip")
+
+        started = time.monotonic()
+        count = pdf_export.write_zip(documents, path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} PDF(s) to {path} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,49 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Contact
+from transactions import statements
+
+
+class Command(BaseCommand):
+    help = 'Write the month-end statement of account PDF of every contact with posted invoices or bills'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Statement month as YYYY-MM (default: the previous month)')
+        parser.add_argument('--contact', type=int, action='append', dest='contact_ids', help='Only this contact id (repeatable)')
+        parser.add_argument('--output', help='Directory to write to (default MEDIA_ROOT/statements/<YYYY-MM>)')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                start_date = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--month must be YYYY-MM')
+        else:
+            start_date = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        end_date = (start_date + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+        directory = options['output'] or os.path.join(settings.MEDIA_ROOT, 'statements', f'{start_date:%Y-%m}')
+        os.makedirs(directory, exist_ok=True)
+
+        started = time.monotonic()
+        written = 0
+        for side, (model, _) in statements.SIDES.items():
+            # Contacts with any posted document by the month end: either activity or a balance to report
+            contact_ids = model.objects.filter(status='posted', date__lte=end_date).values('contact_id')
+            contacts = Contact.objects.filter(pk__in=contact_ids).order_by('pk')
+            if options['contact_ids']:
+                contacts = contacts.filter(pk__in=options['contact_ids'])
+            for contact in contacts.iterator():
+                path = os.path.join(directory, f'{side}_{statements.filename(contact, start_date, end_date)}')
+                with open(path, 'wb') as output:
+                    statements.render(contact, side, start_date, end_date, output)
+                written += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} statement(s) for {start_date:%B %Y} to {directory} in {time.monotonic() - started:.1f}s"
+        ))
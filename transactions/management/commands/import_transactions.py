@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from transactions.importing import TransactionImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import customer invoices and vendor bills from a CSV or JSON Lines file (see transactions.importing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, one line item per row')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Line items inserted per transaction')
+        parser.add_argument('--user', help='Username recorded as creator of the documents')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without saving anything')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+        
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist")
+        
+        importer = TransactionImporter(user=user, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            importer.run(read_rows(stream, file_format))
+        
+        for line_no, message in importer.errors:
+            self.stderr.write(f"line {line_no}: {message}")
+        
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {importer.documents} document(s) with {importer.lines} line(s), {len(importer.errors)} error(s)"
+        ))
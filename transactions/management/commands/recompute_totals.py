@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from budgets.models import BudgetActual
+from transactions.models import PayableTransaction, PurchaseOrder, VendorBill, SalesOrder, CustomerInvoice
+
+
+DOCUMENT_MODELS = {
+    'purchase_orders': PurchaseOrder,
+    'vendor_bills': VendorBill,
+    'sales_orders': SalesOrder,
+    'customer_invoices': CustomerInvoice,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Repair drift between stored document totals/balances and their line items and payments; '
+        'total changes of posted invoices and bills are carried into the budget actuals ledger'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=list(DOCUMENT_MODELS), action='append', help='Limit to one document type (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Documents updated per statement')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted documents without fixing them')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        
+        for key in options['model'] or DOCUMENT_MODELS:
+            model = DOCUMENT_MODELS[key]
+            computed = model.computed_totals()
+            
+            # Documents where any stored column disagrees with its recomputed value
+            drifted = model.objects.annotate(
+                **{f'computed_{name}': expression for name, expression in computed.items()}
+            ).exclude(
+                **{name: F(f'computed_{name}') for name in computed}
+            ).order_by('pk').values_list('pk', flat=True)
+            
+            if options['dry_run']:
+                self.stdout.write(f"{key}: {drifted.count()} document(s) out of sync")
+                continue
+            
+            # Collect ids first so the scan is not reading rows it is rewriting
+            pks = list(drifted)
+            repaired = 0
+            for start in range(0, len(pks), chunk_size):
+                repaired += self._repair(model, pks[start:start + chunk_size])
+            
+            self.stdout.write(self.style.SUCCESS(f"{key}: repaired {repaired} document(s)"))
+
+    def _repair(self, model, pks):
+        with transaction.atomic():
+            if not issubclass(model, PayableTransaction):
+                return model.objects.filter(pk__in=pks).update(updated_at=timezone.now(), **model.computed_totals())
+            
+            # The ledger was built from the stored totals, so posted documents move it by what the repair changes
+            stored = {
+                row['pk']: row for row in model.objects.select_for_update().filter(pk__in=pks, status='posted').values(
+                    'pk', 'analytical_account_id', 'date', 'total_amount'
+                )
+            }
+            repaired = model.objects.filter(pk__in=pks).update(updated_at=timezone.now(), **model.computed_totals())
+            BudgetActual.record([
+                (stored[pk]['analytical_account_id'], stored[pk]['date'], total - stored[pk]['total_amount'])
+                for pk, total in model.objects.filter(pk__in=stored).values_list('pk', 'total_amount')
+            ])
+            return repaired
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:34
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+DOCUMENT_ITEMS = [
+    ('PurchaseOrder', 'PurchaseOrderItem', 'purchase_order'),
+    ('VendorBill', 'VendorBillItem', 'vendor_bill'),
+    ('SalesOrder', 'SalesOrderItem', 'sales_order'),
+    ('CustomerInvoice', 'CustomerInvoiceItem', 'customer_invoice'),
+]
+
+
+def backfill_totals(apps, schema_editor):
+    for document_name, item_name, fk in DOCUMENT_ITEMS:
+        document_model = apps.get_model('transactions', document_name)
+        item_model = apps.get_model('transactions', item_name)
+        items = item_model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+        total = Subquery(
+            items.annotate(total=Sum(F('quantity') * F('unit_price'))).values('total')[:1],
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+        lines = Subquery(items.annotate(lines=Count('pk')).values('lines')[:1], output_field=models.IntegerField())
+        document_model.objects.update(
+            total_amount=Coalesce(total, Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            line_count=Coalesce(lines, 0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_alter_payment_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerinvoice',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customerinvoice',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
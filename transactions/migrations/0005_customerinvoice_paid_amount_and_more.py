@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:36
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def backfill_balances(apps, schema_editor):
+    Payment = apps.get_model('transactions', 'Payment')
+    for document_name, fk in [('VendorBill', 'vendor_bill'), ('CustomerInvoice', 'customer_invoice')]:
+        document_model = apps.get_model('transactions', document_name)
+        payments = Payment.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+        paid = Subquery(
+            payments.annotate(paid=Sum('amount')).values('paid')[:1],
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+        document_model.objects.update(
+            paid_amount=Coalesce(paid, Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        )
+        document_model.objects.update(
+            remaining_amount=F('total_amount') - F('paid_amount'),
+            payment_status=Case(
+                When(paid_amount__lte=0, then=Value('not_paid')),
+                When(paid_amount__gte=F('total_amount'), then=Value('paid')),
+                default=Value('partially_paid'),
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_customerinvoice_line_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerinvoice',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customerinvoice',
+            name='remaining_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='remaining_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_documentsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['date', 'id'], name='customerinvoice_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['status', 'date', 'id'], name='customerinvoice_st_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['contact', 'date', 'id'], name='customerinvoice_ct_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['analytical_account', 'date', 'id'], name='customerinvoice_aa_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['payment_status', 'date', 'id'], name='customerinvoice_ps_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['date', 'id'], name='payment_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_method', 'date', 'id'], name='payment_method_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['date', 'id'], name='purchaseorder_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status', 'date', 'id'], name='purchaseorder_st_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['contact', 'date', 'id'], name='purchaseorder_ct_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['analytical_account', 'date', 'id'], name='purchaseorder_aa_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['date', 'id'], name='salesorder_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['status', 'date', 'id'], name='salesorder_st_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['contact', 'date', 'id'], name='salesorder_ct_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['analytical_account', 'date', 'id'], name='salesorder_aa_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['date', 'id'], name='vendorbill_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['status', 'date', 'id'], name='vendorbill_st_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['contact', 'date', 'id'], name='vendorbill_ct_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['analytical_account', 'date', 'id'], name='vendorbill_aa_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['payment_status', 'date', 'id'], name='vendorbill_ps_date_idx'),
+        ),
+    ]
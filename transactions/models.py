@@ -1,9 +1,39 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual, LessThanOrEqual
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from core.models import User, Contact, Product, AnalyticalAccount, AutoAnalyticalModel
+from .signals import documents_changed
 from decimal import Decimal
-import uuid
+
+
+class TransactionQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Join the relations list pages render so rows cost no extra queries"""
+        return self.select_related('contact', 'analytical_account')
+    
+    def totals(self):
+        """Aggregate the stored totals of the matching documents in one query"""
+        return self.order_by().aggregate(
+            count=Count('pk'),
+            total_amount=Coalesce(Sum('total_amount'), Decimal('0'), output_field=models.DecimalField()),
+        )
+
+
+class PayableTransactionQuerySet(TransactionQuerySet):
+    def outstanding(self):
+        return self.filter(status='posted', payment_status__in=['not_paid', 'partially_paid'])
+    
+    def totals(self):
+        return self.order_by().aggregate(
+            count=Count('pk'),
+            total_amount=Coalesce(Sum('total_amount'), Decimal('0'), output_field=models.DecimalField()),
+            paid_amount=Coalesce(Sum('paid_amount'), Decimal('0'), output_field=models.DecimalField()),
+            remaining_amount=Coalesce(Sum('remaining_amount'), Decimal('0'), output_field=models.DecimalField()),
+        )
 
 
 class Transaction(models.Model):
@@ -29,9 +59,93 @@ class Transaction(models.Model):
     budget_override = models.BooleanField(default=False)
     budget_override_reason = models.TextField(blank=True)
     
+    # Document totals, maintained incrementally by TransactionItem.save()/delete()
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    line_count = models.PositiveIntegerField(default=0)
+    
+    # Columns owned by the line items; a full save() of a stale instance must not overwrite them
+    maintained_fields = ('total_amount', 'line_count')
+    
+    # DOCUMENT_NUMBERING key used to allocate transaction_number
+    sequence_type = None
+    
+    objects = TransactionQuerySet.as_manager()
+    
     class Meta:
         abstract = True
         ordering = ['-date', '-created_at']
+        # Keyset pagination walks (date, id); the prefixed variants serve the list filters
+        indexes = [
+            models.Index(fields=['date', 'id'], name='%(class)s_date_id_idx'),
+            models.Index(fields=['status', 'date', 'id'], name='%(class)s_st_date_idx'),
+            models.Index(fields=['contact', 'date', 'id'], name='%(class)s_ct_date_idx'),
+            models.Index(fields=['analytical_account', 'date', 'id'], name='%(class)s_aa_date_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.maintained_fields
+            ]
+        if self.transaction_number:
+            super().save(*args, **kwargs)
+            return
+        
+        from .numbering import next_number
+        self.date = self._meta.get_field('date').to_python(self.date)
+        # Gapless sequences hold the counter lock until the document row is committed
+        with transaction.atomic():
+            try:
+                self.transaction_number = next_number(self.sequence_type, self.date)
+                super().save(*args, **kwargs)
+            except Exception:
+                self.transaction_number = ''
+                raise
+    
+    @classmethod
+    def item_totals_subqueries(cls):
+        """Return (total, line_count) subquery expressions computed from the items of OuterRef('pk')"""
+        rel = cls._meta.get_field('items')
+        items = rel.related_model.objects.filter(**{rel.field.name: OuterRef('pk')}).order_by().values(rel.field.name)
+        total = Subquery(
+            items.annotate(total=Sum(F('quantity') * F('unit_price'))).values('total')[:1],
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+        lines = Subquery(items.annotate(lines=Count('pk')).values('lines')[:1], output_field=models.IntegerField())
+        return (
+            Coalesce(total, Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            Coalesce(lines, 0),
+        )
+    
+    @classmethod
+    def computed_totals(cls):
+        """Expressions recomputing every maintained column from scratch, keyed by field name"""
+        total, lines = cls.item_totals_subqueries()
+        return {'total_amount': total, 'line_count': lines}
+    
+    @classmethod
+    def totals_delta_updates(cls, amount, lines):
+        """update() kwargs that add a line-item delta to the stored totals"""
+        return {
+            'total_amount': F('total_amount') + amount,
+            'line_count': F('line_count') + lines,
+            'updated_at': timezone.now(),
+        }
+    
+    def apply_totals_delta(self, amount, lines):
+        """Mirror totals_delta_updates() on this in-memory instance"""
+        self.total_amount += amount
+        self.line_count += lines
+    
+    @classmethod
+    def record_posted_delta(cls, pk, amount):
+        """Carry a line change of a posted document beyond its own row; nothing to do for orders"""
+    
+    def recalculate_totals(self):
+        """Recompute the stored totals of this document from its items"""
+        type(self).objects.filter(pk=self.pk).update(updated_at=timezone.now(), **self.computed_totals())
+        self.refresh_from_db(fields=list(self.maintained_fields))
     
     def validate_budget(self):
         """Validate against budget limits"""
@@ -66,24 +180,254 @@ class Transaction(models.Model):
         return {'status': 'within_budget', 'message': 'Within budget limits', 'budget': budget}
 
 
+class PayableTransaction(Transaction):
+    """Transaction settled by Payments (vendor bills and customer invoices)"""
+    # Payment balances, maintained by Payment.save()/delete()
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    remaining_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    
+    maintained_fields = Transaction.maintained_fields + ('paid_amount', 'remaining_amount', 'payment_status')
+    
+    objects = PayableTransactionQuerySet.as_manager()
+    
+    class Meta(Transaction.Meta):
+        abstract = True
+        indexes = Transaction.Meta.indexes + [
+            models.Index(fields=['payment_status', 'date', 'id'], name='%(class)s_ps_date_idx'),
+            # Watermark scans of the analytics rollups
+            models.Index(fields=['updated_at'], name='%(class)s_updated_idx'),
+        ]
+    
+    @staticmethod
+    def derive_payment_status(paid, total):
+        if paid <= 0:
+            return 'not_paid'
+        if paid >= total:
+            return 'paid'
+        return 'partially_paid'
+    
+    @staticmethod
+    def payment_status_expression(paid, total):
+        """SQL equivalent of derive_payment_status()"""
+        return Case(
+            When(LessThanOrEqual(paid, Decimal('0')), then=Value('not_paid')),
+            When(GreaterThanOrEqual(paid, total), then=Value('paid')),
+            default=Value('partially_paid'),
+        )
+    
+    @classmethod
+    def payments_subquery(cls):
+        """Sum of the payments recorded against OuterRef('pk')"""
+        rel = cls._meta.get_field('payments')
+        payments = rel.related_model.objects.filter(**{rel.field.name: OuterRef('pk')}).order_by().values(rel.field.name)
+        paid = Subquery(
+            payments.annotate(paid=Sum('amount')).values('paid')[:1],
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+        return Coalesce(paid, Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+    
+    @classmethod
+    def computed_totals(cls):
+        computed = super().computed_totals()
+        paid = cls.payments_subquery()
+        computed.update({
+            'paid_amount': paid,
+            'remaining_amount': computed['total_amount'] - paid,
+            'payment_status': cls.payment_status_expression(paid, computed['total_amount']),
+        })
+        return computed
+    
+    @classmethod
+    def totals_delta_updates(cls, amount, lines):
+        # payment_status goes first: MySQL evaluates SET assignments left to right,
+        # so it must be derived before total_amount is overwritten
+        updates = {'payment_status': cls.payment_status_expression(F('paid_amount'), F('total_amount') + amount)}
+        updates.update(super().totals_delta_updates(amount, lines))
+        updates['remaining_amount'] = F('remaining_amount') + amount
+        return updates
+    
+    def apply_totals_delta(self, amount, lines):
+        super().apply_totals_delta(amount, lines)
+        self.remaining_amount += amount
+        self.payment_status = self.derive_payment_status(self.paid_amount, self.total_amount)
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Documents created as posted skip set_status(); their total (usually still zero) goes to the ledger here
+            if adding and self.status == 'posted' and self.total_amount:
+                self.record_posted_delta(self.pk, self.total_amount)
+    
+    @classmethod
+    def record_posted_delta(cls, pk, amount):
+        """Add a line change of a posted document to the budget actuals ledger and its analytics facts.
+        
+        Called after the delta's UPDATE, so the document row is already locked
+        and set_status() cannot post or cancel it in between.
+        """
+        from budgets.models import BudgetActual
+        
+        stored = cls.objects.filter(pk=pk, status='posted').values('date', 'analytical_account_id').first()
+        if stored is None:
+            return
+        BudgetActual.record([(stored['analytical_account_id'], stored['date'], amount)])
+        # Facts also carry line counts, products and line accounts, so any line change rebuilds the date
+        documents_changed.send(sender=cls, dates={stored['date']})
+    
+    @classmethod
+    def apply_payment(cls, pk, amount):
+        """Add amount (negative to reverse) to a document's paid balance in a single UPDATE"""
+        paid = F('paid_amount') + amount
+        return cls.objects.filter(pk=pk).update(
+            payment_status=cls.payment_status_expression(paid, F('total_amount')),
+            paid_amount=paid,
+            remaining_amount=F('remaining_amount') - amount,
+            updated_at=timezone.now(),
+        )
+    
+    def apply_payment_delta(self, amount):
+        """Mirror apply_payment() on this in-memory instance"""
+        self.paid_amount += amount
+        self.remaining_amount -= amount
+        self.payment_status = self.derive_payment_status(self.paid_amount, self.total_amount)
+    
+    @classmethod
+    def lock_for_payment(cls, pk):
+        """Fetch a document with its row locked until the current transaction ends"""
+        return cls.objects.select_for_update().get(pk=pk)
+    
+    def update_payment_status(self):
+        """Re-derive payment_status from the stored balances"""
+        self.apply_payment(self.pk, Decimal('0'))
+        self.refresh_from_db(fields=['payment_status'])
+    
+    def set_status(self, status):
+        """Change status, posting or reversing the document in the budget actuals ledger"""
+        from budgets.models import BudgetActual
+        
+        with transaction.atomic():
+            stored = type(self).objects.select_for_update().values(
+                'status', 'date', 'analytical_account_id', 'total_amount'
+            ).get(pk=self.pk)
+            self.status = status
+            self.save(update_fields=['status', 'updated_at'])
+            
+            # Only a transition into or out of 'posted' moves the actuals
+            if (stored['status'] == 'posted') != (status == 'posted'):
+                amount = stored['total_amount'] if status == 'posted' else -stored['total_amount']
+                BudgetActual.record([(stored['analytical_account_id'], stored['date'], amount)])
+    
+    @classmethod
+    def bulk_set_status(cls, pks, status, force=False, chunk_size=1000):
+        """Change the status of many documents at once and return a per-document report.
+        
+        Rows are locked and read in one pass, budgets are checked for the whole
+        batch, each chunk of allowed transitions is flipped with a single UPDATE
+        and the actuals ledger is adjusted with one BudgetActual.record() call.
+        """
+        from budgets.models import BudgetActual
+        
+        allowed_from = {'posted': ('draft',), 'cancelled': ('draft', 'posted')}[status]
+        pks = list(dict.fromkeys(int(pk) for pk in pks))
+        report = {}
+        
+        with transaction.atomic():
+            rows = []
+            for start in range(0, len(pks), chunk_size):
+                rows.extend(
+                    cls.objects.select_for_update().filter(pk__in=pks[start:start + chunk_size]).values(
+                        'pk', 'transaction_number', 'status', 'date', 'analytical_account_id',
+                        'total_amount', 'budget_override'
+                    )
+                )
+            rows.sort(key=lambda row: (row['date'], row['pk']))
+            
+            candidates = []
+            for row in rows:
+                if row['status'] == status:
+                    report[row['pk']] = ('unchanged', f"Already {status}")
+                elif row['status'] not in allowed_from:
+                    report[row['pk']] = ('skipped', f"A {row['status']} document cannot be {status}")
+                else:
+                    candidates.append(row)
+            
+            if status == 'posted':
+                candidates = cls._within_budget(candidates, report, force)
+            
+            ids = [row['pk'] for row in candidates]
+            now = timezone.now()
+            for start in range(0, len(ids), chunk_size):
+                cls.objects.filter(pk__in=ids[start:start + chunk_size]).update(status=status, updated_at=now)
+            
+            BudgetActual.record([
+                (row['analytical_account_id'], row['date'], row['total_amount'] if status == 'posted' else -row['total_amount'])
+                for row in candidates
+                if (row['status'] == 'posted') != (status == 'posted')
+            ])
+            for row in candidates:
+                report[row['pk']] = (status, f"{row['status'].capitalize()} -> {status}")
+            if candidates:
+                documents_changed.send(sender=cls, dates={row['date'] for row in candidates})
+        
+        numbers = {row['pk']: row['transaction_number'] for row in rows}
+        return [
+            {
+                'id': pk,
+                'transaction_number': numbers.get(pk),
+                'result': report.get(pk, ('not_found',))[0],
+                'message': report.get(pk, (None, 'Document not found'))[1],
+            }
+            for pk in pks
+        ]
+    
+    @classmethod
+    def _within_budget(cls, rows, report, force):
+        """validate_budget() for a batch: rows that fit their budget, counting earlier rows of the batch"""
+        from budgets.models import Budget
+        
+        budgets = {}
+        account_ids = {row['analytical_account_id'] for row in rows if row['analytical_account_id']}
+        for budget in Budget.objects.with_actuals().filter(
+            analytical_account_id__in=account_ids, status='confirmed', is_active=True
+        ):
+            budgets.setdefault(budget.analytical_account_id, []).append(budget)
+        
+        accepted = []
+        pending = {}
+        for row in rows:
+            budget = next(
+                (
+                    budget for budget in budgets.get(row['analytical_account_id'], [])
+                    if budget.start_date <= row['date'] <= budget.end_date
+                ),
+                None
+            )
+            if budget is not None:
+                projected = budget.actual_amount + pending.get(budget.pk, 0) + row['total_amount']
+                if projected > budget.budgeted_amount and not (force or row['budget_override']):
+                    report[row['pk']] = (
+                        'blocked', f"Exceeds approved budget by ₹{projected - budget.budgeted_amount:,.2f}"
+                    )
+                    continue
+                pending[budget.pk] = pending.get(budget.pk, 0) + row['total_amount']
+            accepted.append(row)
+        return accepted
+
+
 class PurchaseOrder(Transaction):
+    sequence_type = 'purchase_order'
+    
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_purchase_orders')
     expected_delivery_date = models.DateField(null=True, blank=True)
     
     def __str__(self):
         return f"PO-{self.transaction_number}"
-    
-    @property
-    def total_amount(self):
-        return sum(item.line_total for item in self.items.all())
-    
-    def save(self, *args, **kwargs):
-        if not self.transaction_number:
-            self.transaction_number = f"PO{uuid.uuid4().hex[:8].upper()}"
-        super().save(*args, **kwargs)
 
 
-class VendorBill(Transaction):
+class VendorBill(PayableTransaction):
+    sequence_type = 'vendor_bill'
+    
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_vendor_bills')
     bill_number = models.CharField(max_length=50, blank=True)
     due_date = models.DateField()
@@ -95,55 +439,21 @@ class VendorBill(Transaction):
     
     def __str__(self):
         return f"VB-{self.transaction_number}"
-    
-    @property
-    def total_amount(self):
-        return sum(item.line_total for item in self.items.all())
-    
-    @property
-    def paid_amount(self):
-        return sum(payment.amount for payment in self.payments.all())
-    
-    @property
-    def remaining_amount(self):
-        return self.total_amount - self.paid_amount
-    
-    def update_payment_status(self):
-        paid = self.paid_amount
-        total = self.total_amount
-        
-        if paid == 0:
-            self.payment_status = 'not_paid'
-        elif paid >= total:
-            self.payment_status = 'paid'
-        else:
-            self.payment_status = 'partially_paid'
-        self.save()
-    
-    def save(self, *args, **kwargs):
-        if not self.transaction_number:
-            self.transaction_number = f"VB{uuid.uuid4().hex[:8].upper()}"
-        super().save(*args, **kwargs)
 
 
 class SalesOrder(Transaction):
+    sequence_type = 'sales_order'
+    
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_sales_orders')
     expected_delivery_date = models.DateField(null=True, blank=True)
     
     def __str__(self):
         return f"SO-{self.transaction_number}"
-    
-    @property
-    def total_amount(self):
-        return sum(item.line_total for item in self.items.all())
-    
-    def save(self, *args, **kwargs):
-        if not self.transaction_number:
-            self.transaction_number = f"SO{uuid.uuid4().hex[:8].upper()}"
-        super().save(*args, **kwargs)
 
 
-class CustomerInvoice(Transaction):
+class CustomerInvoice(PayableTransaction):
+    sequence_type = 'customer_invoice'
+    
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_customer_invoices')
     invoice_number = models.CharField(max_length=50, blank=True)
     due_date = models.DateField()
@@ -155,35 +465,6 @@ class CustomerInvoice(Transaction):
     
     def __str__(self):
         return f"INV-{self.transaction_number}"
-    
-    @property
-    def total_amount(self):
-        return sum(item.line_total for item in self.items.all())
-    
-    @property
-    def paid_amount(self):
-        return sum(payment.amount for payment in self.payments.all())
-    
-    @property
-    def remaining_amount(self):
-        return self.total_amount - self.paid_amount
-    
-    def update_payment_status(self):
-        paid = self.paid_amount
-        total = self.total_amount
-        
-        if paid == 0:
-            self.payment_status = 'not_paid'
-        elif paid >= total:
-            self.payment_status = 'paid'
-        else:
-            self.payment_status = 'partially_paid'
-        self.save()
-    
-    def save(self, *args, **kwargs):
-        if not self.transaction_number:
-            self.transaction_number = f"INV{uuid.uuid4().hex[:8].upper()}"
-        super().save(*args, **kwargs)
 
 
 class TransactionItem(models.Model):
@@ -194,16 +475,74 @@ class TransactionItem(models.Model):
     analytical_account = models.ForeignKey(AnalyticalAccount, on_delete=models.SET_NULL, null=True, blank=True)
     notes = models.CharField(max_length=255, blank=True)
     
+    # Name of the ForeignKey to the parent document, set by each subclass
+    document_field = None
+    
     class Meta:
         abstract = True
     
     @property
     def line_total(self):
         return self.quantity * self.unit_price
+    
+    @property
+    def document_id(self):
+        return getattr(self, f'{self.document_field}_id')
+    
+    def _original_totals(self):
+        """(document_id, line_total) of the row as stored, locked until the transaction ends; None for a new row.
+        
+        Read inside the atomic block of save()/delete() so concurrent edits of
+        the same line apply their deltas one after the other.
+        """
+        if self._state.adding or self.pk is None:
+            return None
+        row = type(self).objects.select_for_update().filter(pk=self.pk).values_list(
+            f'{self.document_field}_id', 'quantity', 'unit_price'
+        ).first()
+        return (row[0], row[1] * row[2]) if row is not None else None
+    
+    def _shift_document_totals(self, document_id, amount, lines):
+        """Apply a delta to the parent document's stored totals with a single UPDATE"""
+        field = self._meta.get_field(self.document_field)
+        document_model = field.related_model
+        if amount or lines:
+            document_model.objects.filter(pk=document_id).update(**document_model.totals_delta_updates(amount, lines))
+            # Keep an already-loaded parent in step so callers such as validate_budget() see the new total
+            if field.is_cached(self):
+                document = field.get_cached_value(self)
+                if document is not None and document.pk == document_id:
+                    document.apply_totals_delta(amount, lines)
+        document_model.record_posted_delta(document_id, amount)
+    
+    def save(self, *args, **kwargs):
+        # Views pass raw POST strings; normalise so line_total is a Decimal
+        for name in ('quantity', 'unit_price'):
+            setattr(self, name, self._meta.get_field(name).to_python(getattr(self, name)))
+        
+        with transaction.atomic():
+            original = self._original_totals()
+            super().save(*args, **kwargs)
+            if original is None:
+                self._shift_document_totals(self.document_id, self.line_total, 1)
+            elif original[0] == self.document_id:
+                self._shift_document_totals(self.document_id, self.line_total - original[1], 0)
+            else:
+                self._shift_document_totals(original[0], -original[1], -1)
+                self._shift_document_totals(self.document_id, self.line_total, 1)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            original = self._original_totals()
+            result = super().delete(*args, **kwargs)
+            if original is not None:
+                self._shift_document_totals(original[0], -original[1], -1)
+        return result
 
 
 class PurchaseOrderItem(TransactionItem):
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='items')
+    document_field = 'purchase_order'
     
     class Meta:
         ordering = ['id']
@@ -211,6 +550,7 @@ class PurchaseOrderItem(TransactionItem):
 
 class VendorBillItem(TransactionItem):
     vendor_bill = models.ForeignKey(VendorBill, on_delete=models.CASCADE, related_name='items')
+    document_field = 'vendor_bill'
     
     class Meta:
         ordering = ['id']
@@ -218,6 +558,7 @@ class VendorBillItem(TransactionItem):
 
 class SalesOrderItem(TransactionItem):
     sales_order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='items')
+    document_field = 'sales_order'
     
     class Meta:
         ordering = ['id']
@@ -225,6 +566,7 @@ class SalesOrderItem(TransactionItem):
 
 class CustomerInvoiceItem(TransactionItem):
     customer_invoice = models.ForeignKey(CustomerInvoice, on_delete=models.CASCADE, related_name='items')
+    document_field = 'customer_invoice'
     
     class Meta:
         ordering = ['id']
@@ -259,19 +601,82 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['date', 'id'], name='payment_date_id_idx'),
+            models.Index(fields=['payment_method', 'date', 'id'], name='payment_method_date_idx'),
+        ]
     
     def __str__(self):
         return f"PAY-{self.payment_number}"
     
+    # ForeignKeys to the documents a payment can be applied to
+    document_fields = ('customer_invoice', 'vendor_bill')
+    
+    def _allocations(self):
+        """{(field, document_id): amount} this payment contributes to the documents' balances"""
+        return {
+            (name, getattr(self, f'{name}_id')): self.amount
+            for name in self.document_fields
+            if getattr(self, f'{name}_id') is not None
+        }
+    
+    def _original_allocations(self):
+        """_allocations() of the row as stored, locked until the transaction ends; empty for a new payment.
+        
+        Read inside the atomic block of save()/delete() so concurrent edits of
+        the same payment apply their deltas one after the other.
+        """
+        if self._state.adding or self.pk is None:
+            return {}
+        stored = type(self).objects.select_for_update().filter(pk=self.pk).only('amount', *self.document_fields).first()
+        return stored._allocations() if stored else {}
+    
+    def _apply_allocations(self, deltas):
+        """Apply {(field, document_id): amount} to the documents' paid balances"""
+        for (name, document_id), amount in deltas.items():
+            if not amount:
+                continue
+            field = self._meta.get_field(name)
+            field.related_model.apply_payment(document_id, amount)
+            if field.is_cached(self):
+                document = field.get_cached_value(self)
+                if document is not None and document.pk == document_id:
+                    document.apply_payment_delta(amount)
+    
     def save(self, *args, **kwargs):
-        if not self.payment_number:
-            self.payment_number = f"PAY{uuid.uuid4().hex[:8].upper()}"
-        super().save(*args, **kwargs)
-        # Update payment status on related invoice/bill
-        if self.customer_invoice:
-            self.customer_invoice.update_payment_status()
-        if self.vendor_bill:
-            self.vendor_bill.update_payment_status()
+        self.amount = self._meta.get_field('amount').to_python(self.amount)
+        
+        with transaction.atomic():
+            if not self.payment_number:
+                from .numbering import next_number
+                self.payment_number = next_number('payment', self._meta.get_field('date').to_python(self.date))
+            original = self._original_allocations()
+            super().save(*args, **kwargs)
+            current = self._allocations()
+            deltas = {key: current.get(key, 0) - original.get(key, 0) for key in original.keys() | current.keys()}
+            self._apply_allocations(deltas)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            original = self._original_allocations()
+            result = super().delete(*args, **kwargs)
+            self._apply_allocations({key: -amount for key, amount in original.items()})
+        return result
+
+
+class DocumentSequence(models.Model):
+    """Next free number per document type and fiscal year, see transactions.numbering"""
+    document_type = models.CharField(max_length=30)
+    fiscal_year = models.PositiveIntegerField()
+    next_value = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['document_type', 'fiscal_year']
+        ordering = ['document_type', 'fiscal_year']
+    
+    def __str__(self):
+        return f"{self.document_type} {self.fiscal_year}: {self.next_value}"
 
 
 # Chart of Accounts
@@ -0,0 +1,117 @@
+"""Document number allocation backed by the DocumentSequence counter table.
+
+Each (document type, fiscal year) pair has one counter row. Outside gapless
+mode a process reserves a block of numbers with a single locked increment and
+hands them out from memory, so creating many documents costs one counter
+update per block rather than per document. Numbers of a block the process
+never uses are skipped, so such sequences may have gaps.
+
+Gapless types increment the counter by one inside the caller's transaction.
+The row lock is held until that transaction commits, which serialises
+creation of that type but guarantees consecutive numbers: a rollback also
+rolls the counter back.
+
+A block reserved inside an atomic block only becomes available to other
+documents once that transaction commits; batch creators should therefore ask
+reserve_numbers() for all the numbers they need in one call.
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+
+DEFAULT_FORMAT = '{prefix}/{year}/{number:06d}'
+DEFAULT_BLOCK_SIZE = 50
+
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def sequence_config(document_type):
+    config = getattr(settings, 'DOCUMENT_NUMBERING', {}).get(document_type, {})
+    return {
+        'prefix': config.get('prefix', document_type.upper()),
+        'format': config.get('format', getattr(settings, 'DOCUMENT_NUMBER_FORMAT', DEFAULT_FORMAT)),
+        'gapless': config.get('gapless', False),
+        'block_size': config.get('block_size', getattr(settings, 'DOCUMENT_NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)),
+    }
+
+
+def fiscal_year(day=None):
+    """Fiscal year a date falls in, named after the calendar year it starts in"""
+    day = day or timezone.localdate()
+    start_month = getattr(settings, 'FISCAL_YEAR_START_MONTH', 1)
+    return day.year if day.month >= start_month else day.year - 1
+
+
+def format_number(document_type, year, value):
+    config = sequence_config(document_type)
+    return config['format'].format(prefix=config['prefix'], year=year, number=value)
+
+
+def _increment(document_type, year, count):
+    """Advance the stored counter by count and return the first value reserved"""
+    counter = DocumentSequence.objects.filter(document_type=document_type, fiscal_year=year)
+    with transaction.atomic():
+        # The UPDATE takes the row lock, so the read-back below sees our own increment
+        if not counter.update(next_value=F('next_value') + count, updated_at=timezone.now()):
+            DocumentSequence.objects.get_or_create(document_type=document_type, fiscal_year=year)
+            counter.update(next_value=F('next_value') + count, updated_at=timezone.now())
+        return counter.values_list('next_value', flat=True).get() - count
+
+
+def _install_block(key, start, stop):
+    if start < stop:
+        with _blocks_lock:
+            _blocks.setdefault(key, deque()).append([start, stop])
+
+
+def _take_from_blocks(key, count):
+    values = []
+    with _blocks_lock:
+        ranges = _blocks.get(key)
+        while ranges and len(values) < count:
+            block = ranges[0]
+            take = min(count - len(values), block[1] - block[0])
+            values.extend(range(block[0], block[0] + take))
+            block[0] += take
+            if block[0] >= block[1]:
+                ranges.popleft()
+    return values
+
+
+def reserve_numbers(document_type, day=None, count=1):
+    """Allocate count formatted numbers for documents of document_type dated day"""
+    config = sequence_config(document_type)
+    year = fiscal_year(day)
+
+    if config['gapless']:
+        start = _increment(document_type, year, count)
+        values = list(range(start, start + count))
+    else:
+        key = (document_type, year)
+        values = _take_from_blocks(key, count)
+        missing = count - len(values)
+        if missing:
+            size = max(missing, config['block_size'])
+            start = _increment(document_type, year, size)
+            values.extend(range(start, start + missing))
+            # Only hand out the rest of the block once the reservation is durable,
+            # otherwise a rollback would let another process reserve it again
+            leftover = (key, start + missing, start + size)
+            if connection.in_atomic_block:
+                transaction.on_commit(lambda: _install_block(*leftover))
+            else:
+                _install_block(*leftover)
+
+    return [format_number(document_type, year, value) for value in values]
+
+
+def next_number(document_type, day=None):
+    return reserve_numbers(document_type, day)[0]
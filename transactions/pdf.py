@@ -0,0 +1,548 @@
+"""PDF rendering of invoices, bills, orders, payment receipts and statements.
+
+DocumentRenderer compiles the paragraph and table styles of every layout
+once; get_renderer() keeps one per process. render() draws a document from
+a snapshot: a plain, picklable dict built by snapshot() from a document
+fetched with snapshot_queryset(), so the layout itself never touches the
+database and two documents with equal snapshots produce the same PDF.
+render_statement() draws an account statement from an iterable of entries,
+consumed as the pages are laid out.
+"""
+import itertools
+import threading
+
+from django.db.models import Prefetch
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus.flowables import KeepTogether
+
+from .models import CustomerInvoice, Payment, PurchaseOrder, SalesOrder, VendorBill
+
+
+COMPANY_INFO = """<b>ACCORIX</b><br/>
+    Finance OS - Complete Accounting Solution"""
+
+COMPANY_ADDRESS = """<b>ACCORIX SYSTEMS PVT LTD</b><br/>
+    123 Business Park, Tech City<br/>
+    Mumbai, Maharashtra 400001<br/>
+    Phone: +91 22 1234 5678<br/>
+    Email: info@accorix.com<br/>
+    GST: 27ABCDE1234F1Z5"""
+
+CONTACT_LINE = 'For any queries, contact us at info@accorix.com or +91 22 1234 5678'
+
+GST_RATE = 0.18
+
+# kind: what differs between the document layouts
+LAYOUTS = {
+    'invoice': {
+        'title': 'INVOICE',
+        'accent': '#00BCD4',
+        'party': 'BILL TO:',
+        'noun': 'invoice',
+        'currency': '₹',
+        'thanks': 'Thank you for your business!',
+    },
+    'bill': {
+        'title': 'BILL',
+        'accent': '#E91E63',
+        'party': 'VENDOR:',
+        'noun': 'bill',
+        'currency': 'Rs',
+        'thanks': 'Thank you for your service!',
+    },
+    'purchase_order': {
+        'title': 'PURCHASE ORDER',
+        'title_size': 20,
+        'accent': '#E91E63',
+        'party': 'VENDOR:',
+        'noun': 'purchase order',
+        'currency': '₹',
+        'thanks': 'Thank you for your service!',
+    },
+    'sales_order': {
+        'title': 'SALES ORDER',
+        'title_size': 22,
+        'accent': '#00BCD4',
+        'party': 'CUSTOMER:',
+        'noun': 'sales order',
+        'currency': '₹',
+        'thanks': 'Thank you for your business!',
+    },
+    'receipt': {
+        'title': 'RECEIPT',
+        'accent': '#4CAF50',
+        'party': 'RECEIVED FROM:',
+        'noun': 'receipt',
+        'currency': '₹',
+        'thanks': 'Thank you for your payment!',
+    },
+    'statement': {
+        'title': 'STATEMENT',
+        'title_size': 24,
+        'accent': '#1a365d',
+        'party': 'STATEMENT FOR:',
+        'noun': 'statement',
+        'currency': 'Rs',
+        'thanks': 'Thank you for your business!',
+    },
+}
+
+# Statement entries laid out per table; each table splits across pages as needed
+STATEMENT_ROWS_PER_TABLE = 40
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+class DocumentRenderer:
+    """Draws document snapshots as A4 PDFs with styles compiled once"""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.normal = styles['Normal']
+        self.company_style = ParagraphStyle(
+            'CompanyStyle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=3,
+            textColor=colors.HexColor('#1a365d'),
+            alignment=TA_LEFT,
+            fontName='Helvetica-Bold'
+        )
+        self.footer_style = ParagraphStyle(
+            'FooterStyle',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#4a5568'),
+            alignment=TA_CENTER
+        )
+        self.header_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+        ])
+        self.address_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 25),
+        ])
+        self.details_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f7fafc')),
+            ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#f7fafc')),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+        ])
+        self.items_table_style = TableStyle([
+            # Header styling
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),   # # header
+            ('ALIGN', (1, 0), (1, 0), 'LEFT'),     # DESCRIPTION header
+            ('ALIGN', (2, 0), (2, 0), 'CENTER'),   # QTY header
+            ('ALIGN', (3, 0), (3, 0), 'RIGHT'),    # RATE header
+            ('ALIGN', (4, 0), (4, 0), 'RIGHT'),    # AMOUNT header
+
+            # Data rows alignment
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Item number - center
+            ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Description - left
+            ('ALIGN', (2, 1), (2, -1), 'CENTER'),  # Quantity - center
+            ('ALIGN', (3, 1), (3, -1), 'RIGHT'),   # Rate - right
+            ('ALIGN', (4, 1), (4, -1), 'RIGHT'),   # Amount - right
+
+            # Borders and padding
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+        ])
+
+        self.statement_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (3, 0), (-1, -1), 'RIGHT'),  # Amounts - right
+            ('LINEBELOW', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ])
+
+        # The accent colour styles of each layout
+        self.title_styles, self.line_table_styles, self.summary_table_styles = {}, {}, {}
+        for kind, layout in LAYOUTS.items():
+            accent = colors.HexColor(layout['accent'])
+            self.title_styles[kind] = ParagraphStyle(
+                f'{kind}TitleStyle',
+                parent=styles['Heading1'],
+                fontSize=layout.get('title_size', 28),
+                spaceAfter=20,
+                textColor=accent,
+                alignment=TA_RIGHT,
+                fontName='Helvetica-Bold'
+            )
+            self.line_table_styles[kind] = TableStyle([
+                ('LINEBELOW', (0, 0), (-1, 0), 3, accent),
+                ('TOPPADDING', (0, 0), (-1, 0), 0),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 20),
+            ])
+            self.summary_table_styles[kind] = TableStyle([
+                ('FONTNAME', (0, 0), (-1, -2), 'Helvetica'),
+                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -2), 11),
+                ('FONTSIZE', (0, -1), (-1, -1), 13),
+                ('ALIGN', (2, 0), (2, -1), 'RIGHT'),   # Labels - right aligned
+                ('ALIGN', (3, 0), (3, -1), 'RIGHT'),   # Values - right aligned
+                ('BACKGROUND', (0, -1), (-1, -1), accent),
+                ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+                ('GRID', (2, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+                ('TOPPADDING', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+                ('LEFTPADDING', (0, 0), (-1, -1), 10),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ])
+
+    def _table(self, data, col_widths, style):
+        table = Table(data, colWidths=col_widths)
+        table.setStyle(style)
+        return table
+
+    def render(self, snapshot, output):
+        """Write the PDF of snapshot to the file-like output"""
+        kind = snapshot['kind']
+        layout = LAYOUTS[kind]
+        currency = layout['currency']
+        doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
+
+        party = snapshot['party']
+        party_address = f"""<b>{snapshot.get('party_label', layout['party'])}</b><br/>
+    <b>{party['name']}</b><br/>
+    {party['address'] or 'Address not provided'}<br/>
+    Phone: {party['phone'] or 'Not provided'}<br/>
+    Email: {party['email'] or 'Not provided'}"""
+
+        items_data = [['#', 'DESCRIPTION', 'QTY', 'RATE', 'AMOUNT']]
+        for index, (name, quantity, unit_price, line_total) in enumerate(snapshot['items'], 1):
+            items_data.append([
+                str(index),
+                name,
+                f"{int(quantity)}",
+                f"₹ {unit_price:,.2f}",
+                f"₹ {line_total:,.2f}"
+            ])
+
+        summary_data = [['', '', label, f"{currency} {value:,.2f}"] for label, value in snapshot['summary']]
+
+        terms = '<br/>\n    '.join(
+            f'{number}. {line}' for number, line in enumerate(snapshot['terms'], 1)
+        )
+
+        elements = [
+            self._table(
+                [[Paragraph(COMPANY_INFO, self.company_style), Paragraph(layout['title'], self.title_styles[kind])]],
+                [4*inch, 3.5*inch], self.header_table_style
+            ),
+            self._table([['']], [7.5*inch], self.line_table_styles[kind]),
+            self._table(
+                [[Paragraph(COMPANY_ADDRESS, self.normal), Paragraph(party_address, self.normal)]],
+                [3.75*inch, 3.75*inch], self.address_table_style
+            ),
+            self._table(snapshot['details'], [1.2*inch, 2.6*inch, 1.2*inch, 2.5*inch], self.details_table_style),
+            Spacer(1, 30),
+            self._table(items_data, [0.5*inch, 3.8*inch, 0.7*inch, 1.3*inch, 1.7*inch], self.items_table_style),
+            Spacer(1, 20),
+            self._table(summary_data, [0.5*inch, 3.8*inch, 1.5*inch, 2.2*inch], self.summary_table_styles[kind]),
+            Spacer(1, 40),
+            Paragraph(f"""<b>Terms & Conditions:</b><br/>
+    {terms}""", self.normal),
+            Spacer(1, 30),
+            Paragraph(f"""<b>{layout['thanks']}</b><br/>
+    {CONTACT_LINE}""", self.footer_style),
+        ]
+        doc.build(elements)
+
+    def render_statement(self, header, entries, output):
+        """Write the statement PDF of header's party to the file-like output.
+
+        header holds party, details (rows for the details table), opening
+        and footer; entries yields (date, reference, description, charge,
+        payment, balance) in order. Entries are turned into tables only as
+        the pages fill up, so a long statement never holds all its rows.
+        """
+        layout = LAYOUTS['statement']
+        currency = layout['currency']
+        doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=50)
+
+        party = header['party']
+        party_address = f"""<b>{header.get('party_label', layout['party'])}</b><br/>
+    <b>{party['name']}</b><br/>
+    {party['address'] or 'Address not provided'}<br/>
+    Phone: {party['phone'] or 'Not provided'}<br/>
+    Email: {party['email'] or 'Not provided'}"""
+
+        # Running totals for the closing summary, filled in while the entry tables are drawn
+        totals = {'charges': 0, 'payments': 0, 'balance': header['opening']}
+
+        def entry_tables():
+            heading = ['DATE', 'REFERENCE', 'DESCRIPTION', 'CHARGES', 'PAYMENTS', 'BALANCE']
+            rows = [heading, ['', '', 'Opening balance', '', '', f"{header['opening']:,.2f}"]]
+            for entry_date, reference, description, charge, payment, balance in entries:
+                totals['charges'] += charge
+                totals['payments'] += payment
+                totals['balance'] = balance
+                rows.append([
+                    entry_date.strftime('%d %b %Y'),
+                    reference,
+                    description,
+                    f"{charge:,.2f}" if charge else '',
+                    f"{payment:,.2f}" if payment else '',
+                    f"{balance:,.2f}",
+                ])
+                if len(rows) > STATEMENT_ROWS_PER_TABLE:
+                    yield self._entry_table(rows)
+                    rows = [heading]
+            if len(rows) > 1:
+                yield self._entry_table(rows)
+
+        def closing():
+            summary_data = [['', '', label, f"{currency} {value:,.2f}"] for label, value in (
+                ('Opening Balance:', header['opening']),
+                ('Total Charges:', totals['charges']),
+                ('Total Payments:', totals['payments']),
+                ('CLOSING BALANCE:', totals['balance']),
+            )]
+            yield Spacer(1, 20)
+            yield KeepTogether([
+                self._table(summary_data, [0.5*inch, 3.8*inch, 1.5*inch, 2.2*inch], self.summary_table_styles['statement']),
+                Spacer(1, 30),
+                Paragraph(f"""<b>{layout['thanks']}</b><br/>
+    {CONTACT_LINE}""", self.footer_style),
+            ])
+
+        def page_footer(canvas, doc):
+            canvas.saveState()
+            canvas.setFont('Helvetica', 8)
+            canvas.setFillColor(colors.HexColor('#4a5568'))
+            canvas.drawString(40, 30, header['footer'])
+            canvas.drawRightString(A4[0] - 40, 30, f'Page {doc.page}')
+            canvas.restoreState()
+
+        elements = [
+            self._table(
+                [[Paragraph(COMPANY_INFO, self.company_style), Paragraph(layout['title'], self.title_styles['statement'])]],
+                [4*inch, 3.5*inch], self.header_table_style
+            ),
+            self._table([['']], [7.5*inch], self.line_table_styles['statement']),
+            self._table(
+                [[Paragraph(COMPANY_ADDRESS, self.normal), Paragraph(party_address, self.normal)]],
+                [3.75*inch, 3.75*inch], self.address_table_style
+            ),
+            self._table(header['details'], [1.2*inch, 2.6*inch, 1.2*inch, 2.5*inch], self.details_table_style),
+            Spacer(1, 20),
+        ]
+        doc.build(
+            _FlowableFeed(itertools.chain(elements, entry_tables(), closing())),
+            onFirstPage=page_footer, onLaterPages=page_footer,
+        )
+
+    def _entry_table(self, rows):
+        table = Table(rows, colWidths=[0.9*inch, 1.3*inch, 2.3*inch, 1*inch, 1*inch, 1*inch], repeatRows=1)
+        table.setStyle(self.statement_table_style)
+        return table
+
+
+class _FlowableFeed(list):
+    """The flowable list handed to build(), topped up from an iterable as build() takes flowables off the front.
+
+    build() checks len() before laying out each flowable, so only a couple
+    of flowables exist ahead of the one being placed.
+    """
+    LOOKAHEAD = 2
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def __len__(self):
+        while self._source is not None and super().__len__() < self.LOOKAHEAD:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return super().__len__()
+
+
+def get_renderer():
+    """The process-wide DocumentRenderer, built on first use"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = DocumentRenderer()
+        return _renderer
+
+
+def render(snapshot, output):
+    get_renderer().render(snapshot, output)
+
+
+def render_statement(header, entries, output):
+    get_renderer().render_statement(header, entries, output)
+
+
+def snapshot_queryset(model):
+    """model's documents with everything snapshot() reads: the party joined, the lines prefetched in one query"""
+    if model is Payment:
+        return Payment.objects.select_related('customer_invoice__contact', 'vendor_bill__contact')
+    items = model._meta.get_field('items').related_model
+    return model.objects.select_related('contact').prefetch_related(
+        Prefetch('items', queryset=items.objects.select_related('product').only(
+            'product__name', 'quantity', 'unit_price', items.document_field
+        ))
+    )
+
+
+def _party(contact):
+    return {'name': contact.name, 'address': contact.address, 'phone': contact.phone, 'email': contact.email}
+
+
+def _lines(document):
+    items = [(item.product.name, item.quantity, item.unit_price, item.line_total) for item in document.items.all()]
+    subtotal = sum(line_total for _, _, _, line_total in items)
+    tax_amount = float(subtotal) * GST_RATE
+    summary = [
+        ('Subtotal:', subtotal),
+        ('GST (18%):', tax_amount),
+        ('TOTAL AMOUNT:', float(subtotal) + tax_amount),
+    ]
+    return items, summary
+
+
+def _payment_terms(noun):
+    return [
+        f'Payment is due within 30 days of {noun} date.',
+        'Late payments may incur additional charges.',
+        'All disputes must be reported within 7 days.',
+        f'This {noun} is computer generated and does not require signature.',
+    ]
+
+
+def invoice_snapshot(invoice):
+    items, summary = _lines(invoice)
+    return {
+        'kind': 'invoice',
+        'id': invoice.pk,
+        'number': invoice.transaction_number,
+        'party': _party(invoice.contact),
+        'details': [
+            ['Invoice Number:', invoice.transaction_number, 'Invoice Date:', invoice.date.strftime('%d %B %Y')],
+            ['Invoice ID:', invoice.invoice_number or 'N/A', 'Due Date:', invoice.due_date.strftime('%d %B %Y')],
+            ['Payment Status:', invoice.get_payment_status_display(), 'Amount Due:', f"₹ {invoice.remaining_amount:,.2f}"],
+        ],
+        'items': items,
+        'summary': summary,
+        'terms': _payment_terms('invoice'),
+    }
+
+
+def bill_snapshot(bill):
+    items, summary = _lines(bill)
+    return {
+        'kind': 'bill',
+        'id': bill.pk,
+        'number': bill.transaction_number,
+        'party': _party(bill.contact),
+        'details': [
+            ['Bill Number:', bill.transaction_number, 'Bill Date:', bill.date.strftime('%d %B %Y')],
+            ['Bill ID:', bill.bill_number or 'N/A', 'Due Date:', bill.due_date.strftime('%d %B %Y')],
+            ['Payment Status:', bill.get_payment_status_display(), 'Amount Due:', f"Rs {bill.remaining_amount:,.2f}"],
+        ],
+        'items': items,
+        'summary': summary,
+        'terms': _payment_terms('bill'),
+    }
+
+
+def order_snapshot(order):
+    kind = 'purchase_order' if isinstance(order, PurchaseOrder) else 'sales_order'
+    label = 'PO' if kind == 'purchase_order' else 'SO'
+    items, summary = _lines(order)
+    expected = order.expected_delivery_date.strftime('%d %B %Y') if order.expected_delivery_date else 'N/A'
+    return {
+        'kind': kind,
+        'id': order.pk,
+        'number': order.transaction_number,
+        'party': _party(order.contact),
+        'details': [
+            [f'{label} Number:', order.transaction_number, 'Order Date:', order.date.strftime('%d %B %Y')],
+            ['Status:', order.get_status_display(), 'Delivery By:', expected],
+        ],
+        'items': items,
+        'summary': summary,
+        'terms': [
+            'Prices are inclusive of delivery unless stated otherwise.',
+            'Goods must match the quantities and specifications listed.',
+            'All disputes must be reported within 7 days of delivery.',
+            f'This {LAYOUTS[kind]["noun"]} is computer generated and does not require signature.',
+        ],
+    }
+
+
+def receipt_snapshot(payment):
+    document = payment.customer_invoice or payment.vendor_bill
+    against = f'Payment against {document.transaction_number}' if document else 'Payment'
+    outgoing = payment.vendor_bill_id is not None
+    return {
+        'kind': 'receipt',
+        'id': payment.pk,
+        'number': payment.payment_number,
+        'party': _party(document.contact) if document else {'name': '-', 'address': '', 'phone': '', 'email': ''},
+        'party_label': 'PAID TO:' if outgoing else 'RECEIVED FROM:',
+        'details': [
+            ['Receipt Number:', payment.payment_number, 'Payment Date:', payment.date.strftime('%d %B %Y')],
+            ['Method:', payment.get_payment_method_display(), 'Reference:', payment.reference or 'N/A'],
+        ],
+        'items': [(against, 1, payment.amount, payment.amount)],
+        'summary': [('AMOUNT PAID:' if outgoing else 'AMOUNT RECEIVED:', payment.amount)],
+        'terms': [
+            'This receipt confirms the payment described above.',
+            'This receipt is computer generated and does not require signature.',
+        ],
+    }
+
+
+SNAPSHOTS = {
+    CustomerInvoice: invoice_snapshot,
+    VendorBill: bill_snapshot,
+    PurchaseOrder: order_snapshot,
+    SalesOrder: order_snapshot,
+    Payment: receipt_snapshot,
+}
+
+
+def snapshot(document):
+    """The plain data render() draws for document"""
+    return SNAPSHOTS[type(document)](document)
@@ -0,0 +1,80 @@
+"""Rendered document PDFs stored under a hash of what they print.
+
+The fingerprint is taken over the document's transactions.pdf snapshot,
+which holds every value the layout reads (header, contact, items, payment
+status and balance), plus TEMPLATE_VERSION, so a changed document simply
+hashes to a new file and never serves a stale one. Files live in the
+default storage at pdf_cache/<kind>/<id>/<fingerprint>.pdf; writing a new
+version removes the document's older ones.
+"""
+import hashlib
+import io
+import json
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from . import pdf
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever transactions.pdf changes what it draws from a snapshot
+TEMPLATE_VERSION = 2
+
+ROOT = 'pdf_cache'
+
+
+def fingerprint(snapshot):
+    """SHA-256 of a document snapshot and the template version"""
+    raw = json.dumps([TEMPLATE_VERSION, snapshot], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _directory(snapshot):
+    return f"{ROOT}/{snapshot['kind']}/{snapshot['id']}"
+
+
+def get_pdf(snapshot, digest=None):
+    """The PDF bytes of snapshot, rendered only when not stored yet"""
+    digest = digest or fingerprint(snapshot)
+    directory = _directory(snapshot)
+    name = f'{directory}/{digest}.pdf'
+    try:
+        with default_storage.open(name, 'rb') as stored:
+            return stored.read()
+    except (FileNotFoundError, OSError):
+        pass
+
+    buffer = io.BytesIO()
+    pdf.render(snapshot, buffer)
+    content = buffer.getvalue()
+    try:
+        saved = default_storage.save(name, ContentFile(content))
+        if saved != name:
+            # Another request stored the same version first; keep theirs
+            default_storage.delete(saved)
+        _, files = default_storage.listdir(directory)
+        for stale in files:
+            if stale != f'{digest}.pdf':
+                default_storage.delete(f'{directory}/{stale}')
+    except OSError:
+        logger.warning('Could not store the PDF of %s %s', snapshot['kind'], snapshot['id'], exc_info=True)
+    return content
+
+
+def pdf_response(request, snapshot, filename):
+    """Attachment response for a snapshot's PDF, answering conditional GETs from the fingerprint alone"""
+    digest = fingerprint(snapshot)
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(get_pdf(snapshot, digest), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    # Revalidate on every use: the same URL serves a new PDF once the document changes
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,171 @@
+"""Bulk export of document PDFs as one ZIP archive.
+
+Documents are read in chunks through pdf.snapshot_queryset() and their
+snapshots rendered in a pool of worker processes (PDF_EXPORT_WORKERS, 0 to
+render in process). Only a few renders per worker are in flight at once and
+finished PDFs enter the archive in document order, so memory stays bounded
+however many documents are exported. Workers go through the PDF cache, so
+documents already downloaded are not laid out again and exported ones are
+stored for later downloads.
+
+zip_stream() yields the archive as it is written, for StreamingHttpResponse;
+write_zip() writes it to a file.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+
+from . import pdf, pdf_cache
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200
+
+# Renders queued per worker ahead of the archive writer
+IN_FLIGHT_PER_WORKER = 4
+
+FILENAME_PREFIXES = {
+    'invoice': 'Invoice',
+    'bill': 'Bill',
+    'purchase_order': 'PurchaseOrder',
+    'sales_order': 'SalesOrder',
+    'receipt': 'Receipt',
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_snapshot(snapshot):
+    """The PDF of snapshot, from the PDF cache when already stored; runs in the workers"""
+    return pdf_cache.get_pdf(snapshot)
+
+
+def get_pool():
+    """The shared export pool, started on first use; None when disabled"""
+    global _pool
+    from django.conf import settings
+
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, 'PDF_EXPORT_WORKERS', os.cpu_count() or 1)
+            if workers <= 0:
+                return None
+            # Spawned workers set Django up themselves, before the first task imports this module's models
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def member_name(snapshot):
+    return f"{FILENAME_PREFIXES[snapshot['kind']]}_{snapshot['number'].replace('/', '-')}.pdf"
+
+
+def snapshots(queryset):
+    for document in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield pdf.snapshot(document)
+
+
+def rendered(snapshots):
+    """(snapshot, PDF bytes) for each snapshot in order, rendered ahead in the export pool.
+
+    A render that fails in the pool, or finds it broken, is redone in this
+    process.
+    """
+    pool = get_pool()
+    window = deque()
+    limit = (pool._max_workers if pool else 1) * IN_FLIGHT_PER_WORKER
+
+    def finish(snapshot, future):
+        nonlocal pool
+        if future is not None:
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                # Every render still queued fails the same way; report and drop the pool once
+                if pool is not None:
+                    logger.warning('PDF export pool broke, rendering in process', exc_info=True)
+                    _discard_pool(pool)
+                    pool = None
+            except Exception:
+                logger.warning('Rendering %s failed in the export pool, rendering in process',
+                               member_name(snapshot), exc_info=True)
+        return render_snapshot(snapshot)
+
+    for snapshot in snapshots:
+        future = None
+        if pool is not None:
+            try:
+                future = pool.submit(render_snapshot, snapshot)
+            except RuntimeError:
+                # BrokenProcessPool, or a pool shut down by another thread
+                logger.warning('PDF export pool unavailable, rendering in process', exc_info=True)
+                _discard_pool(pool)
+                pool = None
+        window.append((snapshot, future))
+        if len(window) >= limit:
+            snapshot, future = window.popleft()
+            yield snapshot, finish(snapshot, future)
+
+    while window:
+        snapshot, future = window.popleft()
+        yield snapshot, finish(snapshot, future)
+
+
+class _Sink:
+    """Write-only target that hands over what the archive wrote since the last take()"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def zip_stream(queryset):
+    """Yield a ZIP of the PDFs of queryset's documents chunk by chunk, one member at a time"""
+    sink = _Sink()
+    # PDF page streams are already compressed
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for snapshot, content in rendered(snapshots(queryset)):
+            archive.writestr(member_name(snapshot), content)
+            yield sink.take()
+    yield sink.take()
+
+
+def write_zip(queryset, path):
+    """Write the ZIP of queryset's documents to path and return the number of PDFs"""
+    count = 0
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive:
+        for snapshot, content in rendered(snapshots(queryset)):
+            archive.writestr(member_name(snapshot), content)
+            count += 1
+    return count
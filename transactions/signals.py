@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+
+# Sent by code that changes documents with bulk_create()/update(), which bypass
+# the model signals; receivers get sender=<document model> and dates=<set of
+# the affected document dates>
+documents_changed = Signal()
@@ -0,0 +1,99 @@
+"""Statements of account for a contact over a date range.
+
+A customer statement lists posted invoices as charges and their payments;
+a vendor statement does the same with posted bills. The opening balance is
+one aggregate per table over everything before the period. The entries
+come from one date-ordered query per table, read in chunks and merged in
+Python, and the running balance is carried along. pdf.render_statement()
+consumes them as it lays out the pages, so the size of a statement does
+not change the memory it needs.
+"""
+import heapq
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from . import pdf
+from .models import CustomerInvoice, Payment, VendorBill
+
+
+CHUNK_SIZE = 500
+
+# side: the documents it lists and the Payment field linking to them
+SIDES = {
+    'customer': (CustomerInvoice, 'customer_invoice'),
+    'vendor': (VendorBill, 'vendor_bill'),
+}
+
+PAYMENT_METHODS = dict(Payment.PAYMENT_METHOD_CHOICES)
+
+
+def _documents(contact, side):
+    model, _ = SIDES[side]
+    return model.objects.filter(contact=contact, status='posted')
+
+
+def _payments(contact, side):
+    _, field = SIDES[side]
+    return Payment.objects.filter(**{f'{field}__contact': contact, f'{field}__status': 'posted'})
+
+
+def opening_balance(contact, side, start_date):
+    """What contact owed (customer) or was owed (vendor) before start_date"""
+    charged = _documents(contact, side).filter(date__lt=start_date).aggregate(
+        total=Coalesce(Sum('total_amount'), Decimal('0'))
+    )['total']
+    paid = _payments(contact, side).filter(date__lt=start_date).aggregate(
+        total=Coalesce(Sum('amount'), Decimal('0'))
+    )['total']
+    return charged - paid
+
+
+def entries(contact, side, start_date, end_date, opening=Decimal('0')):
+    """(date, reference, description, charge, payment, balance) for the period in date order.
+
+    On the same date documents come before the payments made against them.
+    """
+    _, field = SIDES[side]
+    noun = 'Invoice' if side == 'customer' else 'Bill'
+    documents = _documents(contact, side).filter(date__range=(start_date, end_date)).order_by('date', 'pk').values_list(
+        'date', 'transaction_number', 'due_date', 'total_amount'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    payments = _payments(contact, side).filter(date__range=(start_date, end_date)).order_by('date', 'pk').values_list(
+        'date', 'payment_number', f'{field}__transaction_number', 'payment_method', 'amount'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    balance = opening
+    # merge() is stable, so documents (the first iterable) win ties on date
+    for row in heapq.merge(documents, payments, key=lambda row: row[0]):
+        if len(row) == 4:
+            entry_date, reference, due_date, amount = row
+            balance += amount
+            yield entry_date, reference, f"{noun}, due {due_date:%d %b %Y}", amount, Decimal('0'), balance
+        else:
+            entry_date, reference, against, method, amount = row
+            balance -= amount
+            yield entry_date, reference, f"{PAYMENT_METHODS.get(method, method)} - {against}", Decimal('0'), amount, balance
+
+
+def render(contact, side, start_date, end_date, output):
+    """Write contact's statement for the period to the file-like output"""
+    opening = opening_balance(contact, side, start_date)
+    period = f"{start_date:%d %b %Y} - {end_date:%d %b %Y}"
+    header = {
+        'party': {'name': contact.name, 'address': contact.address, 'phone': contact.phone, 'email': contact.email},
+        'party_label': 'CUSTOMER:' if side == 'customer' else 'VENDOR:',
+        'details': [
+            ['Period:', period, 'Statement Date:', date.today().strftime('%d %B %Y')],
+            ['Account:', 'Receivable' if side == 'customer' else 'Payable', 'Opening Balance:', f"Rs {opening:,.2f}"],
+        ],
+        'opening': opening,
+        'footer': f"Statement of account - {contact.name} - {period}",
+    }
+    pdf.render_statement(header, entries(contact, side, start_date, end_date, opening), output)
+
+
+def filename(contact, start_date, end_date):
+    return f"Statement_{contact.pk}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.pdf"
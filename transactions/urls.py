@@ -5,32 +5,44 @@ urlpatterns = [
     # Purchase Orders
     path('purchase-orders/', views.purchase_order_list_view, name='purchase_order_list'),
     path('purchase-orders/create/', views.purchase_order_create_view, name='purchase_order_create'),
+    path('purchase-orders/<int:pk>/pdf/', views.purchase_order_pdf, name='purchase_order_pdf'),
     
     # Vendor Bills
     path('vendor-bills/', views.vendor_bill_list_view, name='vendor_bill_list'),
     path('vendor-bills/create/', views.vendor_bill_create_view, name='vendor_bill_create'),
     path('vendor-bills/<int:pk>/post/', views.vendor_bill_post_view, name='vendor_bill_post'),
+    path('vendor-bills/<int:pk>/cancel/', views.vendor_bill_cancel_view, name='vendor_bill_cancel'),
+    path('vendor-bills/bulk-status/', views.vendor_bill_bulk_status_view, name='vendor_bill_bulk_status'),
     path('vendor-bills/<int:pk>/pdf/', views.vendor_bill_pdf, name='vendor_bill_pdf'),
+    path('vendor-bills/export/pdf/', views.vendor_bill_export_pdf, name='vendor_bill_export_pdf'),
     
     # Sales Orders
     path('sales-orders/', views.sales_order_list_view, name='sales_order_list'),
     path('sales-orders/create/', views.sales_order_create_view, name='sales_order_create'),
+    path('sales-orders/<int:pk>/pdf/', views.sales_order_pdf, name='sales_order_pdf'),
     
     # Customer Invoices
     path('customer-invoices/', views.customer_invoice_list_view, name='customer_invoice_list'),
     path('customer-invoices/create/', views.customer_invoice_create_view, name='customer_invoice_create'),
     path('customer-invoices/<int:pk>/post/', views.customer_invoice_post_view, name='customer_invoice_post'),
+    path('customer-invoices/<int:pk>/cancel/', views.customer_invoice_cancel_view, name='customer_invoice_cancel'),
+    path('customer-invoices/bulk-status/', views.customer_invoice_bulk_status_view, name='customer_invoice_bulk_status'),
     path('customer-invoices/<int:pk>/pdf/', views.customer_invoice_pdf, name='customer_invoice_pdf'),
+    path('customer-invoices/export/pdf/', views.customer_invoice_export_pdf, name='customer_invoice_export_pdf'),
     
     # Payments
     path('payments/', views.payment_list_view, name='payment_list'),
     path('payments/create/', views.payment_create_view, name='payment_create'),
+    path('payments/<int:pk>/receipt/', views.payment_receipt_pdf, name='payment_receipt_pdf'),
     
     # Chart of Accounts
     path('chart-of-accounts/', views.chart_of_accounts_list_view, name='chart_of_accounts_list'),
     path('chart-of-accounts/create/', views.chart_of_accounts_create_view, name='chart_of_accounts_create'),
     path('chart-of-accounts/<int:pk>/edit/', views.chart_of_accounts_edit_view, name='chart_of_accounts_edit'),
     
+    # Bulk Import
+    path('import/', views.transaction_import_view, name='transaction_import'),
+    
     # Bill Payments
     path('bill-payments/', views.bill_payment_list_view, name='bill_payment_list'),
     path('bill-payments/create/<int:bill_id>/', views.bill_payment_create_view, name='bill_payment_create'),
@@ -1,60 +1,121 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.views.decorators.http import require_POST
 from django.db import transaction
-from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.template.loader import get_template
 from datetime import date
+from decimal import Decimal
 import json
 import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from .models import (
     PurchaseOrder, VendorBill, SalesOrder, CustomerInvoice, Payment, ChartOfAccounts,
     PurchaseOrderItem, VendorBillItem, SalesOrderItem, CustomerInvoiceItem
 )
-from core.models import Contact, Product, AnalyticalAccount, AutoAnalyticalModel
+from core.models import Contact, Product, AnalyticalAccount
+from core.analytical_rules import get_rule_engine
+from core.pagination import keyset_paginate
 from .forms import (
     PurchaseOrderForm, VendorBillForm, SalesOrderForm, CustomerInvoiceForm, PaymentForm,
     ChartOfAccountsForm, BudgetOverrideForm, PurchaseOrderItemFormSet, VendorBillItemFormSet,
-    SalesOrderItemFormSet, CustomerInvoiceItemFormSet
+    SalesOrderItemFormSet, CustomerInvoiceItemFormSet, TransactionImportForm, TransactionFilterForm,
+    PaymentFilterForm
 )
+from .importing import TransactionImporter, open_upload, read_rows
+from . import pdf, pdf_cache, pdf_export
 
 
 def is_admin(user):
     return user.is_authenticated and user.role == 'admin'
 
 
-def apply_auto_analytical_model(transaction_item, contact, product):
-    """Apply auto analytical models to determine analytical account"""
-    models = AutoAnalyticalModel.objects.filter(is_active=True).order_by('-priority')
+def is_admin_or_invoicing(user):
+    return user.is_authenticated and user.role in ['admin', 'invoicing']
+
+
+def create_line_items(request, item_model, document_field, document):
+    """Create the posted product lines of a document, resolving products and rules in batch"""
+    rows = [
+        (product_id, qty, price)
+        for product_id, qty, price in zip(
+            request.POST.getlist('product'),
+            request.POST.getlist('quantity'),
+            request.POST.getlist('unit_price'),
+        )
+        if product_id and qty and price
+    ]
+    products = Product.objects.in_bulk([int(product_id) for product_id, qty, price in rows])
+    rows = [(products[int(product_id)], qty, price) for product_id, qty, price in rows if int(product_id) in products]
+    accounts = get_rule_engine().match_many((product, document.contact) for product, qty, price in rows)
+    
+    for (product, qty, price), account in zip(rows, accounts):
+        item_model.objects.create(
+            product=product,
+            quantity=qty,
+            unit_price=price,
+            analytical_account=account or document.analytical_account,
+            **{document_field: document}
+        )
+
+
+BULK_ACTIONS = {'post': 'posted', 'cancel': 'cancelled'}
+
+
+def bulk_set_status(request, model, list_url):
+    """Apply a bulk post/cancel POSTed as action + ids (or a date range) and report per document"""
+    status = BULK_ACTIONS.get(request.POST.get('action'))
+    ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+    wants_json = request.POST.get('format') == 'json' or request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    
+    error = None
+    try:
+        date_from, date_to = (
+            date.fromisoformat(request.POST[name]) if request.POST.get(name) else None
+            for name in ('date_from', 'date_to')
+        )
+    except ValueError:
+        error = 'Dates must be given as YYYY-MM-DD.'
+    else:
+        if status is None or not (ids or date_from or date_to):
+            error = 'Choose post or cancel and select at least one document.'
+    if error:
+        if wants_json:
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, error)
+        return redirect(list_url)
+    
+    documents = model.objects.all()
+    if ids:
+        documents = documents.filter(pk__in=ids)
+    if date_from:
+        documents = documents.filter(date__gte=date_from)
+    if date_to:
+        documents = documents.filter(date__lte=date_to)
+    
+    report = model.bulk_set_status(
+        documents.values_list('pk', flat=True), status,
+        force=request.POST.get('force') == 'on' and is_admin(request.user)
+    )
+    changed = sum(1 for entry in report if entry['result'] == status)
+    failed = [entry for entry in report if entry['result'] not in (status, 'unchanged')]
     
-    for model in models:
-        match = True
-        
-        if model.product_category and product.category != model.product_category:
-            match = False
-        if model.product_name_contains and model.product_name_contains.lower() not in product.name.lower():
-            match = False
-        if model.contact_type and contact.contact_type != model.contact_type:
-            match = False
-        
-        if match:
-            return model.analytical_account
+    if wants_json:
+        return JsonResponse({'changed': changed, 'failed': len(failed), 'results': report})
     
-    return None
+    messages.success(request, f'{changed} document(s) {status}.')
+    for entry in failed[:20]:
+        messages.warning(request, f"{entry['transaction_number']}: {entry['message']}")
+    if len(failed) > 20:
+        messages.warning(request, f'{len(failed) - 20} more document(s) were not {status}.')
+    return redirect(list_url)
 
 
 @login_required
 def purchase_order_list_view(request):
-    orders = PurchaseOrder.objects.all().order_by('-date')
-    return render(request, 'transactions/purchase_order_list.html', {'orders': orders})
+    filters = TransactionFilterForm(request.GET)
+    orders = keyset_paginate(request, filters.filter(PurchaseOrder.objects.for_listing()))
+    return render(request, 'transactions/purchase_order_list.html', {'orders': orders, 'filters': filters})
 
 
 @login_required
@@ -111,8 +172,13 @@ def purchase_order_create_view(request):
 
 @login_required
 def vendor_bill_list_view(request):
-    bills = VendorBill.objects.all().order_by('-date')
-    return render(request, 'transactions/vendor_bill_list.html', {'bills': bills})
+    filters = TransactionFilterForm(request.GET, payable=True)
+    bills = keyset_paginate(request, filters.filter(VendorBill.objects.for_listing()))
+    return render(request, 'transactions/vendor_bill_list.html', {
+        'bills': bills,
+        'filters': filters,
+        'today': date.today()
+    })
 
 
 @login_required
@@ -170,16 +236,31 @@ def vendor_bill_create_view(request):
 @login_required
 def vendor_bill_post_view(request, pk):
     bill = get_object_or_404(VendorBill, pk=pk)
-    bill.status = 'posted'
-    bill.save()
+    bill.set_status('posted')
     messages.success(request, 'Vendor Bill posted successfully!')
     return redirect('vendor_bill_list')
 
 
+@login_required
+def vendor_bill_cancel_view(request, pk):
+    bill = get_object_or_404(VendorBill, pk=pk)
+    bill.set_status('cancelled')
+    messages.success(request, 'Vendor Bill cancelled successfully!')
+    return redirect('vendor_bill_list')
+
+
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+@require_POST
+def vendor_bill_bulk_status_view(request):
+    return bulk_set_status(request, VendorBill, 'vendor_bill_list')
+
+
 @login_required
 def sales_order_list_view(request):
-    orders = SalesOrder.objects.all().order_by('-date')
-    return render(request, 'transactions/sales_order_list.html', {'orders': orders})
+    filters = TransactionFilterForm(request.GET)
+    orders = keyset_paginate(request, filters.filter(SalesOrder.objects.for_listing()))
+    return render(request, 'transactions/sales_order_list.html', {'orders': orders, 'filters': filters})
 
 
 @login_required
@@ -189,25 +270,10 @@ def sales_order_create_view(request):
         if form.is_valid():
             with transaction.atomic():
                 so = form.save(commit=False)
-                so.transaction_number = f"SO-{timezone.now().strftime('%Y%m%d%H%M%S')}"
                 so.created_by = request.user
                 so.save()
                 
-                # Handle items
-                product_ids = request.POST.getlist('product')
-                quantities = request.POST.getlist('quantity')
-                prices = request.POST.getlist('unit_price')
-                
-                for product_id, qty, price in zip(product_ids, quantities, prices):
-                    if product_id and qty and price:
-                        product = Product.objects.get(pk=product_id)
-                        item = SalesOrderItem.objects.create(
-                            sales_order=so,
-                            product=product,
-                            quantity=qty,
-                            unit_price=price,
-                            analytical_account=apply_auto_analytical_model(None, so.contact, product) or so.analytical_account
-                        )
+                create_line_items(request, SalesOrderItem, 'sales_order', so)
                 
                 messages.success(request, 'Sales Order created successfully!')
                 return redirect('sales_order_list')
@@ -224,8 +290,13 @@ def sales_order_create_view(request):
 
 @login_required
 def customer_invoice_list_view(request):
-    invoices = CustomerInvoice.objects.all().order_by('-date')
-    return render(request, 'transactions/customer_invoice_list.html', {'invoices': invoices})
+    filters = TransactionFilterForm(request.GET, payable=True)
+    invoices = keyset_paginate(request, filters.filter(CustomerInvoice.objects.for_listing()))
+    return render(request, 'transactions/customer_invoice_list.html', {
+        'invoices': invoices,
+        'filters': filters,
+        'today': date.today()
+    })
 
 
 @login_required
@@ -235,25 +306,10 @@ def customer_invoice_create_view(request):
         if form.is_valid():
             with transaction.atomic():
                 invoice = form.save(commit=False)
-                invoice.transaction_number = f"INV-{timezone.now().strftime('%Y%m%d%H%M%S')}"
                 invoice.created_by = request.user
                 invoice.save()
                 
-                # Handle items
-                product_ids = request.POST.getlist('product')
-                quantities = request.POST.getlist('quantity')
-                prices = request.POST.getlist('unit_price')
-                
-                for product_id, qty, price in zip(product_ids, quantities, prices):
-                    if product_id and qty and price:
-                        product = Product.objects.get(pk=product_id)
-                        item = CustomerInvoiceItem.objects.create(
-                            customer_invoice=invoice,
-                            product=product,
-                            quantity=qty,
-                            unit_price=price,
-                            analytical_account=apply_auto_analytical_model(None, invoice.contact, product) or invoice.analytical_account
-                        )
+                create_line_items(request, CustomerInvoiceItem, 'customer_invoice', invoice)
                 
                 messages.success(request, 'Customer Invoice created successfully!')
                 return redirect('customer_invoice_list')
@@ -271,16 +327,31 @@ def customer_invoice_create_view(request):
 @login_required
 def customer_invoice_post_view(request, pk):
     invoice = get_object_or_404(CustomerInvoice, pk=pk)
-    invoice.status = 'posted'
-    invoice.save()
+    invoice.set_status('posted')
     messages.success(request, 'Customer Invoice posted successfully!')
     return redirect('customer_invoice_list')
 
 
+@login_required
+def customer_invoice_cancel_view(request, pk):
+    invoice = get_object_or_404(CustomerInvoice, pk=pk)
+    invoice.set_status('cancelled')
+    messages.success(request, 'Customer Invoice cancelled successfully!')
+    return redirect('customer_invoice_list')
+
+
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+@require_POST
+def customer_invoice_bulk_status_view(request):
+    return bulk_set_status(request, CustomerInvoice, 'customer_invoice_list')
+
+
 @login_required
 def payment_list_view(request):
-    payments = Payment.objects.all().order_by('-date')
-    return render(request, 'transactions/payment_list.html', {'payments': payments})
+    filters = PaymentFilterForm(request.GET)
+    payments = keyset_paginate(request, filters.filter(Payment.objects.select_related('customer_invoice', 'vendor_bill')))
+    return render(request, 'transactions/payment_list.html', {'payments': payments, 'filters': filters})
 
 
 @login_required
@@ -289,7 +360,6 @@ def payment_create_view(request):
         form = PaymentForm(request.POST)
         if form.is_valid():
             payment = form.save(commit=False)
-            payment.payment_number = f"PAY-{timezone.now().strftime('%Y%m%d%H%M%S')}"
             payment.created_by = request.user
             payment.save()
             messages.success(request, 'Payment recorded successfully!')
@@ -348,14 +418,38 @@ def chart_of_accounts_edit_view(request, pk):
     })
 
 
+@login_required
+@user_passes_test(is_admin)
+def transaction_import_view(request):
+    """Bulk import invoices and bills from an uploaded CSV/JSONL file"""
+    importer = None
+    if request.method == 'POST':
+        form = TransactionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            stream, file_format = open_upload(form.cleaned_data['file'])
+            importer = TransactionImporter(user=request.user, dry_run=form.cleaned_data['dry_run'])
+            importer.run(read_rows(stream, file_format))
+            
+            verb = 'validated' if importer.dry_run else 'imported'
+            if importer.errors:
+                messages.warning(request, f'{importer.documents} document(s) {verb}, {len(importer.errors)} row error(s).')
+            else:
+                messages.success(request, f'{importer.documents} document(s) with {importer.lines} line(s) {verb}.')
+    else:
+        form = TransactionImportForm()
+    
+    return render(request, 'transactions/import.html', {
+        'form': form,
+        'importer': importer,
+        'errors': importer.errors[:500] if importer else [],
+    })
+
+
 # Bill Payment Views
 @login_required
 def bill_payment_list_view(request):
     """List all unpaid bills for payment processing"""
-    unpaid_bills = VendorBill.objects.filter(
-        status='posted',
-        payment_status__in=['not_paid', 'partially_paid']
-    ).order_by('-date')
+    unpaid_bills = VendorBill.objects.outstanding().for_listing().order_by('-date')
     
     return render(request, 'transactions/bill_payment_list.html', {
         'bills': unpaid_bills,
@@ -372,19 +466,23 @@ def bill_payment_create_view(request, bill_id):
         form = PaymentForm(request.POST)
         if form.is_valid():
             payment = form.save(commit=False)
-            payment.vendor_bill = bill
             payment.created_by = request.user
             
-            # Validate payment amount
-            if payment.amount > bill.remaining_amount:
-                messages.error(request, f'Payment amount cannot exceed remaining balance of ₹{bill.remaining_amount:,.2f}')
-                return render(request, 'transactions/bill_payment_form.html', {
-                    'form': form,
-                    'bill': bill,
-                    'title': f'Pay Bill {bill.transaction_number}'
-                })
-            
-            payment.save()
+            with transaction.atomic():
+                # Lock the bill so concurrent payments cannot both pass the balance check
+                bill = VendorBill.lock_for_payment(bill.pk)
+                payment.vendor_bill = bill
+                
+                # Validate payment amount
+                if payment.amount > bill.remaining_amount:
+                    messages.error(request, f'Payment amount cannot exceed remaining balance of ₹{bill.remaining_amount:,.2f}')
+                    return render(request, 'transactions/bill_payment_form.html', {
+                        'form': form,
+                        'bill': bill,
+                        'title': f'Pay Bill {bill.transaction_number}'
+                    })
+                
+                payment.save()
             messages.success(request, f'Payment of ₹{payment.amount:,.2f} recorded successfully!')
             return redirect('bill_payment_list')
     else:
@@ -494,8 +592,8 @@ def validate_budget_ajax(request):
                 
                 if budgets.exists():
                     budget = budgets.first()
-                    if budget.actual_amount + float(amount) > budget.budgeted_amount:
-                        exceeds_by = (budget.actual_amount + float(amount)) - budget.budgeted_amount
+                    if budget.actual_amount + Decimal(str(amount)) > budget.budgeted_amount:
+                        exceeds_by = (budget.actual_amount + Decimal(str(amount))) - budget.budgeted_amount
                         return JsonResponse({
                             'status': 'exceeds_budget',
                             'message': f'Exceeds approved budget by ₹{exceeds_by:,.2f}',
@@ -525,7 +623,7 @@ def validate_budget_ajax(request):
 @login_required
 def customer_invoice_pdf(request, pk):
     """Generate PDF for customer invoice"""
-    invoice = get_object_or_404(CustomerInvoice, pk=pk)
+    invoice = get_object_or_404(pdf.snapshot_queryset(CustomerInvoice), pk=pk)
     
     # Check permissions
     if not request.user.role == 'admin' and invoice.contact != getattr(request.user, 'contact', None):
@@ -533,20 +631,14 @@ def customer_invoice_pdf(request, pk):
             messages.error(request, 'Access denied.')
             return redirect('customer_invoice_list')
     
-    # Create PDF response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Invoice_{invoice.transaction_number}.pdf"'
-    
-    # Generate PDF
-    generate_invoice_pdf(response, invoice)
-    
-    return response
+    # Served from the stored copy while the document is unchanged
+    return pdf_cache.pdf_response(request, pdf.snapshot(invoice), f'Invoice_{invoice.transaction_number}.pdf')
 
 
 @login_required
 def vendor_bill_pdf(request, pk):
     """Generate PDF for vendor bill"""
-    bill = get_object_or_404(VendorBill, pk=pk)
+    bill = get_object_or_404(pdf.snapshot_queryset(VendorBill), pk=pk)
     
     # Check permissions
     if not request.user.role == 'admin' and bill.contact != getattr(request.user, 'contact', None):
@@ -554,465 +646,65 @@ def vendor_bill_pdf(request, pk):
             messages.error(request, 'Access denied.')
             return redirect('vendor_bill_list')
     
-    # Create PDF response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Bill_{bill.transaction_number}.pdf"'
-    
-    # Generate PDF
-    generate_bill_pdf(response, bill)
-    
-    return response
+    # Served from the stored copy while the document is unchanged
+    return pdf_cache.pdf_response(request, pdf.snapshot(bill), f'Bill_{bill.transaction_number}.pdf')
 
 
-def generate_invoice_pdf(response, invoice):
-    """Generate professional PDF content for customer invoice"""
-    doc = SimpleDocTemplate(response, pagesize=A4, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define professional styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles for professional invoice
-    company_style = ParagraphStyle(
-        'CompanyStyle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=3,
-        textColor=colors.HexColor('#1a365d'),
-        alignment=TA_LEFT,
-        fontName='Helvetica-Bold'
-    )
-    
-    invoice_title_style = ParagraphStyle(
-        'InvoiceTitleStyle',
-        parent=styles['Heading1'],
-        fontSize=28,
-        spaceAfter=20,
-        textColor=colors.HexColor('#00BCD4'),
-        alignment=TA_RIGHT,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Header section with company info and invoice title
-    company_info = """<b>ACCORIX</b><br/>
-    Finance OS - Complete Accounting Solution"""
-    
-    header_data = [
-        [
-            Paragraph(company_info, company_style),
-            Paragraph("INVOICE", invoice_title_style)
-        ]
-    ]
-    
-    header_table = Table(header_data, colWidths=[4*inch, 3.5*inch])
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-    ]))
-    
-    elements.append(header_table)
-    
-    # Professional separator line
-    line_data = [['']]
-    line_table = Table(line_data, colWidths=[7.5*inch])
-    line_table.setStyle(TableStyle([
-        ('LINEBELOW', (0, 0), (-1, 0), 3, colors.HexColor('#00BCD4')),
-        ('TOPPADDING', (0, 0), (-1, 0), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 20),
-    ]))
-    elements.append(line_table)
-    
-    # Company and Customer Address Section
-    company_address = """<b>ACCORIX SYSTEMS PVT LTD</b><br/>
-    123 Business Park, Tech City<br/>
-    Mumbai, Maharashtra 400001<br/>
-    Phone: +91 22 1234 5678<br/>
-    Email: info@accorix.com<br/>
-    GST: 27ABCDE1234F1Z5"""
-    
-    customer_address = f"""<b>BILL TO:</b><br/>
-    <b>{invoice.contact.name}</b><br/>
-    {invoice.contact.address or 'Address not provided'}<br/>
-    Phone: {invoice.contact.phone or 'Not provided'}<br/>
-    Email: {invoice.contact.email or 'Not provided'}"""
-    
-    address_data = [
-        [
-            Paragraph(company_address, styles['Normal']),
-            Paragraph(customer_address, styles['Normal'])
-        ]
-    ]
-    
-    address_table = Table(address_data, colWidths=[3.75*inch, 3.75*inch])
-    address_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 25),
-    ]))
-    
-    elements.append(address_table)
-    
-    # Invoice Details Section
-    invoice_details_data = [
-        ['Invoice Number:', invoice.transaction_number, 'Invoice Date:', invoice.date.strftime('%d %B %Y')],
-        ['Invoice ID:', invoice.invoice_number or 'N/A', 'Due Date:', invoice.due_date.strftime('%d %B %Y')],
-        ['Payment Status:', invoice.get_payment_status_display(), 'Amount Due:', f"₹ {invoice.remaining_amount:,.2f}"],
-    ]
-    
-    invoice_details_table = Table(invoice_details_data, colWidths=[1.2*inch, 2.6*inch, 1.2*inch, 2.5*inch])
-    invoice_details_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f7fafc')),
-        ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#f7fafc')),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-    ]))
-    
-    elements.append(invoice_details_table)
-    elements.append(Spacer(1, 30))
-    
-    # Items Table with Professional Design
-    items_data = [['#', 'DESCRIPTION', 'QTY', 'RATE', 'AMOUNT']]
-    
-    # Add items
-    for i, item in enumerate(invoice.items.all(), 1):
-        items_data.append([
-            str(i),
-            item.product.name,
-            f"{int(item.quantity)}",
-            f"₹ {item.unit_price:,.2f}",
-            f"₹ {item.line_total:,.2f}"
-        ])
-    
-    # Calculate totals
-    subtotal = sum(item.line_total for item in invoice.items.all())
-    tax_amount = float(subtotal) * 0.18  # 18% GST
-    total_amount = float(subtotal) + tax_amount
-    
-    items_table = Table(items_data, colWidths=[0.5*inch, 3.8*inch, 0.7*inch, 1.3*inch, 1.7*inch])
-    items_table.setStyle(TableStyle([
-        # Header styling
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('ALIGN', (0, 0), (0, 0), 'CENTER'),   # # header
-        ('ALIGN', (1, 0), (1, 0), 'LEFT'),     # DESCRIPTION header
-        ('ALIGN', (2, 0), (2, 0), 'CENTER'),   # QTY header
-        ('ALIGN', (3, 0), (3, 0), 'RIGHT'),    # RATE header
-        ('ALIGN', (4, 0), (4, 0), 'RIGHT'),    # AMOUNT header
-        
-        # Data rows alignment
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Item number - center
-        ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Description - left
-        ('ALIGN', (2, 1), (2, -1), 'CENTER'),  # Quantity - center
-        ('ALIGN', (3, 1), (3, -1), 'RIGHT'),   # Rate - right
-        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),   # Amount - right
-        
-        # Borders and padding
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    
-    elements.append(items_table)
-    elements.append(Spacer(1, 20))
-    
-    # Summary Section - Connected columns
-    summary_data = [
-        ['', '', 'Subtotal:', f"₹ {subtotal:,.2f}"],
-        ['', '', 'GST (18%):', f"₹ {tax_amount:,.2f}"],
-        ['', '', 'TOTAL AMOUNT:', f"₹ {total_amount:,.2f}"],
-    ]
-    
-    summary_table = Table(summary_data, colWidths=[0.5*inch, 3.8*inch, 1.5*inch, 2.2*inch])
-    summary_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -2), 'Helvetica'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -2), 11),
-        ('FONTSIZE', (0, -1), (-1, -1), 13),
-        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),   # Labels - right aligned
-        ('ALIGN', (3, 0), (3, -1), 'RIGHT'),   # Values - right aligned
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#00BCD4')),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-        ('GRID', (2, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 40))
-    
-    # Terms and Conditions
-    terms_text = """<b>Terms & Conditions:</b><br/>
-    1. Payment is due within 30 days of invoice date.<br/>
-    2. Late payments may incur additional charges.<br/>
-    3. All disputes must be reported within 7 days.<br/>
-    4. This invoice is computer generated and does not require signature."""
-    
-    elements.append(Paragraph(terms_text, styles['Normal']))
-    elements.append(Spacer(1, 30))
-    
-    # Footer
-    footer_text = """<b>Thank you for your business!</b><br/>
-    For any queries, contact us at info@accorix.com or +91 22 1234 5678"""
-    
-    footer_para = Paragraph(footer_text, ParagraphStyle(
-        'FooterStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#4a5568'),
-        alignment=TA_CENTER
-    ))
+@login_required
+def purchase_order_pdf(request, pk):
+    """Generate PDF for purchase order"""
+    order = get_object_or_404(pdf.snapshot_queryset(PurchaseOrder), pk=pk)
     
-    elements.append(footer_para)
+    if request.user.role not in ['admin', 'invoicing'] and order.contact != getattr(request.user, 'contact', None):
+        messages.error(request, 'Access denied.')
+        return redirect('purchase_order_list')
     
-    # Build PDF
-    doc.build(elements)
+    return pdf_cache.pdf_response(request, pdf.snapshot(order), f'PurchaseOrder_{order.transaction_number}.pdf')
 
 
-def generate_bill_pdf(response, bill):
-    """Generate professional PDF content for vendor bill"""
-    doc = SimpleDocTemplate(response, pagesize=A4, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define professional styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles for professional bill
-    company_style = ParagraphStyle(
-        'CompanyStyle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=3,
-        textColor=colors.HexColor('#1a365d'),
-        alignment=TA_LEFT,
-        fontName='Helvetica-Bold'
-    )
-    
-    bill_title_style = ParagraphStyle(
-        'BillTitleStyle',
-        parent=styles['Heading1'],
-        fontSize=28,
-        spaceAfter=20,
-        textColor=colors.HexColor('#E91E63'),
-        alignment=TA_RIGHT,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Header section with company info and bill title
-    company_info = """<b>ACCORIX</b><br/>
-    Finance OS - Complete Accounting Solution"""
-    
-    header_data = [
-        [
-            Paragraph(company_info, company_style),
-            Paragraph("BILL", bill_title_style)
-        ]
-    ]
-    
-    header_table = Table(header_data, colWidths=[4*inch, 3.5*inch])
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-    ]))
-    
-    elements.append(header_table)
-    
-    # Professional separator line
-    line_data = [['']]
-    line_table = Table(line_data, colWidths=[7.5*inch])
-    line_table.setStyle(TableStyle([
-        ('LINEBELOW', (0, 0), (-1, 0), 3, colors.HexColor('#E91E63')),
-        ('TOPPADDING', (0, 0), (-1, 0), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 20),
-    ]))
-    elements.append(line_table)
-    
-    # Company and Vendor Address Section
-    company_address = """<b>ACCORIX SYSTEMS PVT LTD</b><br/>
-    123 Business Park, Tech City<br/>
-    Mumbai, Maharashtra 400001<br/>
-    Phone: +91 22 1234 5678<br/>
-    Email: info@accorix.com<br/>
-    GST: 27ABCDE1234F1Z5"""
-    
-    vendor_address = f"""<b>VENDOR:</b><br/>
-    <b>{bill.contact.name}</b><br/>
-    {bill.contact.address or 'Address not provided'}<br/>
-    Phone: {bill.contact.phone or 'Not provided'}<br/>
-    Email: {bill.contact.email or 'Not provided'}"""
-    
-    address_data = [
-        [
-            Paragraph(company_address, styles['Normal']),
-            Paragraph(vendor_address, styles['Normal'])
-        ]
-    ]
-    
-    address_table = Table(address_data, colWidths=[3.75*inch, 3.75*inch])
-    address_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 25),
-    ]))
-    
-    elements.append(address_table)
-    
-    # Bill Details Section
-    bill_details_data = [
-        ['Bill Number:', bill.transaction_number, 'Bill Date:', bill.date.strftime('%d %B %Y')],
-        ['Bill ID:', bill.bill_number or 'N/A', 'Due Date:', bill.due_date.strftime('%d %B %Y')],
-        ['Payment Status:', bill.get_payment_status_display(), 'Amount Due:', f"Rs {bill.remaining_amount:,.2f}"],
-    ]
-    
-    bill_details_table = Table(bill_details_data, colWidths=[1.2*inch, 2.6*inch, 1.2*inch, 2.5*inch])
-    bill_details_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f7fafc')),
-        ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#f7fafc')),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-    ]))
-    
-    elements.append(bill_details_table)
-    elements.append(Spacer(1, 30))
-    
-    # Items Table with Professional Design
-    items_data = [['#', 'DESCRIPTION', 'QTY', 'RATE', 'AMOUNT']]
-    
-    # Add items
-    for i, item in enumerate(bill.items.all(), 1):
-        items_data.append([
-            str(i),
-            item.product.name,
-            f"{int(item.quantity)}",
-            f"₹ {item.unit_price:,.2f}",
-            f"₹ {item.line_total:,.2f}"
-        ])
-    
-    # Calculate totals
-    subtotal = sum(item.line_total for item in bill.items.all())
-    tax_amount = float(subtotal) * 0.18  # 18% GST
-    total_amount = float(subtotal) + tax_amount
-    
-    items_table = Table(items_data, colWidths=[0.5*inch, 3.8*inch, 0.7*inch, 1.3*inch, 1.7*inch])
-    items_table.setStyle(TableStyle([
-        # Header styling
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('ALIGN', (0, 0), (0, 0), 'CENTER'),   # # header
-        ('ALIGN', (1, 0), (1, 0), 'LEFT'),     # DESCRIPTION header
-        ('ALIGN', (2, 0), (2, 0), 'CENTER'),   # QTY header
-        ('ALIGN', (3, 0), (3, 0), 'RIGHT'),    # RATE header
-        ('ALIGN', (4, 0), (4, 0), 'RIGHT'),    # AMOUNT header
-        
-        # Data rows alignment
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Item number - center
-        ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Description - left
-        ('ALIGN', (2, 1), (2, -1), 'CENTER'),  # Quantity - center
-        ('ALIGN', (3, 1), (3, -1), 'RIGHT'),   # Rate - right
-        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),   # Amount - right
-        
-        # Borders and padding
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    
-    elements.append(items_table)
-    elements.append(Spacer(1, 20))
-    
-    # Summary Section - Connected columns
-    summary_data = [
-        ['', '', 'Subtotal:', f"Rs {subtotal:,.2f}"],
-        ['', '', 'GST (18%):', f"Rs {tax_amount:,.2f}"],
-        ['', '', 'TOTAL AMOUNT:', f"Rs {total_amount:,.2f}"],
-    ]
-    
-    summary_table = Table(summary_data, colWidths=[0.5*inch, 3.8*inch, 1.5*inch, 2.2*inch])
-    summary_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -2), 'Helvetica'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -2), 11),
-        ('FONTSIZE', (0, -1), (-1, -1), 13),
-        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),   # Labels - right aligned
-        ('ALIGN', (3, 0), (3, -1), 'RIGHT'),   # Values - right aligned
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#E91E63')),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-        ('GRID', (2, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 40))
-    
-    # Terms and Conditions
-    terms_text = """<b>Terms & Conditions:</b><br/>
-    1. Payment is due within 30 days of bill date.<br/>
-    2. Late payments may incur additional charges.<br/>
-    3. All disputes must be reported within 7 days.<br/>
-    4. This bill is computer generated and does not require signature."""
-    
-    elements.append(Paragraph(terms_text, styles['Normal']))
-    elements.append(Spacer(1, 30))
-    
-    # Footer
-    footer_text = """<b>Thank you for your service!</b><br/>
-    For any queries, contact us at info@accorix.com or +91 22 1234 5678"""
-    
-    footer_para = Paragraph(footer_text, ParagraphStyle(
-        'FooterStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#4a5568'),
-        alignment=TA_CENTER
-    ))
+@login_required
+def sales_order_pdf(request, pk):
+    """Generate PDF for sales order"""
+    order = get_object_or_404(pdf.snapshot_queryset(SalesOrder), pk=pk)
     
-    elements.append(footer_para)
+    if request.user.role not in ['admin', 'invoicing'] and order.contact != getattr(request.user, 'contact', None):
+        messages.error(request, 'Access denied.')
+        return redirect('sales_order_list')
     
-    # Build PDF
-    doc.build(elements)
\ No newline at end of file
+    return pdf_cache.pdf_response(request, pdf.snapshot(order), f'SalesOrder_{order.transaction_number}.pdf')
+
+
+@login_required
+def payment_receipt_pdf(request, pk):
+    """Generate PDF receipt for a payment"""
+    payment = get_object_or_404(pdf.snapshot_queryset(Payment), pk=pk)
+    
+    document = payment.customer_invoice or payment.vendor_bill
+    contact = document.contact if document else None
+    if request.user.role not in ['admin', 'invoicing'] and (contact is None or contact != getattr(request.user, 'contact', None)):
+        messages.error(request, 'Access denied.')
+        return redirect('payment_list')
+    
+    return pdf_cache.pdf_response(request, pdf.snapshot(payment), f'Receipt_{payment.payment_number}.pdf')
+
+
+def export_pdfs(request, model, filename_prefix):
+    """Stream a ZIP of the PDFs of every document matching the list filters in request.GET"""
+    filters = TransactionFilterForm(request.GET, payable=True)
+    documents = filters.filter(pdf.snapshot_queryset(model)).order_by('date', 'pk')
+    # Rendered in the export pool and sent member by member, never held whole in memory
+    response = StreamingHttpResponse(pdf_export.zip_stream(documents), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename_prefix}_{date.today():%Y%m%d}.zip"'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+def customer_invoice_export_pdf(request):
+    return export_pdfs(request, CustomerInvoice, 'Invoices')
+
+
+@login_required
+@user_passes_test(is_admin_or_invoicing)
+def vendor_bill_export_pdf(request):
+    return export_pdfs(request, VendorBill, 'Bills')